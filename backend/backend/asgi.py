@@ -14,3 +14,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_asgi_application()
+
+# Resolve LLM provider settings once per process, before serving requests
+from backend.llm import get_provider  # noqa: E402
+get_provider().warm_up()
@@ -0,0 +1,181 @@
+"""
+End-to-end request deadlines and accounting for aborted LLM streams.
+
+A view builds a Deadline from the request: the default budget from
+settings.REQUEST_DEADLINES, or a shorter one from an X-Request-Timeout header.
+It passes the Deadline down through the utils into the provider's stream. The
+stream checks it at every chunk and caps each upstream attempt's timeout by the
+time left. When the budget runs out it raises DeadlineExceeded. When the client
+goes away (the response generator is closed, or the ASGI task is cancelled),
+the upstream HTTP stream is closed too.
+
+StreamMeter counts what aborted streams cost and what aborting saved. Tokens
+are estimated at about four characters each. Every token received before the
+abort counts as wasted. Seconds saved is the typical duration of a complete
+generation of that kind, minus the time already spent.
+"""
+import asyncio
+import threading
+import time
+
+from django.conf import settings
+
+DEFAULT_CONFIG = {
+    "DEFAULT": 60.0,
+    "STREAM_DEFAULT": 180.0,
+    "MAX": 300.0,
+}
+HEADER = "X-Request-Timeout"
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+def _config():
+    return {**DEFAULT_CONFIG, **getattr(settings, "REQUEST_DEADLINES", {})}
+
+
+class Deadline:
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self.expires_at = time.monotonic() + timeout
+
+    @classmethod
+    def from_request(cls, request, stream=False):
+        """The request's budget: the configured default, or X-Request-Timeout seconds (capped at MAX)"""
+        config = _config()
+        timeout = config["STREAM_DEFAULT"] if stream else config["DEFAULT"]
+        header = request.headers.get(HEADER)
+        if header:
+            try:
+                requested = float(header)
+            except ValueError:
+                requested = 0
+            if requested > 0:
+                timeout = min(requested, config["MAX"])
+        return cls(timeout)
+
+    @classmethod
+    def shared(cls, deadline):
+        """A budget for work shared by several requests: the configured default, or `deadline` if that is later"""
+        shared = cls(_config()["DEFAULT"])
+        shared.extend(deadline)
+        return shared
+
+    def extend(self, other):
+        """Push the expiry out to `other`'s when that is later"""
+        if other.expires_at > self.expires_at:
+            self.timeout += other.expires_at - self.expires_at
+            self.expires_at = other.expires_at
+
+    def remaining(self):
+        return self.expires_at - time.monotonic()
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def check(self):
+        if self.expired():
+            raise DeadlineExceeded(f"Request deadline of {self.timeout:g}s exceeded")
+
+    def cap(self, timeout):
+        """`timeout` shortened to the time left (never below a millisecond)"""
+        return max(0.001, min(timeout, self.remaining()))
+
+
+def estimate_tokens(text):
+    return (len(text) + 3) // 4
+
+
+class StreamMeter:
+    def __init__(self, smoothing=0.2):
+        self.smoothing = smoothing
+        self._typical = {}  # kind -> moving average of complete stream durations
+        self._lock = threading.Lock()
+        self.stats = {
+            "completed": 0,
+            "deadline_exceeded": 0,
+            "client_disconnects": 0,
+            "wasted_tokens": 0,
+            "seconds_saved": 0.0,
+        }
+
+    def _completed(self, kind, elapsed):
+        with self._lock:
+            self.stats["completed"] += 1
+            previous = self._typical.get(kind)
+            self._typical[kind] = elapsed if previous is None else previous + self.smoothing * (elapsed - previous)
+
+    def _aborted(self, kind, reason, tokens, elapsed):
+        with self._lock:
+            self.stats[reason] += 1
+            self.stats["wasted_tokens"] += tokens
+            self.stats["seconds_saved"] += max(0.0, self._typical.get(kind, 0.0) - elapsed)
+
+    def guard(self, chunks, kind=None, deadline=None):
+        """Pass `chunks` through, enforcing `deadline` and closing the upstream on abort"""
+        start = time.monotonic()
+        tokens = 0
+        reason = None
+        try:
+            for text in chunks:
+                tokens += estimate_tokens(text)
+                if deadline is not None:
+                    deadline.check()
+                yield text
+        except DeadlineExceeded:
+            reason = "deadline_exceeded"
+            raise
+        except GeneratorExit:
+            reason = "client_disconnects"
+            raise
+        else:
+            self._completed(kind, time.monotonic() - start)
+        finally:
+            if reason is not None:
+                self._aborted(kind, reason, tokens, time.monotonic() - start)
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+
+    async def aguard(self, chunks, kind=None, deadline=None):
+        """Async counterpart of guard; ASGI disconnects arrive as cancellation"""
+        start = time.monotonic()
+        tokens = 0
+        reason = None
+        try:
+            async for text in chunks:
+                tokens += estimate_tokens(text)
+                if deadline is not None:
+                    deadline.check()
+                yield text
+        except DeadlineExceeded:
+            reason = "deadline_exceeded"
+            raise
+        except (GeneratorExit, asyncio.CancelledError):
+            reason = "client_disconnects"
+            raise
+        else:
+            self._completed(kind, time.monotonic() - start)
+        finally:
+            if reason is not None:
+                self._aborted(kind, reason, tokens, time.monotonic() - start)
+            aclose = getattr(chunks, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    def snapshot(self):
+        with self._lock:
+            return {**self.stats, "seconds_saved": round(self.stats["seconds_saved"], 3)}
+
+
+_meter = StreamMeter()
+
+
+def get_meter():
+    return _meter
+
+
+def deadline_stats():
+    return _meter.snapshot()
@@ -1,22 +1,80 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
+"""
+Firebase app and Firestore client, created lazily once per process.
+
+Nothing here runs at import time. The settings module, management commands and
+worker boot therefore don't pay for parsing the service account key or opening
+gRPC channels unless they actually talk to Firebase.
+
+- get_firebase_app() initializes the default Firebase app from the GOOGLE_*
+  environment variables on first use. Pass it as `app=` to firebase_admin.auth
+  calls.
+- get_firestore() returns this process's Firestore client.
+
+gRPC channels don't survive fork(). A forked child, such as a gunicorn worker
+or a multiprocessing pool process, drops the inherited client and creates its
+own the first time it asks. The client is built directly rather than through
+firebase_admin.firestore.client(). That function caches one client per app, so
+the child would get the parent's client back.
+"""
 import os
+import threading
+
+_app = None
+_client = None
+_lock = threading.Lock()
+
+
+def firebase_credentials():
+    """Service account info from the GOOGLE_* environment variables"""
+    return {
+        "type": os.getenv("GOOGLE_TYPE"),
+        "project_id": os.getenv("GOOGLE_PROJECT_ID"),
+        "private_key_id": os.getenv("GOOGLE_PRIVATE_KEY_ID"),
+        "private_key": (os.getenv("GOOGLE_PRIVATE_KEY") or "").replace('\\n', '\n'),
+        "client_email": os.getenv("GOOGLE_CLIENT_EMAIL"),
+        "client_id": os.getenv("GOOGLE_CLIENT_ID"),
+        "auth_uri": os.getenv("GOOGLE_AUTH_URI"),
+        "token_uri": os.getenv("GOOGLE_TOKEN_URI"),
+        "auth_provider_x509_cert_url": os.getenv("GOOGLE_AUTH_PROVIDER_X509_CERT_URL"),
+        "client_x509_cert_url": os.getenv("GOOGLE_CLIENT_X509_CERT_URL"),
+        "universe_domain": os.getenv("GOOGLE_UNIVERSE_DOMAIN"),
+    }
+
+
+def get_firebase_app():
+    """The default Firebase app, initialized on first use"""
+    global _app
+    if _app is None:
+        import firebase_admin
+        from firebase_admin import credentials
+
+        with _lock:
+            if _app is None:
+                try:
+                    _app = firebase_admin.get_app()
+                except ValueError:
+                    _app = firebase_admin.initialize_app(credentials.Certificate(firebase_credentials()))
+    return _app
+
+
+def get_firestore():
+    """This process's Firestore client"""
+    global _client
+    if _client is None:
+        app = get_firebase_app()
+        from google.cloud import firestore
+
+        with _lock:
+            if _client is None:
+                _client = firestore.Client(project=app.project_id, credentials=app.credential.get_credential())
+    return _client
+
+
+def _reset_after_fork():
+    global _client, _lock
+    _client = None
+    # The parent may have forked while another thread held the lock
+    _lock = threading.Lock()
 
-firebase_credentials = {
-    "type": os.getenv("GOOGLE_TYPE"),
-    "project_id": os.getenv("GOOGLE_PROJECT_ID"),
-    "private_key_id": os.getenv("GOOGLE_PRIVATE_KEY_ID"),
-    "private_key": os.getenv("GOOGLE_PRIVATE_KEY").replace('\\n', '\n'),
-    "client_email": os.getenv("GOOGLE_CLIENT_EMAIL"),
-    "client_id": os.getenv("GOOGLE_CLIENT_ID"),
-    "auth_uri": os.getenv("GOOGLE_AUTH_URI"),
-    "token_uri": os.getenv("GOOGLE_TOKEN_URI"),
-    "auth_provider_x509_cert_url": os.getenv("GOOGLE_AUTH_PROVIDER_X509_CERT_URL"),
-    "client_x509_cert_url": os.getenv("GOOGLE_CLIENT_X509_CERT_URL"),
-    "universe_domain": os.getenv("GOOGLE_UNIVERSE_DOMAIN"),
-}
-
-cred = credentials.Certificate(firebase_credentials)
-# firebase_admin.initialize_app(cred)
-db = firestore.client()
 
+os.register_at_fork(after_in_child=_reset_after_fork)
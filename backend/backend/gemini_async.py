@@ -0,0 +1,90 @@
+"""
+Non-blocking Gemini client for the async (ASGI) views.
+
+google-generativeai only offers async calls over gRPC, while this project
+talks to Gemini over REST (it has to work through the hostel proxy). So
+this module calls the REST streamGenerateContent endpoint directly with
+httpx. It uses the same model, API key and network routes as
+backend.gemini_client. httpx is imported on the first call, so sync-only
+workers never load it.
+"""
+import asyncio
+import json
+import os
+import time
+import weakref
+
+from . import gemini_client
+
+API_BASE = gemini_client.API_BASE or "https://generativelanguage.googleapis.com"
+
+# httpx.AsyncClient is bound to the event loop it was first used on
+_clients = weakref.WeakKeyDictionary()
+
+
+def _get_client(route):
+    loop = asyncio.get_running_loop()
+    clients = _clients.setdefault(loop, {})
+    client = clients.get(route)
+    if client is None:
+        import httpx
+
+        proxy = gemini_client.PROXY_URL if route == gemini_client.ROUTE_PROXY else None
+        limits = httpx.Limits(max_connections=gemini_client.POOL_MAXSIZE, max_keepalive_connections=gemini_client.POOL_MAXSIZE)
+        client = httpx.AsyncClient(proxy=proxy, trust_env=False, timeout=httpx.Timeout(60.0, connect=10.0), limits=limits)
+        clients[route] = client
+    return client
+
+
+def _chunk_text(payload):
+    """Concatenate the text parts of the first candidate in one streamed chunk"""
+    candidates = payload.get("candidates") or []
+    if not candidates:
+        return ""
+    parts = (candidates[0].get("content") or {}).get("parts") or []
+    return "".join(part.get("text", "") for part in parts)
+
+
+async def stream_text(prompt, deadline=None):
+    """
+    Async counterpart of gemini_client.stream_text: yield text chunks as they arrive.
+
+    Shares gemini_client's RoutePolicy, so both clients learn from each other's
+    failures. Raises UpstreamUnavailable once the attempts are used up.
+    """
+    import httpx
+
+    url = f"{API_BASE}/v1beta/models/{gemini_client.MODEL_NAME}:streamGenerateContent"
+    params = {"alt": "sse", "key": os.getenv("GEMINI_API_KEY")}
+    body = {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+    policy = gemini_client.get_policy()
+
+    call = policy.call(deadline)
+    async for route in call:
+        received = False
+        start = time.monotonic()
+        timeout = httpx.Timeout(call.timeout(policy.attempt_timeout), connect=call.timeout(policy.connect_timeout))
+        try:
+            async with _get_client(route).stream("POST", url, params=params, json=body, timeout=timeout) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    text = _chunk_text(json.loads(line[5:]))
+                    if text:
+                        if not received:
+                            received = True
+                            call.succeeded(route, time.monotonic() - start)
+                        yield text
+            if not received:
+                call.succeeded(route, time.monotonic() - start)
+            return
+        except Exception as e:
+            if received or not call.failed(route, e):
+                raise
+    call.raise_unavailable()
+
+
+async def generate_text(prompt, deadline=None):
+    """Return the complete response text for `prompt`"""
+    return "".join([text async for text in stream_text(prompt, deadline)])
@@ -0,0 +1,169 @@
+"""
+Process-wide Gemini client shared by the quiz, practice and tutorials apps.
+
+Network detection (the hostel-proxy DNS check) runs once per process, and one
+GenerativeModel per network route is built once and reused by every request,
+so the underlying HTTP session and its connection pool are shared. Proxy
+settings live on each route's own session instead of os.environ, which keeps
+concurrent requests under a threaded server from racing on them. Retries,
+timeouts and route choice are governed by one process-wide RoutePolicy
+(see backend/resilience.py), shared with backend.gemini_async.
+"""
+import os
+import socket
+import threading
+import time
+
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from .resilience import RoutePolicy
+
+MODEL_NAME = "gemini-2.0-flash"
+PROXY_URL = "http://172.31.2.4:8080"
+POOL_MAXSIZE = int(os.getenv("GEMINI_POOL_MAXSIZE", 32))
+# Point at a local stand-in (see benchmarks/fake_gemini_server.py) for load tests
+API_BASE = os.getenv("GEMINI_API_BASE")
+
+ROUTE_DIRECT = "direct"
+ROUTE_PROXY = "proxy"
+
+_lock = threading.Lock()
+_default_route = None
+_models = {}
+_policy = None
+
+
+def is_proxy_needed():
+    """Check if we're likely in the hostel network that needs a proxy"""
+    # First check if the user explicitly wants to use a proxy via flag file
+    if os.path.exists("use_proxy.flag"):
+        return True
+
+    try:
+        hostname = socket.gethostname()
+        ip = socket.gethostbyname(hostname)
+        return ip.startswith("172.31.")
+    except Exception as e:
+        print(f"Error detecting network: {e}")
+        return False
+
+
+def default_route():
+    """The network route detected for this process (resolved once)"""
+    global _default_route
+    if _default_route is None:
+        with _lock:
+            if _default_route is None:
+                _default_route = ROUTE_PROXY if is_proxy_needed() else ROUTE_DIRECT
+                print(f"Gemini client using {_default_route} route")
+    return _default_route
+
+
+def routes():
+    """Routes in the order they should be tried: the detected one first"""
+    first = default_route()
+    return [first] + [route for route in (ROUTE_DIRECT, ROUTE_PROXY) if route != first]
+
+
+def get_policy():
+    """The process-wide retry / circuit breaker policy over routes()"""
+    global _policy
+    if _policy is None:
+        ordered = routes()
+        with _lock:
+            if _policy is None:
+                _policy = RoutePolicy(ordered, getattr(settings, "LLM_RESILIENCE", {}))
+    return _policy
+
+
+def policy_stats():
+    return _policy.snapshot() if _policy is not None else {}
+
+
+def _build_model(route):
+    # google-generativeai takes over a second to import, so it is loaded with the first model
+    import google.generativeai as genai
+    from google.ai import generativelanguage as glm
+
+    client_options = {"api_key": os.getenv("GEMINI_API_KEY")}
+    if API_BASE:
+        client_options["api_endpoint"] = API_BASE
+    client = glm.GenerativeServiceClient(transport="rest", client_options=client_options)
+    session = client.transport._session
+    # The route decides the proxy; skip per-request environment lookups
+    session.trust_env = False
+    if route == ROUTE_PROXY:
+        session.proxies = {"http": PROXY_URL, "https": PROXY_URL}
+    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=POOL_MAXSIZE))
+
+    model = genai.GenerativeModel(MODEL_NAME)
+    # GenerativeModel only builds the default client when _client is unset
+    model._client = client
+    return model
+
+
+def get_model(route=None):
+    """Return the shared GenerativeModel for `route` (the detected route by default)"""
+    route = route or default_route()
+    model = _models.get(route)
+    if model is None:
+        with _lock:
+            model = _models.get(route)
+            if model is None:
+                model = _build_model(route)
+                _models[route] = model
+    return model
+
+
+def warm_up():
+    """Resolve network settings up front so the first request doesn't pay for it"""
+    default_route()
+
+
+def stream_text(prompt, deadline=None):
+    """
+    Yield response text chunks for `prompt` as Gemini produces them.
+
+    Attempts follow get_policy(): a route is retried (or the other route tried)
+    only if it failed before producing any output, and a failure mid-stream is
+    raised to the caller. Raises UpstreamUnavailable once the attempts are used
+    up, or DeadlineExceeded if `deadline` ran out first.
+    """
+    policy = get_policy()
+    call = policy.call(deadline)
+    for route in call:
+        received = False
+        response = None
+        start = time.monotonic()
+        try:
+            response = get_model(route).generate_content(
+                prompt, stream=True, request_options={"timeout": call.timeout(policy.attempt_timeout)}
+            )
+            for chunk in response:
+                if not received:
+                    received = True
+                    call.succeeded(route, time.monotonic() - start)
+                yield chunk.text
+            if not received:
+                call.succeeded(route, time.monotonic() - start)
+            return
+        except Exception as e:
+            if received or not call.failed(route, e):
+                raise
+        finally:
+            # Runs on client disconnect too (GeneratorExit), so Gemini stops streaming to us
+            _close_response(response)
+    call.raise_unavailable()
+
+
+def _close_response(response):
+    """Best effort: drop the upstream HTTP stream behind a streaming response"""
+    iterator = getattr(response, "_iterator", None)
+    for target in (iterator, getattr(iterator, "_response", None)):
+        close = getattr(target, "close", None)
+        if callable(close):
+            try:
+                close()
+            except Exception:
+                pass
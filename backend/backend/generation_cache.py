@@ -0,0 +1,257 @@
+"""
+Content-addressed cache for LLM generations.
+
+Keys are built from the normalized request parameters, so "Photosynthesis",
+" photosynthesis " and "PHOTOSYNTHESIS" all map to the same entry. Two
+backends are available:
+
+- "memory": an in-process LRU, private to each worker (default)
+- "sqlite": a SQLite file shared by every worker on the host
+
+Both honour a TTL and evict the least recently used entries of a namespace
+once it holds more than MAX_ENTRIES. Configure through settings.GENERATION_CACHE.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_CONFIG = {
+    "BACKEND": "memory",
+    "PATH": "generation_cache.sqlite3",
+    "TTL": 3600,
+    "MAX_ENTRIES": 512,
+    "POOL_FACTOR": 1,
+}
+
+
+def normalize_text(value):
+    """Lowercase and collapse whitespace so equivalent inputs share a key"""
+    return " ".join(str(value).lower().split())
+
+
+def make_key(namespace, *parts):
+    """Build a stable, content-addressed key from the request parameters"""
+    normalized = json.dumps([normalize_text(part) for part in parts])
+    digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+    return f"{namespace}:{digest}"
+
+
+class InMemoryBackend:
+    """Thread-safe LRU dictionary with per-entry expiry"""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (time.time() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteBackend:
+    """
+    SQLite-backed store shared across worker processes.
+
+    Each thread (and each forked process) opens its own connection; WAL mode
+    lets readers proceed while another worker is writing. Every namespace
+    shares the table but keeps its own MAX_ENTRIES, so a busy namespace can't
+    evict another's entries.
+    """
+
+    def __init__(self, path, max_entries=512, namespace=""):
+        self.path = str(path)
+        self.max_entries = max_entries
+        self.namespace = namespace
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS generation_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                namespace TEXT NOT NULL DEFAULT ''
+            )
+            """
+        )
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(generation_cache)")]
+        if "namespace" not in columns:
+            # A file from before namespaces were stored: keys start with "<namespace>:"
+            try:
+                conn.execute("ALTER TABLE generation_cache ADD COLUMN namespace TEXT NOT NULL DEFAULT ''")
+            except sqlite3.OperationalError:
+                pass  # another worker added it first
+            conn.execute(
+                "UPDATE generation_cache SET namespace = substr(key, 1, instr(key, ':') - 1) WHERE namespace = ''"
+            )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS generation_cache_lru ON generation_cache (namespace, accessed_at)"
+        )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT value, expires_at FROM generation_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        now = time.time()
+        if expires_at < now:
+            conn.execute("DELETE FROM generation_cache WHERE key = ?", (key,))
+            return None
+        conn.execute(
+            "UPDATE generation_cache SET accessed_at = ? WHERE key = ?", (now, key)
+        )
+        return value
+
+    def set(self, key, value, ttl):
+        conn = self._connect()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO generation_cache (key, value, expires_at, accessed_at, namespace) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (key, value, now + ttl, now, self.namespace),
+        )
+        conn.execute(
+            "DELETE FROM generation_cache WHERE key IN ("
+            "SELECT key FROM generation_cache WHERE namespace = ? ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.namespace, self.max_entries),
+        )
+
+    def delete(self, key):
+        self._connect().execute("DELETE FROM generation_cache WHERE key = ?", (key,))
+
+    def clear(self):
+        self._connect().execute("DELETE FROM generation_cache WHERE namespace = ?", (self.namespace,))
+
+
+class GenerationCache:
+    """Namespaced JSON cache with hit/miss counters"""
+
+    def __init__(self, namespace, backend, ttl=3600, pool_factor=1):
+        self.namespace = namespace
+        self.backend = backend
+        self.ttl = ttl
+        self.pool_factor = max(1, int(pool_factor))
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def make_key(self, *parts):
+        return make_key(self.namespace, *parts)
+
+    def get(self, key, count=True):
+        """
+        Return the cached value for `key`, or None on a miss.
+
+        With count=False the lookup isn't counted; a caller that tries fallback keys
+        counts the outcome once with record().
+        """
+        raw = self.backend.get(key)
+        if count:
+            self.record(raw is not None)
+        return None if raw is None else json.loads(raw)
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def set(self, key, value, ttl=None):
+        self.backend.set(key, json.dumps(value), self.ttl if ttl is None else ttl)
+
+    def delete(self, key):
+        self.backend.delete(key)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def _get_config():
+    try:
+        from django.conf import settings
+        overrides = getattr(settings, "GENERATION_CACHE", {})
+    except Exception:
+        overrides = {}
+    return {**DEFAULT_CONFIG, **overrides}
+
+
+def _build_backend(config, namespace):
+    if config["BACKEND"] == "sqlite":
+        return SQLiteBackend(config["PATH"], max_entries=config["MAX_ENTRIES"], namespace=namespace)
+    return InMemoryBackend(max_entries=config["MAX_ENTRIES"])
+
+
+def get_cache(namespace):
+    """Return the process-wide cache for `namespace`, creating it on first use"""
+    with _caches_lock:
+        cache = _caches.get(namespace)
+        if cache is None:
+            config = _get_config()
+            cache = GenerationCache(
+                namespace,
+                _build_backend(config, namespace),
+                ttl=config["TTL"],
+                pool_factor=config["POOL_FACTOR"],
+            )
+            _caches[namespace] = cache
+        return cache
+
+
+def cache_stats():
+    """Hit/miss counters for every cache created in this process"""
+    with _caches_lock:
+        return {name: cache.stats() for name, cache in _caches.items()}
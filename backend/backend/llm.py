@@ -0,0 +1,265 @@
+"""
+LLM provider layer.
+
+The quiz, practice and tutorials utils ask a provider for text instead of
+calling Gemini directly. Two providers are available:
+
+- "gemini": backend.gemini_client (sync) and backend.gemini_async (ASGI) (default)
+- "fake": a deterministic local backend for load tests and offline runs
+
+The fake provider replays recorded responses, or synthesizes well-formed ones.
+It streams them at a simulated token rate after a simulated first-token
+latency. Latencies are drawn from a lognormal distribution seeded by the
+prompt, so a run is reproducible. Set RECORD_PATH to append every real Gemini
+response to a JSON Lines file the fake provider can replay.
+
+Every method takes a `kind` hint ("quiz", "practice" or "notes"). The fake
+provider uses it to pick a matching recording; Gemini ignores it. Every method
+also takes an optional request Deadline (see backend.deadlines). Each stream
+enforces it and closes the upstream when the request is aborted. Before a
+stream starts, the call waits for a slot in the LLM quota (see
+backend.ratelimit). Configure through settings.LLM_PROVIDER.
+"""
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from contextlib import aclosing, closing
+
+from django.conf import settings
+
+from . import gemini_async, gemini_client
+from .deadlines import get_meter
+from .ratelimit import get_scheduler
+
+DEFAULT_FAKE_CONFIG = {
+    "RECORDINGS": None,
+    "TOKENS_PER_SECOND": 80.0,
+    "FIRST_TOKEN_LATENCY": 0.4,  # median, seconds
+    "LATENCY_SIGMA": 0.3,
+    "CHUNK_TOKENS": 8,
+    "SEED": 0,
+}
+
+
+def prompt_key(prompt):
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+class Provider:
+    """Base class: subclasses yield raw chunks from _stream / _stream_async"""
+
+    name = None
+
+    def warm_up(self):
+        pass
+
+    def stream_text(self, prompt, kind=None, deadline=None):
+        scheduler = get_scheduler()
+        if scheduler is not None:
+            scheduler.acquire(deadline)
+        return get_meter().guard(self._stream(prompt, kind, deadline), kind, deadline)
+
+    def generate_text(self, prompt, kind=None, deadline=None):
+        return "".join(self.stream_text(prompt, kind, deadline))
+
+    async def stream_text_async(self, prompt, kind=None, deadline=None):
+        scheduler = get_scheduler()
+        if scheduler is not None:
+            await scheduler.acquire_async(deadline)
+        async with aclosing(get_meter().aguard(self._stream_async(prompt, kind, deadline), kind, deadline)) as chunks:
+            async for text in chunks:
+                yield text
+
+    async def generate_text_async(self, prompt, kind=None, deadline=None):
+        return "".join([text async for text in self.stream_text_async(prompt, kind, deadline)])
+
+
+class GeminiProvider(Provider):
+    name = "gemini"
+
+    def warm_up(self):
+        gemini_client.warm_up()
+
+    def _stream(self, prompt, kind, deadline):
+        return gemini_client.stream_text(prompt, deadline)
+
+    def _stream_async(self, prompt, kind, deadline):
+        return gemini_async.stream_text(prompt, deadline)
+
+
+class RecordingProvider:
+    """Wraps another provider and appends each complete response to a JSON Lines file"""
+
+    def __init__(self, inner, path):
+        self.inner = inner
+        self.name = inner.name
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _record(self, prompt, kind, text):
+        if not text:
+            return
+        line = json.dumps({"kind": kind, "prompt": prompt_key(prompt), "text": text})
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def warm_up(self):
+        self.inner.warm_up()
+
+    def stream_text(self, prompt, kind=None, deadline=None):
+        parts = []
+        with closing(self.inner.stream_text(prompt, kind, deadline)) as chunks:
+            for text in chunks:
+                parts.append(text)
+                yield text
+        self._record(prompt, kind, "".join(parts))
+
+    def generate_text(self, prompt, kind=None, deadline=None):
+        return "".join(self.stream_text(prompt, kind, deadline))
+
+    async def stream_text_async(self, prompt, kind=None, deadline=None):
+        parts = []
+        async with aclosing(self.inner.stream_text_async(prompt, kind, deadline)) as chunks:
+            async for text in chunks:
+                parts.append(text)
+                yield text
+        self._record(prompt, kind, "".join(parts))
+
+    async def generate_text_async(self, prompt, kind=None, deadline=None):
+        return "".join([text async for text in self.stream_text_async(prompt, kind, deadline)])
+
+
+def load_recordings(path):
+    """Read a JSON Lines recording file into ({prompt_key: text}, {kind: [text, ...]})"""
+    by_prompt, by_kind = {}, {}
+    if not path:
+        return by_prompt, by_kind
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get("prompt"):
+                by_prompt[record["prompt"]] = record["text"]
+            by_kind.setdefault(record.get("kind"), []).append(record["text"])
+    return by_prompt, by_kind
+
+
+def synthesize(prompt, kind, rng):
+    """Build a plausible response for `kind` when there is no recording to replay"""
+    if kind in ("quiz", "practice"):
+        match = re.search(r"(\d+) multiple-choice", prompt)
+        count = int(match.group(1)) if match else 10
+        levels = ["Beginner", "Intermediate", "Advanced"]
+        questions = []
+        for i in range(count):
+            answer = rng.choice("abcd")
+            questions.append({
+                "question": f"Sample question {i + 1}: which option is correct?",
+                "options": {key: f"Option {key.upper()}" for key in "abcd"},
+                "difficulty": levels[min(i * len(levels) // count, len(levels) - 1)],
+                "tags": ["sample", f"set {i % 3 + 1}"],
+                "correct_answer": answer,
+                "attempted_option": "",
+                "hints": f"The answer is not {'a' if answer != 'a' else 'b'}",
+                "solution": f"Option {answer.upper()} is correct.",
+            })
+        return "```json\n" + json.dumps(questions, indent=2) + "\n```"
+
+    sections = []
+    for i in range(6):
+        words = " ".join(rng.choice(["the", "topic", "explains", "key", "idea", "example", "student", "notes"])
+                         for _ in range(60))
+        sections.append(f"## Section {i + 1}\n\n- {words.capitalize()}.\n- Example {i + 1}.\n")
+    return "# Notes\n\n" + "\n".join(sections)
+
+
+def split_tokens(text):
+    """Approximate tokens as words with their surrounding whitespace; joins back to `text`"""
+    return re.findall(r"\s*\S+\s*", text) or [text]
+
+
+class FakeProvider(Provider):
+    name = "fake"
+
+    def __init__(self, config=None):
+        config = {**DEFAULT_FAKE_CONFIG, **(config or {})}
+        self.tokens_per_second = config["TOKENS_PER_SECOND"]
+        self.first_token_latency = config["FIRST_TOKEN_LATENCY"]
+        self.latency_sigma = config["LATENCY_SIGMA"]
+        self.chunk_tokens = config["CHUNK_TOKENS"]
+        self.seed = config["SEED"]
+        self._by_prompt, self._by_kind = load_recordings(config["RECORDINGS"])
+
+    def _plan(self, prompt, kind):
+        """Return (first-token delay, per-chunk delay, chunks) for `prompt`"""
+        key = prompt_key(prompt)
+        rng = random.Random(f"{self.seed}:{key}")
+        text = self._by_prompt.get(key)
+        if text is None and self._by_kind.get(kind):
+            recordings = self._by_kind[kind]
+            text = recordings[rng.randrange(len(recordings))]
+        if text is None:
+            text = synthesize(prompt, kind, rng)
+
+        tokens = split_tokens(text)
+        chunks = ["".join(tokens[i:i + self.chunk_tokens]) for i in range(0, len(tokens), self.chunk_tokens)]
+        first = rng.lognormvariate(0, self.latency_sigma) * self.first_token_latency if self.first_token_latency else 0
+        per_chunk = self.chunk_tokens / self.tokens_per_second if self.tokens_per_second else 0
+        return first, per_chunk, chunks
+
+    @staticmethod
+    def _delay(seconds, deadline):
+        """Like a real upstream, give up waiting once the deadline has passed"""
+        if deadline is not None and deadline.remaining() < seconds:
+            return max(0.0, deadline.remaining()), True
+        return seconds, False
+
+    def _stream(self, prompt, kind, deadline):
+        first, per_chunk, chunks = self._plan(prompt, kind)
+        for i, chunk in enumerate(chunks):
+            seconds, expired = self._delay(per_chunk if i else first, deadline)
+            time.sleep(seconds)
+            if expired:
+                deadline.check()
+            yield chunk
+
+    async def _stream_async(self, prompt, kind, deadline):
+        first, per_chunk, chunks = self._plan(prompt, kind)
+        for i, chunk in enumerate(chunks):
+            seconds, expired = self._delay(per_chunk if i else first, deadline)
+            await asyncio.sleep(seconds)
+            if expired:
+                deadline.check()
+            yield chunk
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def build_provider(config):
+    backend = config.get("BACKEND", "gemini")
+    if backend == "fake":
+        provider = FakeProvider(config.get("FAKE"))
+    elif backend == "gemini":
+        provider = GeminiProvider()
+    else:
+        raise ValueError(f"Unknown LLM provider: {backend}")
+    if config.get("RECORD_PATH"):
+        provider = RecordingProvider(provider, config["RECORD_PATH"])
+    return provider
+
+
+def get_provider():
+    """Process-wide provider configured by settings.LLM_PROVIDER"""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = build_provider(getattr(settings, "LLM_PROVIDER", {}))
+    return _provider
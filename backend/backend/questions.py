@@ -0,0 +1,190 @@
+"""
+Extraction and validation of generated questions.
+
+Model output is a JSON array of question objects, usually wrapped in a
+markdown fence and sometimes surrounded by prose. extract_json_array finds the
+array with one linear search and decodes it with one raw_decode call, without
+stripping fences or re-parsing. If the array is truncated or malformed, its
+objects are decoded one at a time, so every complete object is kept. Each object
+is validated once into a Question. Questions travel through caches and
+single-flight as compact rows and become dicts only in the API response.
+"""
+import hashlib
+import json
+import re
+
+from .streaming import JSONArrayStream
+
+OPTION_KEYS = ("a", "b", "c", "d")
+
+# An opening bracket followed by an object (or an empty array), so "[Note]" in prose is skipped
+_ARRAY_START = re.compile(r"\[\s*[{\]]")
+_SEPARATORS = re.compile(r"[\s,]*")
+_decoder = json.JSONDecoder()
+
+
+def extract_json_array(text):
+    """Return the objects of the first JSON array of objects in `text`, or []"""
+    if not text:
+        return []
+    match = _ARRAY_START.search(text)
+    if match is None:
+        return []
+    try:
+        value, _ = _decoder.raw_decode(text, match.start())
+    except json.JSONDecodeError:
+        return _salvage(text, match.start() + 1)
+    return [item for item in value if isinstance(item, dict)]
+
+
+def _salvage(text, pos):
+    """Decode a truncated or malformed array's objects one by one from `pos`"""
+    objects = []
+    while True:
+        pos = _SEPARATORS.match(text, pos).end()
+        if pos >= len(text) or text[pos] != "{":
+            return objects
+        try:
+            obj, pos = _decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            # Let the character scanner skip the broken object and keep any after it
+            objects.extend(JSONArrayStream().feed("[" + text[pos:]))
+            return objects
+        objects.append(obj)
+
+
+def _text(value):
+    return value.strip() if isinstance(value, str) else ""
+
+
+DIFFICULTIES = {level.lower(): level for level in ("Beginner", "Intermediate", "Advanced")}
+
+
+class Question:
+    """
+    One validated multiple-choice question.
+
+    Options are a tuple in "a".."d" order. Instances are treated as immutable.
+    They compare and hash by content (text, options and correct answer), so
+    per-attempt fields such as attempted_option never affect identity.
+    """
+
+    __slots__ = ("text", "options", "correct_answer", "difficulty", "tags", "hints", "solution", "_content_hash")
+
+    def __init__(self, text, options, correct_answer, difficulty="", tags=(), hints="", solution=""):
+        self.text = text
+        self.options = options
+        self.correct_answer = correct_answer
+        self.difficulty = difficulty
+        self.tags = tags
+        self.hints = hints
+        self.solution = solution
+        self._content_hash = None
+
+    @classmethod
+    def from_dict(cls, obj):
+        """
+        Validate a question in the API / model JSON shape; returns None if it isn't usable.
+
+        A usable question has text, four options and a correct answer that is one of
+        the option keys. Options given as a list are mapped to "a".."d", and
+        difficulty is normalized to Beginner, Intermediate, Advanced or "".
+        """
+        if not isinstance(obj, dict):
+            return None
+        text = _text(obj.get("question"))
+        options = obj.get("options")
+        if isinstance(options, list):
+            options = dict(zip(OPTION_KEYS, options))
+        if not text or not isinstance(options, dict):
+            return None
+        options = {str(key).strip().lower(): value for key, value in options.items()}
+        try:
+            values = tuple(str(options[key]) for key in OPTION_KEYS)
+        except KeyError:
+            return None
+        correct_answer = _text(obj.get("correct_answer")).lower()
+        if correct_answer not in OPTION_KEYS:
+            return None
+
+        tags = obj.get("tags") or ()
+        if isinstance(tags, str):
+            tags = (tags,)
+        return cls(
+            text,
+            values,
+            correct_answer,
+            DIFFICULTIES.get(_text(obj.get("difficulty")).lower(), ""),
+            tuple(str(tag) for tag in tags),
+            _text(obj.get("hints")),
+            _text(obj.get("solution")),
+        )
+
+    @classmethod
+    def from_row(cls, row):
+        """Inverse of to_row; trusted input, so nothing is re-validated"""
+        if isinstance(row, dict):
+            return cls.from_dict(row)
+        text, options, correct_answer, difficulty, tags, hints, solution = row
+        return cls(text, tuple(options), correct_answer, difficulty, tuple(tags), hints, solution)
+
+    def to_row(self):
+        """Compact JSON-serializable form for caches and single-flight results"""
+        return [self.text, list(self.options), self.correct_answer, self.difficulty,
+                list(self.tags), self.hints, self.solution]
+
+    def to_dict(self):
+        """The JSON shape the API returns"""
+        return {
+            "question": self.text,
+            "options": dict(zip(OPTION_KEYS, self.options)),
+            "difficulty": self.difficulty,
+            "tags": list(self.tags),
+            "correct_answer": self.correct_answer,
+            "attempted_option": "",
+            "hints": self.hints,
+            "solution": self.solution,
+        }
+
+    @property
+    def content_hash(self):
+        """Stable 128-bit hex digest of the question's identity"""
+        if self._content_hash is None:
+            canonical = json.dumps([self.text, self.options, self.correct_answer], ensure_ascii=False)
+            self._content_hash = hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+        return self._content_hash
+
+    def _key(self):
+        return (self.text, self.options, self.correct_answer)
+
+    def __eq__(self, other):
+        if not isinstance(other, Question):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return f"Question({self.text[:40]!r}, answer={self.correct_answer!r})"
+
+
+def validate_questions(objects):
+    return [question for question in map(Question.from_dict, objects) if question is not None]
+
+
+def parse_questions(text):
+    """Extract and validate the questions in a raw model response"""
+    return validate_questions(extract_json_array(text))
+
+
+def to_rows(questions):
+    return [question.to_row() for question in questions]
+
+
+def from_rows(rows):
+    return [question for question in map(Question.from_row, rows) if question is not None]
+
+
+def to_dicts(questions):
+    return [question.to_dict() for question in questions]
@@ -0,0 +1,424 @@
+"""
+Rate limiting for the generation endpoints and scheduling of LLM calls.
+
+There are two token buckets:
+
+- a per-user bucket, charged by the rate_limited view decorator for every
+  generation request. When it is empty the request gets a 429 with a
+  Retry-After header before any work is done.
+- a global bucket for the LLM quota, charged by the provider layer (see
+  backend.llm) only when a request actually calls the model. Cache hits,
+  question bank hits and single-flight followers never spend it, so cheap
+  responses keep flowing when the quota is saturated.
+
+When the global bucket is empty, LLM calls wait in a fair-share queue. Each
+user's calls are tagged with start-time fair queueing, so a user with ten
+queued calls can't starve a user with one. A call that can't be served
+within MAX_WAIT seconds, or within its request Deadline, raises RateLimited.
+Background work such as the question bank warmer never queues: it only runs
+while the bucket holds more than BACKGROUND_RESERVE of its burst.
+
+Buckets live in process memory ("memory") or in a SQLite file shared by every
+worker on the host ("sqlite"). The queue itself is per worker. Configure
+through settings.RATE_LIMIT.
+"""
+import asyncio
+import contextvars
+import math
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+
+DEFAULT_CONFIG = {
+    "ENABLED": True,
+    "BACKEND": "memory",
+    "PATH": "ratelimit.sqlite3",
+    "USER_PER_MINUTE": 20,
+    "USER_BURST": 10,
+    "LLM_PER_MINUTE": 60,
+    "LLM_BURST": 15,
+    "MAX_QUEUE": 64,
+    "MAX_WAIT": 10.0,
+    "BACKGROUND_RESERVE": 0.5,
+}
+POLL_INTERVAL = 0.05
+GLOBAL_KEY = "llm"
+ANONYMOUS = "anonymous"
+BACKGROUND = "background"
+
+# The user an LLM call is made for; set by rate_limited, read by the scheduler
+current_user = contextvars.ContextVar("rate_limit_user", default=ANONYMOUS)
+
+
+class RateLimited(Exception):
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self):
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class MemoryBuckets:
+    """Token buckets in process memory; idle (full) buckets are pruned"""
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, capacity, cost=1, reserve=0):
+        """
+        Take `cost` tokens if at least cost + reserve are available.
+
+        Returns 0 on success, otherwise the seconds until enough tokens will be.
+        """
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            if tokens >= cost + reserve:
+                self._buckets[key] = (tokens - cost, now)
+                return 0.0
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now, rate, capacity)
+            return (cost + reserve - tokens) / rate
+
+    def _prune(self, now, rate, capacity):
+        full_after = capacity / rate
+        for key, (_, updated) in list(self._buckets.items()):
+            if now - updated >= full_after:
+                del self._buckets[key]
+
+    def level(self, key, rate, capacity):
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            return min(capacity, tokens + (now - updated) * rate)
+
+
+class SQLiteBuckets:
+    """Token buckets in a SQLite file shared across worker processes"""
+
+    def __init__(self, path, idle_ttl=3600):
+        self.path = str(path)
+        self.idle_ttl = idle_ttl
+        self._local = threading.local()
+        self._connect().execute(
+            """
+            CREATE TABLE IF NOT EXISTS rate_buckets (
+                key TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _level(self, conn, key, rate, capacity, now):
+        row = conn.execute("SELECT tokens, updated_at FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return capacity
+        tokens, updated = row
+        return min(capacity, tokens + max(0.0, now - updated) * rate)
+
+    def take(self, key, rate, capacity, cost=1, reserve=0):
+        conn = self._connect()
+        now = time.time()
+        # IMMEDIATE takes the write lock up front, so two workers can't spend the same tokens
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            tokens = self._level(conn, key, rate, capacity, now)
+            taken = tokens >= cost + reserve
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                (key, tokens - cost if taken else tokens, now),
+            )
+            conn.execute("DELETE FROM rate_buckets WHERE updated_at < ?", (now - self.idle_ttl,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return 0.0 if taken else (cost + reserve - tokens) / rate
+
+    def level(self, key, rate, capacity):
+        return self._level(self._connect(), key, rate, capacity, time.time())
+
+
+class _Ticket:
+    __slots__ = ("user", "tag")
+
+    def __init__(self, user, tag):
+        self.user = user
+        self.tag = tag
+
+
+class QuotaScheduler:
+    def __init__(self, buckets, config=None):
+        config = {**DEFAULT_CONFIG, **(config or {})}
+        self.buckets = buckets
+        self.user_rate = config["USER_PER_MINUTE"] / 60
+        self.user_burst = config["USER_BURST"]
+        self.llm_rate = config["LLM_PER_MINUTE"] / 60
+        self.llm_burst = config["LLM_BURST"]
+        self.max_queue = config["MAX_QUEUE"]
+        self.max_wait = config["MAX_WAIT"]
+        self.background_reserve = config["BACKGROUND_RESERVE"] * config["LLM_BURST"]
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._finish = {}  # user -> virtual finish tag of their latest queued call
+        self._virtual = 0.0
+        self.stats = {
+            "requests_allowed": 0,
+            "requests_limited": 0,
+            "llm_granted": 0,
+            "llm_queued": 0,
+            "llm_rejected": 0,
+            "background_skipped": 0,
+            "queue_wait_seconds": 0.0,
+            "max_queue_depth": 0,
+        }
+
+    def _count(self, name, amount=1):
+        with self._cond:
+            self.stats[name] += amount
+
+    def check_user(self, user):
+        """Charge `user`'s request bucket; raises RateLimited if it is empty"""
+        wait = self.buckets.take(f"user:{user}", self.user_rate, self.user_burst)
+        if wait:
+            self._count("requests_limited")
+            raise RateLimited("Too many requests, please slow down", wait)
+        self._count("requests_allowed")
+
+    def _take_llm(self, reserve=0):
+        return self.buckets.take(GLOBAL_KEY, self.llm_rate, self.llm_burst, reserve=reserve)
+
+    def _enqueue(self, user):
+        """Start-time fair queueing: a user's next call is tagged one slot after their previous one"""
+        tag = max(self._virtual, self._finish.get(user, 0.0)) + 1
+        self._finish[user] = tag
+        ticket = _Ticket(user, tag)
+        self._waiting.append(ticket)
+        self.stats["llm_queued"] += 1
+        self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], len(self._waiting))
+        return ticket
+
+    def _dequeue(self, ticket, granted):
+        self._waiting.remove(ticket)
+        if granted:
+            self._virtual = ticket.tag
+            self.stats["llm_granted"] += 1
+            if len(self._finish) > 1000:
+                self._finish = {user: tag for user, tag in self._finish.items() if tag > self._virtual}
+        self._cond.notify_all()
+
+    def _is_head(self, ticket):
+        return min(self._waiting, key=lambda waiting: waiting.tag) is ticket
+
+    def _reject(self, ticket, start):
+        position = sorted(self._waiting, key=lambda waiting: waiting.tag).index(ticket)
+        self._dequeue(ticket, False)
+        self.stats["llm_rejected"] += 1
+        self.stats["queue_wait_seconds"] += time.monotonic() - start
+        raise RateLimited("The service is busy, please try again shortly", (position + 1) / self.llm_rate)
+
+    def _admit(self, user, deadline):
+        """Fast path and queue admission; returns (ticket, give_up_at) or None if granted at once"""
+        if user == BACKGROUND:
+            if self._take_llm(reserve=self.background_reserve):
+                self._count("background_skipped")
+                raise RateLimited("LLM quota reserved for interactive requests", 0)
+            self._count("llm_granted")
+            return None
+        with self._cond:
+            queued = bool(self._waiting)
+        # Bucket round trips (SQLite ones can wait on another worker's lock) never hold _cond
+        if not queued and not self._take_llm():
+            self._count("llm_granted")
+            return None
+        with self._cond:
+            if len(self._waiting) >= self.max_queue:
+                self.stats["llm_rejected"] += 1
+                raise RateLimited("The service is busy, please try again shortly", len(self._waiting) / self.llm_rate)
+            ticket = self._enqueue(user)
+        budget = self.max_wait if deadline is None else min(self.max_wait, deadline.remaining())
+        return ticket, time.monotonic() + budget
+
+    def acquire(self, deadline=None):
+        """Wait for an LLM call slot for the current user; raises RateLimited if none comes in time"""
+        admitted = self._admit(current_user.get(), deadline)
+        if admitted is None:
+            return
+        ticket, give_up_at = admitted
+        start = time.monotonic()
+        while True:
+            wait = self._step(ticket, give_up_at, start)
+            if not wait:
+                return
+            with self._cond:
+                self._cond.wait(wait)  # woken early when a call leaves the queue
+
+    def _step(self, ticket, give_up_at, start):
+        """
+        One poll of a queued ticket: 0 once granted, else how long to wait; raises
+        RateLimited past give_up_at. Only the head of the queue tries the bucket, and
+        it does so without holding _cond.
+        """
+        with self._cond:
+            head = self._is_head(ticket)
+        wait = self._take_llm() if head else POLL_INTERVAL
+        with self._cond:
+            if not wait:
+                self._dequeue(ticket, True)
+                self.stats["queue_wait_seconds"] += time.monotonic() - start
+                return 0
+            left = give_up_at - time.monotonic()
+            if wait > left:
+                self._reject(ticket, start)
+            return min(wait, left)
+
+    def _abandon(self, ticket):
+        with self._cond:
+            if ticket in self._waiting:
+                self._dequeue(ticket, False)
+
+    async def acquire_async(self, deadline=None):
+        """
+        Async counterpart of acquire; polls instead of blocking the event loop.
+
+        Each bucket step runs in a worker thread: SQLite buckets can wait up to
+        their busy timeout for another worker's write lock.
+        """
+        admitted = await sync_to_async(self._admit, thread_sensitive=False)(current_user.get(), deadline)
+        if admitted is None:
+            return
+        ticket, give_up_at = admitted
+        start = time.monotonic()
+        try:
+            while True:
+                wait = await sync_to_async(self._step, thread_sensitive=False)(ticket, give_up_at, start)
+                if not wait:
+                    return
+                await asyncio.sleep(min(wait, POLL_INTERVAL))
+        except asyncio.CancelledError:
+            # Not awaited, so a second cancellation can't leave the ticket stuck in the queue
+            asyncio.get_running_loop().run_in_executor(None, self._abandon, ticket)
+            raise
+
+    def snapshot(self):
+        with self._cond:
+            stats = dict(self.stats)
+            depth = len(self._waiting)
+        return {
+            **stats,
+            "queue_wait_seconds": round(stats["queue_wait_seconds"], 3),
+            "queue_depth": depth,
+            "llm_tokens": round(self.buckets.level(GLOBAL_KEY, self.llm_rate, self.llm_burst), 2),
+        }
+
+
+def client_id(request):
+    """The Firebase uid verified by the auth middleware, else the client address"""
+    user = getattr(request, "firebaseUser", None)
+    if isinstance(user, dict) and user.get("uid"):
+        return user["uid"]
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def too_many_requests(error, data=None):
+    response = JsonResponse(
+        data or {"error": str(error), "retry_after": round(error.retry_after, 1)}, status=429
+    )
+    response["Retry-After"] = error.retry_after_header
+    return response
+
+
+def _charge(scheduler, user):
+    try:
+        scheduler.check_user(user)
+    except RateLimited as e:
+        return too_many_requests(e)
+    return None
+
+
+def _check(request):
+    user = client_id(request)
+    current_user.set(user)
+    scheduler = get_scheduler()
+    if scheduler is None:
+        return None
+    return _charge(scheduler, user)
+
+
+async def _check_async(request):
+    """_check for async views; the bucket is charged in a worker thread, off the event loop"""
+    user = client_id(request)
+    current_user.set(user)
+    scheduler = get_scheduler()
+    if scheduler is None:
+        return None
+    return await sync_to_async(_charge, thread_sensitive=False)(scheduler, user)
+
+
+def rate_limited(view, methods=("POST",)):
+    """
+    Charge the caller's request bucket before running `view` (sync or async).
+
+    Only `methods` are charged; any other request goes straight to the view,
+    which rejects it with its own 405 without spending quota.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return await view(request, *args, **kwargs)
+            return await _check_async(request) or await view(request, *args, **kwargs)
+    else:
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return view(request, *args, **kwargs)
+            return _check(request) or view(request, *args, **kwargs)
+    return wrapper
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Process-wide scheduler, or None if disabled in settings.RATE_LIMIT"""
+    global _scheduler
+    config = {**DEFAULT_CONFIG, **getattr(settings, "RATE_LIMIT", {})}
+    if not config["ENABLED"]:
+        return None
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                if config["BACKEND"] == "sqlite":
+                    buckets = SQLiteBuckets(config["PATH"])
+                else:
+                    buckets = MemoryBuckets()
+                _scheduler = QuotaScheduler(buckets, config)
+    return _scheduler
+
+
+def rate_limit_stats():
+    return _scheduler.snapshot() if _scheduler is not None else {}
@@ -0,0 +1,272 @@
+"""
+Retries and circuit breaking for calls to the LLM upstream.
+
+Each network route (direct or through the hostel proxy) gets its own circuit
+breaker. After FAILURE_THRESHOLD consecutive connection-level failures, the
+route's circuit opens and the route is skipped for RESET_TIMEOUT seconds. After
+that, a single probe request decides whether it closes again. The route that
+last succeeded is tried first, so the process remembers which network works
+instead of relearning it on every request. When every circuit is open, calls
+fail immediately instead of waiting on timeouts.
+
+A call makes at most MAX_ATTEMPTS attempts within TOTAL_TIMEOUT seconds. Each
+attempt is bounded by ATTEMPT_TIMEOUT (connect and read) and CONNECT_TIMEOUT.
+Switching to another route happens immediately. Retrying the same route waits
+a full-jitter exponential backoff first. A request Deadline passed to call()
+shortens all of these to the time the request has left. Errors that aren't
+about reachability, such as a 400 or a safety block, are raised at once and
+don't count against the route. Configure through settings.LLM_RESILIENCE.
+"""
+import asyncio
+import random
+import statistics
+import threading
+import time
+from collections import deque
+
+from .deadlines import DeadlineExceeded
+
+DEFAULT_CONFIG = {
+    "ATTEMPT_TIMEOUT": 30.0,
+    "CONNECT_TIMEOUT": 5.0,
+    "TOTAL_TIMEOUT": 60.0,
+    "MAX_ATTEMPTS": 3,
+    "BACKOFF_BASE": 0.2,
+    "BACKOFF_MAX": 2.0,
+    "FAILURE_THRESHOLD": 3,
+    "RESET_TIMEOUT": 30.0,
+}
+
+_RETRYABLE_NAMES = ("Timeout", "Connect", "Transport", "Network", "Protocol", "Proxy", "Unavailable")
+
+
+class UpstreamUnavailable(Exception):
+    """Every attempt failed, or every route's circuit is open"""
+
+
+def is_retryable(exc):
+    """True for failures that say nothing about the request itself: network errors, 429 and 5xx"""
+    status = getattr(exc, "code", None)
+    if not isinstance(status, int):
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    if isinstance(exc, (ConnectionError, TimeoutError, OSError)):
+        return True
+    return any(name in type(exc).__name__ for name in _RETRYABLE_NAMES)
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, failure_threshold=3, reset_timeout=30.0, window=256):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_started = None
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.stats = {"successes": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    def allow(self):
+        """Whether a request may go out now; in half-open state only one probe at a time"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and now - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probe_started = None
+            # A probe that never reported back (e.g. the client went away) doesn't block forever
+            if self.state == self.HALF_OPEN and (
+                self._probe_started is None or now - self._probe_started >= self.reset_timeout
+            ):
+                self._probe_started = now
+                return True
+            self.stats["rejected"] += 1
+            return False
+
+    def record_success(self, latency=None):
+        with self._lock:
+            self.state = self.CLOSED
+            self._consecutive_failures = 0
+            self._probe_started = None
+            self.stats["successes"] += 1
+            if latency is not None:
+                self._latencies.append(latency)
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive_failures += 1
+            self.stats["failures"] += 1
+            if self.state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.stats["opened"] += 1
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_started = None
+
+    def snapshot(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            snapshot = {"state": self.state, "consecutive_failures": self._consecutive_failures, **self.stats}
+        if latencies:
+            snapshot["latency_ms"] = {
+                "p50": round(statistics.median(latencies) * 1000, 1),
+                "p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1),
+            }
+        return snapshot
+
+
+class RoutePolicy:
+    """Retry policy plus one circuit breaker per route; share one instance per upstream"""
+
+    def __init__(self, routes, config=None):
+        config = {**DEFAULT_CONFIG, **(config or {})}
+        self.attempt_timeout = config["ATTEMPT_TIMEOUT"]
+        self.connect_timeout = config["CONNECT_TIMEOUT"]
+        self.total_timeout = config["TOTAL_TIMEOUT"]
+        self.max_attempts = config["MAX_ATTEMPTS"]
+        self.backoff_base = config["BACKOFF_BASE"]
+        self.backoff_max = config["BACKOFF_MAX"]
+        self.routes = list(routes)
+        self.preferred = self.routes[0]
+        self.breakers = {
+            route: CircuitBreaker(route, config["FAILURE_THRESHOLD"], config["RESET_TIMEOUT"])
+            for route in self.routes
+        }
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "attempts": 0, "retries": 0, "fast_failures": 0, "unavailable": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def backoff(self, attempt):
+        """Full-jitter exponential backoff before retry number `attempt` (1-based)"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def pick(self, avoid=None):
+        """The first route whose circuit lets a request through; the preferred one first, `avoid` last"""
+        order = [self.preferred] + [route for route in self.routes if route != self.preferred]
+        if avoid is not None:
+            order = [route for route in order if route != avoid] + [avoid]
+        for route in order:
+            if self.breakers[route].allow():
+                return route
+        return None
+
+    def call(self, deadline=None):
+        self._count("calls")
+        return Call(self, deadline)
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+        return {
+            "preferred_route": self.preferred,
+            **stats,
+            "routes": {route: breaker.snapshot() for route, breaker in self.breakers.items()},
+        }
+
+
+class Call:
+    """
+    The attempts of one upstream call.
+
+        call = policy.call()
+        for route in call:          # or: async for route in call
+            try:
+                ...                 # call.succeeded(route, latency) once the first chunk arrives
+            except Exception as e:
+                if not call.failed(route, e):
+                    raise
+        call.raise_unavailable()
+    """
+
+    def __init__(self, policy, deadline=None):
+        self.policy = policy
+        self.deadline = deadline
+        self.started = time.monotonic()
+        self.done = False
+        self.last_error = None
+        self.attempts = 0
+
+    def _schedule(self):
+        """Yield (route, backoff) for each attempt; stops on success, budget exhaustion or open circuits"""
+        policy = self.policy
+        previous = None
+        for attempt in range(policy.max_attempts):
+            if self.done:
+                return
+            route = policy.pick(avoid=previous)
+            if route is None:
+                if attempt == 0:
+                    policy._count("fast_failures")
+                return
+            delay = policy.backoff(attempt) if route == previous else 0
+            if time.monotonic() - self.started + delay >= policy.total_timeout:
+                return
+            if self.deadline is not None and self.deadline.remaining() <= delay:
+                return
+            if attempt:
+                policy._count("retries")
+            policy._count("attempts")
+            self.attempts += 1
+            previous = route
+            yield route, delay
+
+    def timeout(self, timeout):
+        """`timeout` for one attempt, capped by the request deadline"""
+        return self.deadline.cap(timeout) if self.deadline is not None else timeout
+
+    def __iter__(self):
+        for route, delay in self._schedule():
+            if delay:
+                time.sleep(delay)
+            yield route
+
+    async def __aiter__(self):
+        for route, delay in self._schedule():
+            if delay:
+                await asyncio.sleep(delay)
+            yield route
+
+    def succeeded(self, route, latency=None):
+        """Record that `route` answered; it becomes the preferred route"""
+        self.done = True
+        self.policy.breakers[route].record_success(latency)
+        self.policy.preferred = route
+
+    def failed(self, route, error):
+        """Record a failed attempt; returns False if the error shouldn't be retried"""
+        self.last_error = error
+        if not is_retryable(error):
+            # The upstream answered, so the route itself is fine
+            self.policy.breakers[route].record_success()
+            self.done = True
+            return False
+        if self.deadline is not None and self.deadline.expired():
+            # Our own budget ran out, which says nothing about the route
+            return True
+        print(f"Error with {route} route (attempt {self.attempts}): {error}")
+        self.policy.breakers[route].record_failure()
+        return True
+
+    def raise_unavailable(self):
+        """Raise UpstreamUnavailable (or DeadlineExceeded) if the call never succeeded"""
+        if self.done:
+            return
+        if self.deadline is not None and self.deadline.expired():
+            raise DeadlineExceeded(f"Request deadline of {self.deadline.timeout:g}s exceeded") from self.last_error
+        self.policy._count("unavailable")
+        if self.last_error is None:
+            raise UpstreamUnavailable("LLM upstream unavailable: every route's circuit is open")
+        raise UpstreamUnavailable(
+            f"LLM upstream unavailable after {self.attempts} attempts: {self.last_error}"
+        ) from self.last_error
@@ -0,0 +1,27 @@
+"""
+Error responses shared by the sync and async views.
+
+Each view pair differs only in how it waits on generation, so both map a
+failure to the same response (or, for the NDJSON streams, the same "error"
+event) through these helpers.
+"""
+from django.http import JsonResponse
+
+from .deadlines import DeadlineExceeded
+from .ratelimit import RateLimited, too_many_requests
+
+
+def error_response(error, message=None):
+    """504 for a blown deadline, 429 for a rate limit, else 500 with `message` (default: the error)"""
+    if isinstance(error, DeadlineExceeded):
+        return JsonResponse({"error": str(error)}, status=504)
+    if isinstance(error, RateLimited):
+        return too_many_requests(error)
+    return JsonResponse({"error": message or str(error)}, status=500)
+
+
+def error_event(error, message=None):
+    """The final "error" event of a stream; a rate limit carries its retry_after"""
+    if isinstance(error, RateLimited):
+        return {"type": "error", "error": str(error), "retry_after": round(error.retry_after, 1)}
+    return {"type": "error", "error": message or str(error)}
@@ -11,32 +11,12 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 from pathlib import Path
-import firebase_admin
-from firebase_admin import credentials
-from firebase_admin import firestore
 from dotenv import load_dotenv
 load_dotenv()  
-import firebase_admin
 import os
 
-firebase_credentials = {
-    "type": os.getenv("GOOGLE_TYPE"),
-    "project_id": os.getenv("GOOGLE_PROJECT_ID"),
-    "private_key_id": os.getenv("GOOGLE_PRIVATE_KEY_ID"),
-    "private_key": os.getenv("GOOGLE_PRIVATE_KEY").replace('\\n', '\n'),
-    "client_email": os.getenv("GOOGLE_CLIENT_EMAIL"),
-    "client_id": os.getenv("GOOGLE_CLIENT_ID"),
-    "auth_uri": os.getenv("GOOGLE_AUTH_URI"),
-    "token_uri": os.getenv("GOOGLE_TOKEN_URI"),
-    "auth_provider_x509_cert_url": os.getenv("GOOGLE_AUTH_PROVIDER_X509_CERT_URL"),
-    "client_x509_cert_url": os.getenv("GOOGLE_CLIENT_X509_CERT_URL"),
-    "universe_domain": os.getenv("GOOGLE_UNIVERSE_DOMAIN"),
-}
-
-cred = credentials.Certificate(firebase_credentials)
-firebase_admin.initialize_app(cred)
-db = firestore.client()
-
+# Firebase and Firestore are initialized lazily, on first use in each process
+# (see backend/firebase_config.py)
 
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -102,6 +82,7 @@ CORS_ALLOW_HEADERS = [
     "content-type",
     "x-csrf-token",
     "x-requested-with",
+    "x-request-timeout",
 ]
 
 
@@ -122,6 +103,11 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'backend.wsgi.application'
+ASGI_APPLICATION = 'backend.asgi.application'
+
+# Serve create_quiz, create_practice_questions, create_notes and search_youtube with
+# their async views. Only enable this when running under an ASGI server (uvicorn).
+ASYNC_VIEWS = os.getenv("DJANGO_ASYNC_VIEWS", "false").lower() == "true"
 
 FIREBASE_ADMIN_CREDENTIAL = 'backend/userAuth/firebase-adminsdk.json'
 # Database
@@ -135,6 +121,123 @@ DATABASES = {
 }
 
 
+# Cache for LLM generations (see backend/generation_cache.py)
+# BACKEND is "memory" (per worker) or "sqlite" (shared by all workers on the host).
+# POOL_FACTOR > 1 generates a larger pool per key and serves random samples from it.
+# MAX_ENTRIES applies to each namespace (quiz, youtube) separately.
+GENERATION_CACHE = {
+    "BACKEND": os.getenv("GENERATION_CACHE_BACKEND", "memory"),
+    "PATH": os.getenv("GENERATION_CACHE_PATH", str(BASE_DIR / "generation_cache.sqlite3")),
+    "TTL": int(os.getenv("GENERATION_CACHE_TTL", 3600)),
+    "MAX_ENTRIES": int(os.getenv("GENERATION_CACHE_MAX_ENTRIES", 512)),
+    "POOL_FACTOR": int(os.getenv("GENERATION_CACHE_POOL_FACTOR", 1)),
+}
+
+# Generated notes, compressed and keyed by topic and prompt version
+# (see tutorials/notes_store.py). Set NOTES_STORE_BACKEND=sqlite to share them
+# between the workers on a host.
+NOTES_STORE = {
+    "BACKEND": os.getenv("NOTES_STORE_BACKEND", "memory"),
+    "PATH": os.getenv("NOTES_STORE_PATH", str(BASE_DIR / "notes_store.sqlite3")),
+    "MAX_BYTES": int(os.getenv("NOTES_STORE_MAX_MB", 32)) * 1024 * 1024,
+    "TTL": int(os.getenv("NOTES_STORE_TTL", 30 * 24 * 3600)),
+    "COMPRESSION_LEVEL": 6,
+}
+
+# YouTube search results, stored in the generation cache's "youtube" namespace
+# (see tutorials/youtube.py). Entries are served stale for STALE_TTL after TTL
+# while they are refreshed in the background.
+YOUTUBE_CACHE = {
+    "TTL": int(os.getenv("YOUTUBE_CACHE_TTL", 6 * 3600)),
+    "STALE_TTL": int(os.getenv("YOUTUBE_CACHE_STALE_TTL", 7 * 24 * 3600)),
+    "TIMEOUT": 15.0,
+    "REFRESH_WORKERS": 2,
+}
+
+# Near-duplicate topic matching for the quiz pools and notes (see backend/topic_index.py).
+# A topic whose similarity to an already generated one is at least THRESHOLD reuses
+# its generation; raise it if unrelated topics get merged.
+TOPIC_INDEX = {
+    "ENABLED": os.getenv("TOPIC_INDEX_ENABLED", "true").lower() == "true",
+    "DIM": 1024,
+    "CAPACITY": int(os.getenv("TOPIC_INDEX_CAPACITY", 4096)),
+    "THRESHOLD": float(os.getenv("TOPIC_INDEX_THRESHOLD", 0.83)),
+}
+
+# Single-flight coalescing of identical in-flight generations (see backend/singleflight.py)
+# Set LEASE_PATH to a SQLite file to also coalesce across worker processes.
+SINGLE_FLIGHT = {
+    "LEASE_PATH": os.getenv("SINGLE_FLIGHT_LEASE_PATH"),
+    "LEASE_TTL": 120,
+}
+
+# LLM backend for the generation endpoints (see backend/llm.py)
+# Set LLM_PROVIDER=fake to load-test or run offline without calling Gemini.
+LLM_PROVIDER = {
+    "BACKEND": os.getenv("LLM_PROVIDER", "gemini"),
+    "RECORD_PATH": os.getenv("LLM_RECORD_PATH"),
+    "FAKE": {
+        "RECORDINGS": os.getenv("LLM_FAKE_RECORDINGS"),
+        "TOKENS_PER_SECOND": float(os.getenv("LLM_FAKE_TOKENS_PER_SECOND", 80)),
+        "FIRST_TOKEN_LATENCY": float(os.getenv("LLM_FAKE_FIRST_TOKEN_LATENCY", 0.4)),
+        "LATENCY_SIGMA": float(os.getenv("LLM_FAKE_LATENCY_SIGMA", 0.3)),
+        "CHUNK_TOKENS": int(os.getenv("LLM_FAKE_CHUNK_TOKENS", 8)),
+        "SEED": int(os.getenv("LLM_FAKE_SEED", 0)),
+    },
+}
+
+# Retries and circuit breaking for Gemini calls (see backend/resilience.py)
+LLM_RESILIENCE = {
+    "ATTEMPT_TIMEOUT": float(os.getenv("LLM_ATTEMPT_TIMEOUT", 30)),
+    "CONNECT_TIMEOUT": float(os.getenv("LLM_CONNECT_TIMEOUT", 5)),
+    "TOTAL_TIMEOUT": float(os.getenv("LLM_TOTAL_TIMEOUT", 60)),
+    "MAX_ATTEMPTS": int(os.getenv("LLM_MAX_ATTEMPTS", 3)),
+    "BACKOFF_BASE": 0.2,
+    "BACKOFF_MAX": 2.0,
+    "FAILURE_THRESHOLD": int(os.getenv("LLM_FAILURE_THRESHOLD", 3)),
+    "RESET_TIMEOUT": float(os.getenv("LLM_RESET_TIMEOUT", 30)),
+}
+
+# Per-request time budgets for LLM-backed views; clients may ask for less with an
+# X-Request-Timeout header (see backend/deadlines.py)
+REQUEST_DEADLINES = {
+    "DEFAULT": float(os.getenv("REQUEST_DEADLINE_DEFAULT", 60)),
+    "STREAM_DEFAULT": float(os.getenv("REQUEST_DEADLINE_STREAM_DEFAULT", 180)),
+    "MAX": float(os.getenv("REQUEST_DEADLINE_MAX", 300)),
+}
+
+# Per-user request limits and the shared LLM quota for the generation endpoints
+# (see backend/ratelimit.py). Set RATE_LIMIT_BACKEND=sqlite to share the buckets
+# between the workers on a host.
+RATE_LIMIT = {
+    "ENABLED": os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true",
+    "BACKEND": os.getenv("RATE_LIMIT_BACKEND", "memory"),
+    "PATH": os.getenv("RATE_LIMIT_PATH", str(BASE_DIR / "ratelimit.sqlite3")),
+    "USER_PER_MINUTE": float(os.getenv("RATE_LIMIT_USER_PER_MINUTE", 20)),
+    "USER_BURST": int(os.getenv("RATE_LIMIT_USER_BURST", 10)),
+    "LLM_PER_MINUTE": float(os.getenv("RATE_LIMIT_LLM_PER_MINUTE", 60)),
+    "LLM_BURST": int(os.getenv("RATE_LIMIT_LLM_BURST", 15)),
+    "MAX_QUEUE": int(os.getenv("RATE_LIMIT_MAX_QUEUE", 64)),
+    "MAX_WAIT": float(os.getenv("RATE_LIMIT_MAX_WAIT", 10)),
+    "BACKGROUND_RESERVE": 0.5,
+}
+
+# Pre-generated practice question bank (see practice/question_bank.py)
+QUESTION_BANK = {
+    "ENABLED": os.getenv("QUESTION_BANK_ENABLED", "true").lower() == "true",
+    "MIN_FRESH_SETS": int(os.getenv("QUESTION_BANK_MIN_FRESH_SETS", 2)),
+    "MAX_SERVES": int(os.getenv("QUESTION_BANK_MAX_SERVES", 5)),
+    "POPULAR_THRESHOLD": int(os.getenv("QUESTION_BANK_POPULAR_THRESHOLD", 3)),
+    "WARM_INTERVAL": int(os.getenv("QUESTION_BANK_WARM_INTERVAL", 30)),
+}
+
+# Batched quiz generation (api/quizzes/create_quiz_batch)
+QUIZ_BATCH = {
+    "MAX_SPECS": int(os.getenv("QUIZ_BATCH_MAX_SPECS", 20)),
+    "MAX_WORKERS": int(os.getenv("QUIZ_BATCH_MAX_WORKERS", 8)),
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
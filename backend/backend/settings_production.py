@@ -0,0 +1,65 @@
+"""
+Production settings, used by the Docker image:
+
+    DJANGO_SETTINGS_MODULE=backend.settings_production gunicorn backend.asgi:application
+
+Everything in backend/settings.py applies, with the development-only overhead
+turned off:
+
+- DEBUG is off, so Django stops recording every SQL query in
+  connection.queries, caches compiled templates and serves plain error pages
+- DRF renders JSON only, without the browsable API
+- database connections are kept open between requests
+- the generation endpoints use their async views, since gunicorn runs
+  uvicorn workers (see gunicorn.conf.py)
+
+Gunicorn runs several worker processes, so state that must be shared between
+them defaults to SQLite files on the host. That covers the rate limit buckets,
+the generation cache, the notes store and the single-flight leases. Each
+setting can still be overridden with the same environment variables as in
+development.
+"""
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import (
+    ALLOWED_HOSTS,
+    BASE_DIR,
+    GENERATION_CACHE,
+    NOTES_STORE,
+    RATE_LIMIT,
+    REST_FRAMEWORK,
+    SECRET_KEY,
+    SINGLE_FLIGHT,
+)
+
+DEBUG = False
+
+SECRET_KEY = os.getenv("DJANGO_SECRET_KEY", SECRET_KEY)
+
+ALLOWED_HOSTS = ALLOWED_HOSTS + [host for host in os.getenv("DJANGO_ALLOWED_HOSTS", "").split(",") if host]
+
+ASYNC_VIEWS = os.getenv("DJANGO_ASYNC_VIEWS", "true").lower() == "true"
+
+CONN_MAX_AGE = int(os.getenv("DJANGO_CONN_MAX_AGE", 600))
+CONN_HEALTH_CHECKS = True
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    "DEFAULT_RENDERER_CLASSES": ["rest_framework.renderers.JSONRenderer"],
+}
+
+RATE_LIMIT = {**RATE_LIMIT, "BACKEND": os.getenv("RATE_LIMIT_BACKEND", "sqlite")}
+GENERATION_CACHE = {**GENERATION_CACHE, "BACKEND": os.getenv("GENERATION_CACHE_BACKEND", "sqlite")}
+NOTES_STORE = {**NOTES_STORE, "BACKEND": os.getenv("NOTES_STORE_BACKEND", "sqlite")}
+SINGLE_FLIGHT = {
+    **SINGLE_FLIGHT,
+    "LEASE_PATH": os.getenv("SINGLE_FLIGHT_LEASE_PATH", str(BASE_DIR / "singleflight.sqlite3")),
+}
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "root": {"handlers": ["console"], "level": os.getenv("DJANGO_LOG_LEVEL", "WARNING")},
+}
@@ -0,0 +1,344 @@
+"""
+Single-flight coalescing for expensive generation calls.
+
+The first caller for a key runs the generation; every concurrent caller with
+the same key waits for that result instead of starting its own Gemini stream.
+
+Within a worker this is done with threads. When settings.SINGLE_FLIGHT has a
+LEASE_PATH, a SQLite lease extends the coalescing across worker processes:
+the lease holder publishes its (JSON-serializable) result in the lease table
+and the other workers poll for it.
+
+A caller that passes its request's `deadline` doesn't impose it on the others.
+The shared call gets its own budget (see Deadline.shared), pushed out to the
+latest deadline among its callers, and each caller stops waiting with
+DeadlineExceeded when its own deadline runs out. The call carries on for the
+remaining callers and fills the caches.
+
+AsyncSingleFlight is the equivalent for coroutines in the async views.
+"""
+import asyncio
+import contextvars
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from backend.deadlines import Deadline, DeadlineExceeded
+
+DEFAULT_CONFIG = {
+    "LEASE_PATH": None,
+    "LEASE_TTL": 120,
+    "POLL_INTERVAL": 0.1,
+    "RESULT_TTL": 5,
+}
+
+
+class _Call:
+    def __init__(self, deadline=None):
+        self.done = threading.Event()
+        self.deadline = deadline
+        self.result = None
+        self.error = None
+
+
+def _exceeded(deadline):
+    return DeadlineExceeded(f"Request deadline of {deadline.timeout:g}s exceeded")
+
+
+def _close_db_connections():
+    """Close the Django connections a call thread opened (the question bank writes through the ORM)"""
+    try:
+        from django.db import connections
+    except ImportError:
+        return
+    connections.close_all()
+
+
+class SQLiteLease:
+    """Cross-process lease stored in a SQLite file"""
+
+    def __init__(self, path, ttl=120, poll_interval=0.1, result_ttl=5):
+        self.path = str(path)
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self.result_ttl = result_ttl
+        self._local = threading.local()
+        self._connect().execute(
+            """
+            CREATE TABLE IF NOT EXISTS single_flight (
+                key TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                result TEXT
+            )
+            """
+        )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def run(self, key, fn, args, kwargs, deadline=None):
+        """
+        Run `fn` if we win the lease for `key`, otherwise wait for the holder's result.
+
+        Returns (result, remote) where remote is True if another worker produced it.
+        Waiting stops with DeadlineExceeded when `deadline` runs out.
+        """
+        conn = self._connect()
+        owner = f"{os.getpid()}:{threading.get_ident()}"
+        while True:
+            now = time.time()
+            conn.execute("DELETE FROM single_flight WHERE expires_at < ?", (now,))
+            acquired = conn.execute(
+                "INSERT OR IGNORE INTO single_flight (key, owner, expires_at) VALUES (?, ?, ?)",
+                (key, owner, now + self.ttl),
+            ).rowcount == 1
+
+            if acquired:
+                try:
+                    result = fn(*args, **kwargs)
+                except Exception:
+                    # Drop the lease so a waiting worker can take over
+                    conn.execute(
+                        "DELETE FROM single_flight WHERE key = ? AND owner = ?", (key, owner)
+                    )
+                    raise
+                # Keep the result just long enough for the waiters to pick it up
+                conn.execute(
+                    "UPDATE single_flight SET result = ?, expires_at = ? WHERE key = ? AND owner = ?",
+                    (json.dumps(result), time.time() + self.result_ttl, key, owner),
+                )
+                return result, False
+
+            row = conn.execute(
+                "SELECT result FROM single_flight WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[0] is not None:
+                return json.loads(row[0]), True
+            if deadline is not None:
+                if deadline.expired():
+                    raise _exceeded(deadline)
+                time.sleep(deadline.cap(self.poll_interval))
+            else:
+                time.sleep(self.poll_interval)
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key"""
+
+    def __init__(self, name, lease=None):
+        self.name = name
+        self.lease = lease
+        self.executed = 0
+        self.coalesced = 0
+        self.coalesced_remote = 0
+        self.timed_out = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args, deadline=None, **kwargs):
+        """
+        Return fn(*args, **kwargs), sharing one execution among concurrent callers.
+
+        With a `deadline`, fn is called with the shared call's deadline instead and
+        runs in its own thread, so that the first caller can give up on time too.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call(Deadline.shared(deadline) if deadline is not None else None)
+                self._calls[key] = call
+                self.executed += 1
+            else:
+                self.coalesced += 1
+                if deadline is not None and call.deadline is not None:
+                    call.deadline.extend(deadline)
+
+        if leader and call.deadline is None:
+            self._run(key, call, fn, args, kwargs)
+        elif leader:
+            kwargs["deadline"] = call.deadline
+            # A copy of the caller's context, so the scheduler knows whose call it is
+            threading.Thread(
+                target=contextvars.copy_context().run,
+                args=(self._run_in_thread, key, call, fn, args, kwargs),
+                name=f"single-flight-{self.name}",
+                daemon=True,
+            ).start()
+
+        if not call.done.wait(deadline.remaining() if deadline is not None else None):
+            with self._lock:
+                self.timed_out += 1
+            raise _exceeded(deadline)
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def _run(self, key, call, fn, args, kwargs):
+        try:
+            if self.lease is not None:
+                call.result, remote = self.lease.run(key, fn, args, kwargs, deadline=call.deadline)
+                if remote:
+                    with self._lock:
+                        self.coalesced_remote += 1
+            else:
+                call.result = fn(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def _run_in_thread(self, key, call, fn, args, kwargs):
+        try:
+            self._run(key, call, fn, args, kwargs)
+        finally:
+            _close_db_connections()
+
+    def stats(self):
+        return {
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "coalesced_across_workers": self.coalesced_remote,
+            "waits_timed_out": self.timed_out,
+            "in_flight": len(self._calls),
+        }
+
+
+class _AsyncCall:
+    def __init__(self, task, deadline=None):
+        self.task = task
+        self.deadline = deadline
+        self.waiters = 0
+
+
+class AsyncSingleFlight:
+    """
+    Coalesces concurrent coroutine calls that share a key on the same event loop.
+
+    The shared call runs in its own task, which every caller (the first one
+    included) waits for with asyncio.wait. A caller that is cancelled, for
+    example because its client disconnected, or whose deadline runs out only
+    stops waiting. The task is cancelled when its last waiter is gone, and the
+    other callers never see a cancellation or a deadline that wasn't theirs.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.executed = 0
+        self.coalesced = 0
+        self.timed_out = 0
+        self._calls = {}
+
+    async def do(self, key, fn, *args, deadline=None, **kwargs):
+        """Return await fn(*args, **kwargs), sharing one execution among concurrent callers"""
+        loop = asyncio.get_running_loop()
+        call_key = (id(loop), key)
+        call = self._calls.get(call_key)
+        if call is None:
+            shared = Deadline.shared(deadline) if deadline is not None else None
+            if shared is not None:
+                kwargs["deadline"] = shared
+            call = _AsyncCall(loop.create_task(fn(*args, **kwargs)), shared)
+            call.task.add_done_callback(lambda task: self._finished(call_key, call))
+            self._calls[call_key] = call
+            self.executed += 1
+        else:
+            self.coalesced += 1
+            if deadline is not None and call.deadline is not None:
+                call.deadline.extend(deadline)
+
+        call.waiters += 1
+        try:
+            # asyncio.wait never cancels the task, whether it times out or we are cancelled
+            done, _ = await asyncio.wait([call.task], timeout=deadline.remaining() if deadline is not None else None)
+            if not done:
+                self.timed_out += 1
+                raise _exceeded(deadline)
+            return call.task.result()
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Nobody wants the result any more; later callers start a fresh call
+                self._forget(call_key, call)
+                call.task.cancel()
+
+    def _forget(self, call_key, call):
+        if self._calls.get(call_key) is call:
+            del self._calls[call_key]
+
+    def _finished(self, call_key, call):
+        self._forget(call_key, call)
+        if not call.task.cancelled():
+            # Mark the exception retrieved when every waiter was already gone
+            call.task.exception()
+
+    def stats(self):
+        return {
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "waits_timed_out": self.timed_out,
+            "in_flight": len(self._calls),
+        }
+
+
+_flights = {}
+_async_flights = {}
+_flights_lock = threading.Lock()
+_lease = None
+
+
+def _get_config():
+    try:
+        from django.conf import settings
+        overrides = getattr(settings, "SINGLE_FLIGHT", {})
+    except Exception:
+        overrides = {}
+    return {**DEFAULT_CONFIG, **overrides}
+
+
+def get_flight(name):
+    """Return the process-wide single-flight group for `name`"""
+    global _lease
+    with _flights_lock:
+        flight = _flights.get(name)
+        if flight is None:
+            config = _get_config()
+            if config["LEASE_PATH"] and _lease is None:
+                _lease = SQLiteLease(
+                    config["LEASE_PATH"],
+                    ttl=config["LEASE_TTL"],
+                    poll_interval=config["POLL_INTERVAL"],
+                    result_ttl=config["RESULT_TTL"],
+                )
+            flight = SingleFlight(name, lease=_lease)
+            _flights[name] = flight
+        return flight
+
+
+def get_async_flight(name):
+    """Return the process-wide async single-flight group for `name`"""
+    with _flights_lock:
+        flight = _async_flights.get(name)
+        if flight is None:
+            flight = AsyncSingleFlight(name)
+            _async_flights[name] = flight
+        return flight
+
+
+def flight_stats():
+    """Coalescing counters for every single-flight group in this process"""
+    with _flights_lock:
+        stats = {name: flight.stats() for name, flight in _flights.items()}
+        stats.update({f"{name}.async": flight.stats() for name, flight in _async_flights.items()})
+        return stats
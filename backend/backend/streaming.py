@@ -0,0 +1,114 @@
+"""
+Helpers for streaming generation results to the client as they are produced.
+"""
+import json
+
+from django.http import StreamingHttpResponse
+
+
+class JSONArrayStream:
+    """
+    Incremental parser for a JSON array of objects arriving in arbitrary chunks.
+
+    Feed it model output (markdown fences and surrounding prose are skipped) and
+    it returns each top-level object as soon as its closing brace arrives. As in
+    backend.questions, the array starts at the first "[" followed by an object
+    or "]", so a bracket in the prose before it (e.g. "[1]") is skipped. Every
+    character is scanned once, apart from whitespace after a "[" at the end of
+    a chunk.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._started = False
+        self._finished = False
+        self._object_start = None
+
+    def feed(self, chunk):
+        """Consume `chunk` and return the list of objects completed by it"""
+        if self._finished:
+            return []
+        self._buffer += chunk
+        objects = []
+        buffer = self._buffer
+        i = self._pos
+        while i < len(buffer):
+            ch = buffer[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif not self._started:
+                if ch == "[":
+                    j = i + 1
+                    while j < len(buffer) and buffer[j].isspace():
+                        j += 1
+                    if j == len(buffer):
+                        break  # what follows the bracket hasn't arrived yet
+                    if buffer[j] in "{]":
+                        self._started = True
+                        self._depth = 1
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "[{":
+                if ch == "{" and self._depth == 1:
+                    self._object_start = i
+                self._depth += 1
+            elif ch in "]}":
+                self._depth -= 1
+                if self._depth == 1 and ch == "}" and self._object_start is not None:
+                    try:
+                        objects.append(json.loads(buffer[self._object_start:i + 1]))
+                    except json.JSONDecodeError:
+                        pass
+                    self._object_start = None
+                elif self._depth == 0:
+                    self._finished = True
+                    break
+            i += 1
+
+        # Drop what has been consumed, keeping only an object still being read
+        keep_from = self._object_start if self._object_start is not None else i
+        self._buffer = buffer[keep_from:]
+        self._pos = i - keep_from
+        if self._object_start is not None:
+            self._object_start = 0
+        return objects
+
+    @property
+    def finished(self):
+        return self._finished
+
+
+async def _ndjson_lines(events):
+    async for event in events:
+        yield json.dumps(event) + "\n"
+
+
+def ndjson_response(events, status=200):
+    """
+    Stream an iterable of dicts as newline-delimited JSON.
+
+    The async views pass an async iterable. Under ASGI, Django would otherwise
+    collect a sync iterator in a thread before sending its first byte.
+    """
+    if hasattr(events, "__aiter__"):
+        lines = _ndjson_lines(events)
+    else:
+        lines = (json.dumps(event) + "\n" for event in events)
+    response = StreamingHttpResponse(
+        lines,
+        content_type="application/x-ndjson",
+        status=status,
+    )
+    response["Cache-Control"] = "no-cache"
+    # Stop reverse proxies from buffering the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
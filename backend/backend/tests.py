@@ -0,0 +1,22 @@
+"""
+Worker boot import budget; see benchmarks/bench_startup.py.
+
+    cd backend && python manage.py test backend.tests
+
+IMPORT_BUDGET_MS overrides the time budget on a slower machine.
+"""
+import os
+import sys
+
+from django.test import SimpleTestCase
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from bench_startup import BACKEND_DIR, BUDGET_MS, DEFERRED, import_budget  # noqa: E402
+
+
+class ImportBudgetTests(SimpleTestCase):
+    def test_worker_boot_within_import_budget(self):
+        total_ms, imported = import_budget(BACKEND_DIR)
+        self.assertEqual(imported, [], f"a worker boot must not import any of {', '.join(DEFERRED)}")
+        self.assertLess(total_ms, float(os.getenv("IMPORT_BUDGET_MS", BUDGET_MS)))
@@ -0,0 +1,231 @@
+"""
+Nearest-neighbour index of generated topics.
+
+"photosynthesis", "What is photosynthesis?" and "how does photosynthesis work"
+each miss an exact-key cache. This index lets the quiz and notes utils find a
+topic they already generated that means the same thing, and serve its cached
+generation instead.
+
+Topics are normalized first:
+
+- lowercase, with punctuation and question framings ("what is ...",
+  "how does ... work", "introduction to ...") removed
+- stopwords dropped, ordinals and roman numerals turned into digits (a lone
+  "I" only at the end, as in "World War I"; elsewhere it is the pronoun)
+- words reduced by a small suffix-stripping stemmer
+
+Each topic becomes a unit vector in a DIM-dimensional float32 NumPy array.
+It is the sum of two L2-normalized halves: its stemmed words, and the
+character trigrams of those words. Words in a trailing "in ..." phrase only
+narrow the topic ("photosynthesis in plants"), so they count QUALIFIER_WEIGHT
+as much as the rest. A modifier in front of the topic changes what it is
+("binary search trees" vs "binary trees") and counts in full. Features are
+hashed with crc32, so vectors are stable across processes and need no
+vocabulary. A lookup is one matrix-vector product over the few dozen columns
+where the query is non-zero.
+
+Only topics in the same scope (for quizzes: question count and difficulty)
+and with the same numbers can match. That keeps "World War 1" from matching
+"World War 2". Everything runs offline. When the index is full, the oldest
+topics are overwritten. NumPy is imported when the first index is built,
+not at startup. Configure through settings.TOPIC_INDEX.
+"""
+import re
+import threading
+import zlib
+
+from django.conf import settings
+
+DEFAULT_CONFIG = {
+    "ENABLED": True,
+    "DIM": 1024,
+    "CAPACITY": 4096,
+    "THRESHOLD": 0.83,
+}
+QUALIFIER_WEIGHT = 0.5
+
+STOPWORDS = frozenset(
+    "a an the of in on and or for to with by at from as into about is are was were be it its this that "
+    "these those my our your i".split()
+)
+_FRAMINGS = (
+    re.compile(
+        r"^(?:what (?:is|are|was|were)|whats|explain|define|describe|introduction to|intro to|basics of|overview of"
+        r"|understanding|learn about|all about|notes on|quiz on|the)\s+"
+    ),
+    re.compile(r"\s+(?:explained|basics|for beginners|overview|introduction|notes|quiz)$"),
+)
+_HOW_DOES = re.compile(r"^how (?:does|do|did|is|are)\s+(.+?)\s+(?:work|happen|function|form|formed|made)s?$")
+_NUMBERS = {
+    "first": "1", "second": "2", "third": "3", "fourth": "4", "fifth": "5",
+    "one": "1", "two": "2", "three": "3", "four": "4", "five": "5",
+    "1st": "1", "2nd": "2", "3rd": "3", "4th": "4", "5th": "5",
+    "ii": "2", "iii": "3", "iv": "4",
+}
+_SUFFIXES = ("ational", "ations", "ation", "ments", "ment", "ness", "ings", "ing", "ies", "ied", "ed", "ly")
+
+
+def stem(word):
+    """Strip common inflections; deliberately conservative so distinct words stay distinct"""
+    if len(word) <= 3 or word.endswith("ss") or word.isdigit():
+        return word
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)] + ("y" if suffix in ("ies", "ied") else "")
+    if word.endswith(("sses", "xes", "zes", "ches", "shes", "oes")):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def _terms(topic):
+    """The topic's stemmed content words, and the position where its "in ..." qualifier starts"""
+    text = " ".join(re.sub(r"[^\w\s+#]", " ", str(topic).lower().replace("'s", "")).split())
+    match = _HOW_DOES.match(text)
+    if match:
+        text = match.group(1)
+    for framing in _FRAMINGS:
+        text = framing.sub("", text)
+    tokens = text.split()
+    if len(tokens) > 1 and tokens[-1] == "i":
+        tokens[-1] = "1"
+    words = []
+    qualifier = None
+    for token in tokens:
+        if token == "in" and words and qualifier is None:
+            qualifier = len(words)
+        elif token not in STOPWORDS:
+            words.append(stem(_NUMBERS.get(token, token)))
+    return words, len(words) if qualifier is None else qualifier
+
+
+def normalize_topic(topic):
+    """The topic's stemmed content words, e.g. "How does photosynthesis work?" -> ["photosynthesi"]"""
+    return _terms(topic)[0]
+
+
+def _hash(feature):
+    return zlib.crc32(feature.encode("utf-8"))
+
+
+def topic_vector(words, dim, qualifier=None):
+    """Unit vector of hashed word and character-trigram features; words from `qualifier` on count less"""
+    import numpy as np
+
+    word_part = np.zeros(dim, np.float32)
+    gram_part = np.zeros(dim, np.float32)
+    for position, word in enumerate(words):
+        weight = QUALIFIER_WEIGHT if qualifier is not None and position >= qualifier else 1.0
+        word_part[_hash(word) % dim] += weight
+        padded = f"#{word}#"
+        for i in range(len(padded) - 2):
+            gram_part[_hash(padded[i:i + 3]) % dim] += weight
+    vector = np.zeros(dim, np.float32)
+    for part in (word_part, gram_part):
+        norm = np.linalg.norm(part)
+        if norm:
+            vector += part / norm
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _partition(scope, words):
+    """Rows can only match within the same scope and the same set of numbers"""
+    numbers = sorted({word for word in words if word.isdigit()})
+    return _hash(f"{scope}|{' '.join(numbers)}")
+
+
+class TopicIndex:
+    def __init__(self, dim=1024, capacity=4096, threshold=0.83):
+        self.dim = dim
+        self.capacity = capacity
+        self.threshold = threshold
+        import numpy as np
+
+        # Column-major, so a lookup reads only the columns where the query is non-zero
+        self._vectors = np.zeros((capacity, dim), np.float32, order="F")
+        self._partitions = np.zeros(capacity, np.int64)
+        self._topics = [None] * capacity
+        self._rows = {}  # (scope, normalized topic) -> row
+        self._size = 0
+        self._next = 0
+        self._lock = threading.Lock()
+        self.stats = {"lookups": 0, "matches": 0, "added": 0}
+
+    def __len__(self):
+        return self._size
+
+    def add(self, topic, scope=""):
+        """Index `topic` (as the caller spelled it, so its cache key can be rebuilt)"""
+        words, qualifier = _terms(topic)
+        if not words:
+            return
+        name = (str(scope), " ".join(words))
+        if name in self._rows:
+            return
+        vector = topic_vector(words, self.dim, qualifier)
+        with self._lock:
+            if name in self._rows:
+                return
+            row = self._next
+            old = self._topics[row]
+            if old is not None:
+                del self._rows[old[0]]
+            self._vectors[row] = vector
+            self._partitions[row] = _partition(scope, words)
+            self._topics[row] = (name, topic)
+            self._rows[name] = row
+            self._next = (row + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+            self.stats["added"] += 1
+
+    def nearest(self, topic, scope=""):
+        """Return (indexed topic, similarity) for the best match at or above THRESHOLD, else None"""
+        import numpy as np
+
+        words, qualifier = _terms(topic)
+        if not words:
+            return None
+        vector = topic_vector(words, self.dim, qualifier)
+        partition = _partition(scope, words)
+        with self._lock:
+            self.stats["lookups"] += 1
+            size = self._size
+            if not size:
+                return None
+            columns = np.flatnonzero(vector)
+            scores = self._vectors[:size, columns] @ vector[columns]
+            scores[self._partitions[:size] != partition] = -1.0
+            row = int(np.argmax(scores))
+            score = float(scores[row])
+            if score < self.threshold:
+                return None
+            self.stats["matches"] += 1
+            return self._topics[row][1], score
+
+    def snapshot(self):
+        with self._lock:
+            return {**self.stats, "size": self._size, "capacity": self.capacity, "threshold": self.threshold}
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_topic_index(namespace):
+    """Process-wide index for `namespace`, or None if disabled in settings.TOPIC_INDEX"""
+    config = {**DEFAULT_CONFIG, **getattr(settings, "TOPIC_INDEX", {})}
+    if not config["ENABLED"]:
+        return None
+    with _indexes_lock:
+        index = _indexes.get(namespace)
+        if index is None:
+            index = TopicIndex(config["DIM"], config["CAPACITY"], config["THRESHOLD"])
+            _indexes[namespace] = index
+        return index
+
+
+def topic_index_stats():
+    with _indexes_lock:
+        return {name: index.snapshot() for name, index in _indexes.items()}
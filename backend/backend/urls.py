@@ -14,33 +14,45 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.urls import path, include, re_path
-from quiz.views import create_quiz
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-from tutorials.views import create_notes, search_youtube_videos
-# Swagger schema configuration
-schema_view = get_schema_view(
-    openapi.Info(
-        title="EduAssist API",
-        default_version='v1',
-        description="API documentation for the EduAssist Django backend",
-        terms_of_service="https://www.example.com/terms/",
-        contact=openapi.Contact(email="support@example.com"),
-        license=openapi.License(name="MIT License"),
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
+from quiz.views import (
+    create_quiz, create_quiz_async, create_quiz_batch, create_quiz_batch_async, create_quiz_stream,
+    create_quiz_stream_async, quiz_attempts, quiz_stats, quiz_topic_stats, submit_quiz_attempt,
+)
+from tutorials.views import (
+    create_notes, create_notes_async, create_notes_stream, create_notes_stream_async, search_youtube_videos,
+    search_youtube_videos_async,
+)
+from backend.views import api_docs, generation_metrics
+
+
+from practice.views import (
+    create_practice_questions, create_practice_questions_async, create_practice_questions_stream,
+    create_practice_questions_stream_async,
 )
 
+# Under an ASGI server, serve the generation endpoints with their async views
+ASYNC = settings.ASYNC_VIEWS
 
-from practice.views import create_practice_questions
 urlpatterns = [
     path("auth/", include('userAuth.urls')),
-    path("api/quizzes/create_quiz", create_quiz, name="create_quiz"),
-    path("api/practice/create_practice_questions/", create_practice_questions, name="create_practice_questions"),
-    path("api/tutorials/create_notes", create_notes, name="create_notes"),   
-    path("api/tutorials/search_youtube", search_youtube_videos, name="search_youtube"),
+    path("api/quizzes/create_quiz", create_quiz_async if ASYNC else create_quiz, name="create_quiz"),
+    path("api/quizzes/create_quiz_stream", create_quiz_stream_async if ASYNC else create_quiz_stream, name="create_quiz_stream"),
+    path("api/quizzes/create_quiz_batch", create_quiz_batch_async if ASYNC else create_quiz_batch, name="create_quiz_batch"),
+    path("api/quizzes/submit_attempt", submit_quiz_attempt, name="submit_quiz_attempt"),
+    path("api/quizzes/attempts", quiz_attempts, name="quiz_attempts"),
+    path("api/quizzes/stats", quiz_stats, name="quiz_stats"),
+    path("api/quizzes/topic_stats", quiz_topic_stats, name="quiz_topic_stats"),
+    path("api/practice/create_practice_questions/", create_practice_questions_async if ASYNC else create_practice_questions, name="create_practice_questions"),
+    path("api/practice/create_practice_questions_stream/", create_practice_questions_stream_async if ASYNC else create_practice_questions_stream, name="create_practice_questions_stream"),
+    path("api/tutorials/create_notes", create_notes_async if ASYNC else create_notes, name="create_notes"),   
+    path("api/tutorials/create_notes_stream", create_notes_stream_async if ASYNC else create_notes_stream, name="create_notes_stream"),
+    path("api/tutorials/search_youtube", search_youtube_videos_async if ASYNC else search_youtube_videos, name="search_youtube"),
+    path("api/metrics", generation_metrics, name="generation_metrics"),
+    # Swagger / ReDoc; drf_yasg is only loaded when one of these is requested
+    re_path(r"^swagger(?P<format>\.json|\.yaml)$", api_docs, name="schema-json"),
+    path("swagger/", api_docs, {"ui": "swagger"}, name="schema-swagger-ui"),
+    path("redoc/", api_docs, {"ui": "redoc"}, name="schema-redoc"),
 
 ]
\ No newline at end of file
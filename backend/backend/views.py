@@ -0,0 +1,76 @@
+import threading
+
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from .deadlines import deadline_stats
+from .gemini_client import policy_stats
+from .generation_cache import cache_stats
+from .ratelimit import rate_limit_stats
+from .singleflight import flight_stats
+from .topic_index import topic_index_stats
+from userAuth.token_verifier import get_verifier
+from practice.question_bank import bank_stats
+from quiz.attempts import attempt_stats
+from tutorials.notes_store import notes_store_stats
+from tutorials.youtube import youtube_stats
+
+
+@require_GET
+def generation_metrics(request):
+    """Expose in-process counters for the generation pipeline"""
+    return JsonResponse({
+        "cache": cache_stats(),
+        "single_flight": flight_stats(),
+        "auth": get_verifier().stats,
+        "question_bank": bank_stats(),
+        "upstream": policy_stats(),
+        "deadlines": deadline_stats(),
+        "rate_limit": rate_limit_stats(),
+        "notes_store": notes_store_stats(),
+        "youtube": youtube_stats(),
+        "topic_index": topic_index_stats(),
+        "attempts": attempt_stats(),
+    }, status=200)
+
+
+# Seconds each worker caches the generated OpenAPI schema
+SCHEMA_CACHE_TIMEOUT = 3600
+
+_docs_views = {}
+_docs_lock = threading.Lock()
+
+
+def _docs_view(ui):
+    """drf_yasg view for `ui` ("swagger", "redoc", or None for the raw schema), built on first use"""
+    view = _docs_views.get(ui)
+    if view is None:
+        from drf_yasg import openapi
+        from drf_yasg.views import get_schema_view
+        from rest_framework import permissions
+
+        with _docs_lock:
+            view = _docs_views.get(ui)
+            if view is None:
+                schema_view = get_schema_view(
+                    openapi.Info(
+                        title="EduAssist API",
+                        default_version='v1',
+                        description="API documentation for the EduAssist Django backend",
+                        terms_of_service="https://www.example.com/terms/",
+                        contact=openapi.Contact(email="support@example.com"),
+                        license=openapi.License(name="MIT License"),
+                    ),
+                    public=True,
+                    permission_classes=(permissions.AllowAny,),
+                )
+                if ui:
+                    view = schema_view.with_ui(ui, cache_timeout=SCHEMA_CACHE_TIMEOUT)
+                else:
+                    view = schema_view.without_ui(cache_timeout=SCHEMA_CACHE_TIMEOUT)
+                _docs_views[ui] = view
+    return view
+
+
+def api_docs(request, ui=None, **kwargs):
+    """Serve the API docs; drf_yasg is imported and the schema generated on the first request"""
+    return _docs_view(ui)(request, **kwargs)
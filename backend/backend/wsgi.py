@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_wsgi_application()
+
+# Resolve LLM provider settings once per process, before serving requests
+from backend.llm import get_provider  # noqa: E402
+get_provider().warm_up()
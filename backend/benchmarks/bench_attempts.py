@@ -0,0 +1,121 @@
+"""
+Quiz attempt submission and dashboard reads (see quiz/attempts.py).
+
+Runs against a throwaway in-memory test database. One user submits attempts at
+quizzes of --questions questions each, spread over --topics topics (each quiz
+is submitted once). At each history size in
+--sizes, the benchmark times three ways to build the user's dashboard: overall
+totals plus per-topic scores.
+
+- summary: user_summary(), reading the UserStats and UserTopicStats rows
+- aggregate: the same numbers recomputed in SQL from the QuizAttempt rows
+- scan: every answer row loaded and graded in Python, as the client did with
+  the Firestore quiz documents
+
+Submission latency is reported as well; it includes grading, the bulk insert of
+the answers and the summary updates.
+
+    cd backend && python benchmarks/bench_attempts.py [--sizes 100,1000,5000] [--questions 10] [--topics 20]
+
+Firebase credentials must be set in the environment, as for the server itself.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.db.models import Count, Max, Sum  # noqa: E402
+
+from backend.questions import Question  # noqa: E402
+from quiz.attempts import store_quiz, submit_attempt, user_summary  # noqa: E402
+from quiz.models import AttemptAnswer, QuizAttempt  # noqa: E402
+
+UID = "bench-user"
+
+
+def make_quiz(topic, count):
+    questions = [
+        Question(f"{topic} question {i}?", ("w", "x", "y", "z"), "abcd"[i % 4], "Beginner", (f"tag{i % 3}",))
+        for i in range(count)
+    ]
+    return store_quiz(topic, "Beginner", questions, UID)
+
+
+def aggregate(user_id):
+    """The dashboard numbers recomputed from the attempt rows"""
+    attempts = QuizAttempt.objects.filter(user_id=user_id)
+    totals = attempts.aggregate(attempts=Count("id"), correct=Sum("correct"), total=Sum("total"),
+                                score_total=Sum("score"), best=Max("score"))
+    topics = list(
+        attempts.values("topic_key")
+        .annotate(attempts=Count("id"), score_total=Sum("score"), best=Max("score"), last=Max("submitted_at"))
+        .order_by("-last")[:20]
+    )
+    return totals, topics
+
+
+def scan(user_id):
+    """The dashboard numbers from every answer, graded in Python"""
+    by_topic = {}
+    rows = AttemptAnswer.objects.filter(attempt__user_id=user_id).values_list(
+        "attempt_id", "attempt__topic_key", "selected_option", "question__correct_answer"
+    )
+    for attempt_id, topic, selected, correct_answer in rows:
+        attempt = by_topic.setdefault(topic, {}).setdefault(attempt_id, [0, 0])
+        attempt[0] += selected == correct_answer
+        attempt[1] += 1
+    scores = [correct / total * 100 for attempts in by_topic.values() for correct, total in attempts.values()]
+    return len(scores), sum(scores) / len(scores) if scores else 0
+
+
+def median_ms(function, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function(UID)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="100,1000,5000", help="attempt history sizes to measure at")
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--topics", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=7)
+    args = parser.parse_args()
+
+    connection.creation.create_test_db(verbosity=0)
+    answers = ["abcd"[i % 4] if i % 3 else "a" for i in range(args.questions)]
+
+    submitted = 0
+    latencies = []
+    print(f"{'attempts':>9} {'summary ms':>11} {'aggregate ms':>13} {'scan ms':>9} {'submit p50 ms':>14} {'p95 ms':>8}")
+    for size in sorted(int(size) for size in args.sizes.split(",")):
+        while submitted < size:
+            # A quiz can be submitted once, so every attempt gets a fresh one (not timed)
+            quiz_id = make_quiz(f"Topic {submitted % args.topics}", args.questions)
+            start = time.perf_counter()
+            submit_attempt(UID, quiz_id, answers, time_spent=60)
+            latencies.append(time.perf_counter() - start)
+            submitted += 1
+        recent = sorted(latencies[-min(len(latencies), 500):])
+        print(f"{size:>9} {median_ms(user_summary, args.runs):>11.2f} {median_ms(aggregate, args.runs):>13.2f} "
+              f"{median_ms(scan, args.runs):>9.2f} {statistics.median(recent) * 1000:>14.2f} "
+              f"{recent[int(len(recent) * 0.95)] * 1000:>8.2f}")
+
+    # The summary rows must agree with the raw attempts
+    summary = user_summary(UID)["stats"]
+    totals, _ = aggregate(UID)
+    assert summary["attempts"] == totals["attempts"] == submitted
+    assert abs(summary["average_score"] - totals["score_total"] / totals["attempts"]) < 1e-6
+    print(f"\nsummary matches the {submitted} recorded attempts")
@@ -0,0 +1,48 @@
+"""
+Per-call setup cost: legacy configure_api() + GenerativeModel vs the shared client.
+
+Neither path talks to the Gemini API, so this measures only the overhead that
+used to run before every generation (DNS lookup, genai.configure, model build).
+
+    cd backend && python benchmarks/bench_gemini_client.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import google.generativeai as genai  # noqa: E402
+from backend import gemini_client  # noqa: E402
+
+ITERATIONS = 200
+
+
+def legacy_setup():
+    use_proxy = gemini_client.is_proxy_needed()
+    if use_proxy:
+        os.environ["HTTP_PROXY"] = gemini_client.PROXY_URL
+        os.environ["HTTPS_PROXY"] = gemini_client.PROXY_URL
+    genai.configure(api_key=os.getenv("GEMINI_API_KEY", "bench"), transport="rest")
+    return genai.GenerativeModel(gemini_client.MODEL_NAME)
+
+
+def shared_setup():
+    return gemini_client.get_model()
+
+
+def timed(fn):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        fn()
+    return (time.perf_counter() - start) / ITERATIONS * 1e6
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("GEMINI_API_KEY", "bench")
+    shared_setup()  # first call builds the model; exclude it from the steady state
+    legacy = timed(legacy_setup)
+    shared = timed(shared_setup)
+    print(f"legacy configure_api per call: {legacy:9.1f} us")
+    print(f"shared client per call:        {shared:9.1f} us")
+    print(f"speedup:                       {legacy / shared:9.1f}x")
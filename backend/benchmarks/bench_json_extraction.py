@@ -0,0 +1,88 @@
+"""
+Extracting questions from model output: legacy regex cascade vs backend.questions.
+
+The legacy path is the old extract_json_from_response (direct json.loads, then a
+fenced-block regex, then a greedy DOTALL array regex), run twice as
+generate_questions did, plus the views' fenced-block regex parse. Inputs cover a
+large well-formed response, prose around the fence, a truncated response, and
+one of the pathological cases for the greedy regex.
+
+    cd backend && python benchmarks/bench_json_extraction.py
+"""
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.questions import parse_questions  # noqa: E402
+
+QUESTION = {
+    "question": "What is the capital of France?",
+    "options": {"a": "Berlin", "b": "Madrid", "c": "Paris", "d": "Lisbon"},
+    "difficulty": "Beginner",
+    "tags": ["geography", "capital cities"],
+    "correct_answer": "c",
+    "attempted_option": "",
+    "hints": "Famous for Eiffel Tower",
+    "solution": "Paris is the capital of France and famous for Eiffel Tower and croissants.",
+}
+
+
+def legacy_extract(text):
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    try:
+        match = re.search(r'```(?:json)?\s*([\s\S]*?)\s*```', text)
+        if match:
+            return json.loads(match.group(1).strip())
+    except (json.JSONDecodeError, AttributeError, IndexError):
+        pass
+    try:
+        match = re.search(r'(\[\s*\{.*\}\s*\])', text, re.DOTALL)
+        if match:
+            return json.loads(match.group(1))
+    except (json.JSONDecodeError, AttributeError, IndexError):
+        pass
+    return []
+
+
+def legacy_pipeline(text):
+    """_fill_pool, generate_questions and the view each parsed the output"""
+    legacy_extract(text)
+    pool = legacy_extract(text)
+    fenced = "```json\n" + json.dumps(pool) + "\n```"
+    match = re.search(r'```json([\s\S]*?)```', fenced)
+    return json.loads(match.group(1).strip())
+
+
+def make_inputs(count):
+    questions = [dict(QUESTION, question=f"{QUESTION['question']} ({i})") for i in range(count)]
+    body = json.dumps(questions, indent=2)
+    return {
+        f"fenced, {count} questions": "```json\n" + body + "\n```",
+        f"prose + fence, {count} questions": "Sure! Here are your questions:\n\n```json\n" + body + "\n```\nGood luck!",
+        f"truncated, {count} questions": "```json\n" + body[: len(body) * 9 // 10],
+    }
+
+
+def timed(fn, text, budget=0.5):
+    iterations = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < budget:
+        fn(text)
+        iterations += 1
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+if __name__ == "__main__":
+    print(f"{'input':<32}{'size':>9}{'legacy':>14}{'single pass':>14}{'questions':>11}")
+    inputs = {**make_inputs(20), **make_inputs(200), "unbalanced '[{' x 2000": "[{" * 2000 + "} oops"}
+    for name, text in inputs.items():
+        legacy = timed(legacy_pipeline, text)
+        single = timed(parse_questions, text)
+        print(f"{name:<32}{len(text):>8}B{legacy:>11.1f} us{single:>11.1f} us{len(parse_questions(text)):>11}")
@@ -0,0 +1,70 @@
+"""
+Per-question cost of loose dicts vs backend.questions.Question.
+
+Measures resident memory for a pool of questions (dicts as parsed from the
+model, Question objects, and the compact rows stored in caches), duplicate
+detection against a list of bookmarks, and serializing a 20-question response.
+
+    cd backend && python benchmarks/bench_question_type.py
+"""
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.questions import Question, to_dicts  # noqa: E402
+
+POOL = 10_000
+
+
+def make_dict(i):
+    return {
+        "question": f"What is the capital of country number {i}?",
+        "options": {"a": "Berlin", "b": "Madrid", "c": "Paris", "d": "Lisbon"},
+        "difficulty": "Beginner",
+        "tags": ["geography", "capital cities"],
+        "correct_answer": "c",
+        "attempted_option": "",
+        "hints": "Famous for Eiffel Tower",
+        "solution": "Paris is the capital of France.",
+    }
+
+
+def measure(build):
+    tracemalloc.start()
+    value = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return value, size / POOL
+
+
+def timed(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+if __name__ == "__main__":
+    raw = json.dumps([make_dict(i) for i in range(POOL)])
+    dicts, dict_bytes = measure(lambda: json.loads(raw))
+    questions, question_bytes = measure(lambda: [Question.from_dict(d) for d in json.loads(raw)])
+    rows, row_bytes = measure(lambda: [q.to_row() for q in questions])
+    print(f"memory per question: dict {dict_bytes:.0f} B, Question {question_bytes:.0f} B, "
+          f"row on top of its Question's strings {row_bytes:.0f} B")
+
+    bookmarked = dicts[:500]
+    probe = dict(dicts[499], attempted_option="b")
+    bookmarked_set = {q for q in questions[:500]}
+    probe_question = Question.from_dict(probe)
+    print(f"duplicate check vs 500 bookmarks: dict list {timed(lambda: probe in bookmarked, 2000):.1f} us, "
+          f"Question set {timed(lambda: probe_question in bookmarked_set, 2000):.2f} us "
+          f"(dict check misses the duplicate: {probe not in bookmarked})")
+
+    page = questions[:20]
+    print(f"serialize 20 questions: {timed(lambda: json.dumps(to_dicts(page)), 2000):.1f} us; "
+          f"validate 20 dicts: {timed(lambda: [Question.from_dict(d) for d in dicts[:20]], 2000):.1f} us; "
+          f"load 20 rows: {timed(lambda: [Question.from_row(r) for r in rows[:20]], 2000):.1f} us")
@@ -0,0 +1,157 @@
+"""
+Throughput of the development server against the production server profiles.
+
+Starts each server in turn on --port and runs the same load against it
+(see benchmarks/loadtest.py). The LLM is the in-process fake provider, so the
+comparison measures the server and framework, not Gemini:
+
+- runserver: `manage.py runserver` with backend.settings (DEBUG on)
+- gthread: gunicorn sync workers with threads, backend.settings_production
+- uvicorn: gunicorn uvicorn workers with the async views, backend.settings_production
+  (what the Dockerfile runs)
+
+Two endpoints are loaded: api/metrics, which is pure request overhead, and
+api/tutorials/create_notes with a unique topic per request, so each request
+waits on a (simulated) generation of a couple of seconds. With a thread per
+request, the gthread profile can only have workers * threads generations in
+flight; the event loop workers have no such limit.
+
+    cd backend && python benchmarks/bench_server_profiles.py [--workers 2] [-c 128] [-n 512]
+
+The load generator shares the machine with the server. On a small machine it
+is the bottleneck for api/metrics, so compare those numbers across profiles only.
+
+Firebase credentials must be set in the environment, as for the server itself.
+The servers run with FIREBASE_AUTH_EMULATOR_HOST set, so the load carries an
+unsigned emulator ID token and no Firebase project is contacted.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from loadtest import run  # noqa: E402
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROFILES = {
+    "runserver": (
+        "backend.settings",
+        lambda port, workers: [sys.executable, "manage.py", "runserver", f"127.0.0.1:{port}", "--noreload"],
+    ),
+    "gthread": (
+        "backend.settings_production",
+        lambda port, workers: ["gunicorn", "backend.wsgi:application", "-k", "gthread", "-w", str(workers),
+                               "-b", f"127.0.0.1:{port}"],
+    ),
+    "uvicorn": (
+        "backend.settings_production",
+        lambda port, workers: ["gunicorn", "backend.asgi:application", "-w", str(workers), "-b", f"127.0.0.1:{port}"],
+    ),
+}
+
+
+def emulator_token(project_id, uid="loadtest"):
+    """Unsigned ID token, as the Firebase Auth emulator issues them"""
+    now = int(time.time())
+    claims = {
+        "iss": f"https://securetoken.google.com/{project_id}", "aud": project_id,
+        "sub": uid, "user_id": uid, "iat": now, "auth_time": now, "exp": now + 3600,
+    }
+    encode = lambda part: base64.urlsafe_b64encode(json.dumps(part).encode()).rstrip(b"=").decode()  # noqa: E731
+    return f"{encode({'alg': 'none', 'typ': 'JWT'})}.{encode(claims)}."
+
+
+def wait_for_port(port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server did not start on port {port}")
+
+
+def start(profile, args, state_dir):
+    settings_module, command = PROFILES[profile]
+    env = {
+        **os.environ,
+        "DJANGO_SETTINGS_MODULE": settings_module,
+        "FIREBASE_AUTH_EMULATOR_HOST": "127.0.0.1:9099",
+        "LLM_PROVIDER": "fake",
+        "LLM_FAKE_TOKENS_PER_SECOND": str(args.tokens_per_second),
+        "LLM_FAKE_FIRST_TOKEN_LATENCY": str(args.first_token_latency),
+        # One client sends all the load; measure capacity, not quotas
+        "RATE_LIMIT_ENABLED": "false",
+        "GENERATION_CACHE_PATH": os.path.join(state_dir, "generation_cache.sqlite3"),
+        "NOTES_STORE_PATH": os.path.join(state_dir, "notes_store.sqlite3"),
+        "SINGLE_FLIGHT_LEASE_PATH": os.path.join(state_dir, "singleflight.sqlite3"),
+    }
+    process = subprocess.Popen(
+        command(args.port, args.workers), cwd=BACKEND_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    wait_for_port(args.port)
+    return process
+
+
+def stop(process):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def load(url, args, method="POST", body="{}", unique_topics=False):
+    namespace = argparse.Namespace(
+        url=url, method=method, concurrency=args.concurrency, requests=args.requests, body=body,
+        token=emulator_token(os.environ["GOOGLE_PROJECT_ID"]), unique_topics=unique_topics, timeout=120.0,
+    )
+    return asyncio.run(run(namespace))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profiles", default=",".join(PROFILES))
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("-c", "--concurrency", type=int, default=128)
+    parser.add_argument("-n", "--requests", type=int, default=512)
+    parser.add_argument("--tokens-per-second", type=float, default=400)
+    parser.add_argument("--first-token-latency", type=float, default=1.0)
+    args = parser.parse_args()
+
+    results = []
+    for profile in args.profiles.split(","):
+        state_dir = tempfile.mkdtemp(prefix=f"bench-{profile}-")
+        process = start(profile, args, state_dir)
+        try:
+            base = f"http://127.0.0.1:{args.port}"
+            print(f"--- {profile}: api/metrics")
+            metrics = load(f"{base}/api/metrics", args, "GET")
+            print(f"--- {profile}: api/tutorials/create_notes")
+            notes = load(f"{base}/api/tutorials/create_notes", args, body='{"topic": "Photosynthesis"}',
+                         unique_topics=True)
+            results.append((profile, metrics, notes))
+        finally:
+            stop(process)
+            shutil.rmtree(state_dir, ignore_errors=True)
+
+    print(f"\n{'profile':<10} {'endpoint':<14} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'failed':>7}")
+    for profile, *by_endpoint in results:
+        for endpoint, result in zip(("metrics", "create_notes"), by_endpoint):
+            print(f"{profile:<10} {endpoint:<14} {result['throughput']:>8.1f} {result['p50'] * 1000:>8.0f} "
+                  f"{result['p95'] * 1000:>8.0f} {result['failures']:>7}")
@@ -0,0 +1,185 @@
+"""
+Startup time of manage.py and of a server worker.
+
+Each command runs --runs times in a fresh interpreter and the median wall time
+is reported:
+
+- settings: import backend.settings only
+- manage.py help: django.setup(), as every management command does
+- manage.py check: also imports the URLconf and so every view module
+- first Firestore client: setup, then backend.firebase_config.get_firestore()
+  (no request is sent)
+
+Then `python -X importtime manage.py check` lists the slowest top-level
+packages by cumulative import time.
+
+Finally the import budget is checked. A worker boots by loading the settings,
+the WSGI handler with its middleware, and the URLconf, which pulls in every
+view module. Under -X importtime that boot must stay within --budget-ms. It
+must also not import any of the DEFERRED SDKs, which are only loaded by the
+code paths that use them. The script exits with status 1 if either check
+fails, and backend/tests.py runs the same check under manage.py test. The
+module check holds on any machine; tune the time budget to the machine that
+runs it.
+
+Pass --compare REV to run the same commands against another git revision
+of the backend (exported to a temporary directory), e.g. to see the effect
+of a change:
+
+    cd backend && python benchmarks/bench_startup.py [--runs 7] [--compare HEAD~1] [--budget-ms 1000]
+
+The first Firestore client needs Firebase credentials in the environment, as
+for the server itself. Without them that timing is skipped, and the import
+budget is checked all the same.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COMMANDS = {
+    "settings": ["-c", "import backend.settings"],
+    "manage.py help": ["manage.py", "help"],
+    "manage.py check": ["manage.py", "check"],
+    "first Firestore client": [
+        "-c",
+        "import django; django.setup()\n"
+        "try:\n"
+        "    from backend.firebase_config import get_firestore\n"
+        "except ImportError:\n"
+        "    from firebase_admin import firestore; get_firestore = firestore.client\n"
+        "get_firestore()",
+    ],
+}
+
+
+BUDGET_MS = 1000
+
+# Heavy SDKs a worker must not import until a request needs them
+DEFERRED = (
+    "google.generativeai",
+    "google.cloud.firestore",
+    "firebase_admin.firestore",
+    "drf_yasg.views",
+    "numpy",
+    "httpx",
+)
+
+WORKER_BOOT = (
+    "import json, sys\n"
+    "from django.core.wsgi import get_wsgi_application\n"
+    "get_wsgi_application()\n"
+    "import backend.urls\n"
+    f"print(json.dumps([name for name in {DEFERRED!r} if name in sys.modules]))"
+)
+
+
+def run(args, cwd, extra=(), output=False):
+    env = {**os.environ, "DJANGO_SETTINGS_MODULE": "backend.settings", "PYTHONDONTWRITEBYTECODE": "1"}
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, *extra, *args], cwd=cwd, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} failed:\n{result.stderr[-2000:]}")
+    if output:
+        return elapsed, result.stderr, result.stdout
+    return elapsed, result.stderr
+
+
+def median_ms(args, cwd, runs):
+    run(args, cwd)  # warm the OS file cache
+    return statistics.median(run(args, cwd)[0] for _ in range(runs)) * 1000
+
+
+def timings(cwd, runs):
+    """Median ms per command; None for a command that failed, e.g. the Firestore client without credentials"""
+    results = {}
+    for name, command in COMMANDS.items():
+        try:
+            results[name] = median_ms(command, cwd, runs)
+        except RuntimeError as e:
+            print(f"{name}: skipped, {str(e).strip().splitlines()[-1]}")
+            results[name] = None
+    return results
+
+
+def slowest_imports(cwd, count):
+    """Top-level packages by cumulative import time, from -X importtime"""
+    _, stderr = run(COMMANDS["manage.py check"], cwd, extra=("-X", "importtime"))
+    totals = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit() or name.startswith("  "):
+            continue  # header, or not a top-level import
+        package = name.strip().split(".")[0]
+        totals[package] = totals.get(package, 0) + int(cumulative)
+    return sorted(totals.items(), key=lambda item: -item[1])[:count]
+
+
+def import_budget(cwd):
+    """Return (total import ms, deferred SDKs imported) for a worker boot"""
+    _, stderr, stdout = run(["-c", WORKER_BOOT], cwd, extra=("-X", "importtime"), output=True)
+    total = 0
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if cumulative.strip().isdigit() and not name.startswith("  "):
+                total += int(cumulative)
+    return total / 1000, json.loads(stdout.strip().splitlines()[-1])
+
+
+def export_revision(rev):
+    """Extract the backend directory at git revision `rev` into a temporary directory"""
+    target = tempfile.mkdtemp(prefix="bench-startup-")
+    # Run from a subdirectory, git archive exports just that subdirectory
+    archive = subprocess.run(["git", "archive", rev], cwd=BACKEND_DIR, capture_output=True, check=True)
+    subprocess.run(["tar", "-x", "-C", target], input=archive.stdout, check=True)
+    return target
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--compare", metavar="REV", help="git revision to compare against")
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS, help="import time budget for a worker boot")
+    args = parser.parse_args()
+
+    trees = [("working tree", BACKEND_DIR)]
+    cleanup = None
+    if args.compare:
+        cleanup = export_revision(args.compare)
+        trees.insert(0, (args.compare, cleanup))
+
+    try:
+        results = {label: timings(path, args.runs) for label, path in trees}
+        print(f"{'median ms':<24}" + "".join(f"{label:>16}" for label, _ in trees))
+        for name in COMMANDS:
+            cells = [results[label][name] for label, _ in trees]
+            print(f"{name:<24}" + "".join(f"{'-':>16}" if ms is None else f"{ms:>16.0f}" for ms in cells))
+
+        for label, path in trees:
+            print(f"\nslowest imports during manage.py check ({label}):")
+            for package, micros in slowest_imports(path, args.top):
+                print(f"  {package:<28} {micros / 1000:>8.1f} ms")
+
+        total_ms, imported = import_budget(BACKEND_DIR)
+        print(f"\nworker boot imports: {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+        if imported:
+            print(f"deferred SDKs imported at boot: {', '.join(imported)}")
+        if total_ms > args.budget_ms or imported:
+            print("FAIL: import budget exceeded")
+            sys.exit(1)
+        print("OK: within the import budget")
+    finally:
+        if cleanup:
+            shutil.rmtree(cleanup, ignore_errors=True)
@@ -0,0 +1,84 @@
+"""
+Concurrent quiz submissions: legacy read-modify-write vs record_submission.
+
+Runs against the Firestore emulator. Each strategy submits --submissions
+quizzes of 1 mark each for one user from --threads threads, then checks the
+final totals for lost updates. The user starts with totals from before the
+leaderboard existed, so for record_submission the benchmark also checks that the
+leaderboard entry ends up equal to the user document.
+
+    gcloud emulators firestore start --host-port=127.0.0.1:8081 &
+    cd backend && FIRESTORE_EMULATOR_HOST=127.0.0.1:8081 python benchmarks/bench_submissions.py
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.cloud import firestore  # noqa: E402
+from userAuth.leaderboard import Leaderboard  # noqa: E402
+from userAuth.submissions import record_submission  # noqa: E402
+
+# Totals the user already had before the leaderboard collection was backfilled
+PRIOR_MARKS = 40
+PRIOR_ATTEMPTS = 5
+
+
+def legacy_submission(db, uid, email, marks):
+    """The previous update_total_marks: one read and two separate updates"""
+    user_ref = db.collection('users').document(uid)
+    user_doc = user_ref.get()
+    updated_marks = (user_doc.get('total_marks') or 0) + marks
+    user_ref.update({'total_marks': updated_marks})
+    user_ref.update({'number_of_tests_attempted': user_doc.get('number_of_tests_attempted') + 1})
+    return updated_marks
+
+
+def run(name, submit, db, args):
+    uid = f"bench-{name}"
+    db.collection('users').document(uid).set(
+        {'email': f"{uid}@example.com", 'total_marks': PRIOR_MARKS, 'number_of_tests_attempted': PRIOR_ATTEMPTS}
+    )
+    db.collection('leaderboard').document(uid).delete()
+    latencies = []
+
+    def one(_):
+        start = time.perf_counter()
+        submit(db, uid, f"{uid}@example.com", 1)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        list(pool.map(one, range(args.submissions)))
+    elapsed = time.perf_counter() - start
+
+    final = db.collection('users').document(uid).get().to_dict()
+    lost = args.submissions + PRIOR_ATTEMPTS - final['number_of_tests_attempted']
+    print(f"{name:>8}: total_marks={final['total_marks']:>5} attempts={final['number_of_tests_attempted']:>5} "
+          f"lost updates={lost:>4}  p50={statistics.median(latencies) * 1000:6.1f} ms  "
+          f"throughput={args.submissions / elapsed:7.1f}/s")
+    entry = db.collection('leaderboard').document(uid).get().to_dict()
+    if entry is not None:
+        in_sync = (entry['total_marks'], entry['number_of_tests_attempted']) == \
+            (final['total_marks'], final['number_of_tests_attempted'])
+        print(f"{'':>8}  leaderboard entry: total_marks={entry['total_marks']} "
+              f"attempts={entry['number_of_tests_attempted']} ({'in sync' if in_sync else 'DRIFTED'})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent submission benchmark (Firestore emulator)")
+    parser.add_argument("--submissions", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=16)
+    args = parser.parse_args()
+
+    if not os.getenv("FIRESTORE_EMULATOR_HOST"):
+        sys.exit("Set FIRESTORE_EMULATOR_HOST to run against the Firestore emulator")
+
+    db = firestore.Client(project="eduassist-bench")
+    leaderboard = Leaderboard(db)
+    run("legacy", legacy_submission, db, args)
+    run("atomic", lambda *a: record_submission(*a, leaderboard=leaderboard), db, args)
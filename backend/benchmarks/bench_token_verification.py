@@ -0,0 +1,94 @@
+"""
+Firebase ID token verification cost with and without the local caches.
+
+Mints RS256 tokens with a throwaway key and serves the matching JWKS from a
+local HTTP server (with a Cache-Control header, like Google's endpoint), so
+no network access or Firebase project is needed.
+
+    cd backend && python benchmarks/bench_token_verification.py
+"""
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jwt  # noqa: E402
+from cryptography.hazmat.primitives.asymmetric import rsa  # noqa: E402
+from jwt.algorithms import RSAAlgorithm  # noqa: E402
+from userAuth.token_verifier import FirebaseTokenVerifier  # noqa: E402
+
+PROJECT_ID = "eduassist-bench"
+KID = "bench-key"
+ITERATIONS = 500
+
+
+def make_key_server(private_key):
+    jwk = RSAAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
+    jwk.update({"kid": KID, "alg": "RS256", "use": "sig"})
+    body = json.dumps({"keys": [jwk]}).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Cache-Control", "public, max-age=21600")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def mint_token(private_key, uid):
+    now = int(time.time())
+    claims = {
+        "iss": f"https://securetoken.google.com/{PROJECT_ID}",
+        "aud": PROJECT_ID,
+        "sub": uid,
+        "user_id": uid,
+        "auth_time": now - 10,
+        "iat": now - 10,
+        "exp": now + 3600,
+    }
+    return jwt.encode(claims, private_key, algorithm="RS256", headers={"kid": KID})
+
+
+def timed(fn, iterations=ITERATIONS):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+if __name__ == "__main__":
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    server = make_key_server(private_key)
+    verifier = FirebaseTokenVerifier(PROJECT_ID, jwks_url=f"http://127.0.0.1:{server.server_port}/")
+    token = mint_token(private_key, "bench-user")
+
+    def cold():
+        verifier.clear()
+        verifier.verify(token)
+
+    def signature_only():
+        verifier._tokens.clear()
+        verifier.verify(token)
+
+    def cached():
+        verifier.verify(token)
+
+    assert verifier.verify(token)["uid"] == "bench-user"
+    print(f"key fetch + RSA verify:  {timed(cold, 100):9.1f} us/request")
+    print(f"RSA verify (keys cached): {timed(signature_only):8.1f} us/request")
+    print(f"decoded-token cache hit: {timed(cached):9.1f} us/request")
+    print(f"stats: {verifier.stats}")
+    server.shutdown()
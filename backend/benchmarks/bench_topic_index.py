@@ -0,0 +1,118 @@
+"""
+Recall and lookup latency of backend.topic_index.
+
+Builds an index of curriculum topics, then queries it with the same topics
+as students phrase them (should match their topic) and with distinct but
+similar-looking topics (must not match anything). Latency is measured per
+lookup, including normalizing and vectorizing the query, with the index
+padded to several sizes.
+
+    cd backend && python benchmarks/bench_topic_index.py [--threshold 0.8]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.topic_index import DEFAULT_CONFIG, TopicIndex  # noqa: E402
+
+# topic -> ways students ask for it
+PARAPHRASES = {
+    "Photosynthesis": ["photosynthesis", "What is photosynthesis?", "how does photosynthesis work", "PHOTOSYNTHESIS explained",
+                       "Photosynthesis in plants"],
+    "Newton's laws of motion": ["newtons laws of motion", "Newton's laws of motion for beginners", "the laws of motion newton"],
+    "Cell division": ["cell division", "Cell Division explained", "what is cell division"],
+    "World War 2": ["world war II", "World War Two", "the second world war 2"],
+    "World War 1": ["World War I", "world war one", "the first world war"],
+    "Python loops": ["loops in python", "python loop", "Introduction to Python loops"],
+    "The French Revolution": ["French Revolution", "french revolution overview", "what was the french revolution"],
+    "Chemical bonding": ["chemical bonds", "Chemical bonding basics", "chemical bond"],
+    "The water cycle": ["water cycle", "the water cycle for beginners", "how does the water cycle work"],
+    "Plate tectonics": ["tectonic plates", "plate tectonics explained", "Plate Tectonics"],
+    "Fractions": ["fraction", "introduction to fractions", "basics of fractions"],
+    "Quadratic equations": ["quadratic equation", "Quadratic Equations", "what are quadratic equations"],
+    "The human digestive system": ["digestive system", "human digestive system", "the digestive system explained"],
+    "Pythagorean theorem": ["pythagorean theorem", "the Pythagorean theorem", "Pythagorean Theorem explained"],
+    "Electric circuits": ["electric circuit", "how do electric circuits work", "electric circuits basics"],
+    "Supply and demand": ["supply and demand", "Supply & demand", "basics of supply and demand"],
+    "The solar system": ["solar system", "our solar system", "what is the solar system"],
+    "Acids and bases": ["acids and bases", "Acid and base", "introduction to acids and bases"],
+    "Climate change": ["climate change", "what is climate change", "Climate Change explained"],
+    "Probability": ["probability", "probability basics", "introduction to probability"],
+    "The Roman Empire": ["roman empire", "the roman empire overview", "Roman Empire"],
+    "Sorting algorithms": ["sorting algorithm", "sorting algorithms explained", "Sorting Algorithms"],
+    "Human heart": ["the human heart", "how does the human heart work", "human hearts"],
+    "Volcanoes": ["volcano", "how are volcanoes formed", "volcanoes explained"],
+    "Linear equations": ["linear equation", "what are linear equations", "Linear Equations basics"],
+    "Binary trees": ["binary tree", "what are binary trees", "Binary Trees explained"],
+    "Organic chemistry": ["organic chemistry basics", "introduction to organic chemistry", "Organic Chemistry"],
+}
+
+# Look alike, mean something else: none of these may match an indexed topic
+DISTRACTORS = [
+    "Newton's first law", "Newton's third law", "World War 3", "java loops", "cellular respiration",
+    "mitosis", "meiosis", "the American revolution", "cosine rule", "kinetic energy", "potential energy",
+    "the human brain", "linear algebra", "quadratic formula", "DNA replication", "the Russian revolution",
+    "the Ottoman Empire", "searching algorithms", "earthquakes", "the lunar cycle", "covalent bonds",
+    "decimals", "electric fields", "inflation", "binary search trees", "binary search", "inorganic chemistry",
+    "organic farming", "how do I solve fractions", "plant cells",
+]
+
+
+def padding_topics(count, rng):
+    """Synthetic distinct topics to grow the index without adding near-duplicates"""
+    syllables = ["ka", "lo", "mi", "ren", "tu", "vas", "qui", "bex", "dor", "fen", "gal", "hip", "jor"]
+    words = lambda: "".join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))  # noqa: E731
+    return [f"{words()} {words()}" for _ in range(count)]
+
+
+def evaluate(index):
+    wrong = 0
+    misses = []
+    queries = [(topic, query) for topic, queries in PARAPHRASES.items() for query in queries]
+    for topic, query in queries:
+        match = index.nearest(query)
+        if match is None:
+            misses.append((query, topic))
+        elif match[0] != topic:
+            wrong += 1
+    false_matches = [(query, index.nearest(query)) for query in DISTRACTORS]
+    false_matches = [(query, match) for query, match in false_matches if match is not None]
+    return 1 - (len(misses) + wrong) / len(queries), wrong, misses, false_matches
+
+
+def latency_us(index, queries, repeats=5):
+    samples = []
+    for _ in range(repeats):
+        for query in queries:
+            start = time.perf_counter()
+            index.nearest(query)
+            samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threshold", type=float, default=DEFAULT_CONFIG["THRESHOLD"])
+    parser.add_argument("--dim", type=int, default=DEFAULT_CONFIG["DIM"])
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    queries = [query for queries in PARAPHRASES.values() for query in queries] + DISTRACTORS
+    for size in (100, 1000, DEFAULT_CONFIG["CAPACITY"]):
+        index = TopicIndex(dim=args.dim, capacity=size, threshold=args.threshold)
+        for topic in list(PARAPHRASES) + padding_topics(size - len(PARAPHRASES), rng):
+            index.add(topic)
+        recall, wrong, misses, false_matches = evaluate(index)
+        p50, p99 = latency_us(index, queries)
+        print(f"{len(index):>5} topics: recall {recall:.0%}, wrong matches {wrong}, "
+              f"false matches {len(false_matches)}/{len(DISTRACTORS)}, lookup p50 {p50:.0f} us, p99 {p99:.0f} us")
+        for query, topic in misses:
+            print(f"      missed: {query!r} (expected {topic!r})")
+        for query, (topic, score) in false_matches:
+            print(f"      false match: {query!r} -> {topic!r} ({score:.2f})")
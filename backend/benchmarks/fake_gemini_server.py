@@ -0,0 +1,91 @@
+"""
+Local stand-in for the Gemini streamGenerateContent endpoint.
+
+Streams a canned quiz (or notes) response in chunks with a configurable
+delay, so load tests measure our server's concurrency rather than Gemini's.
+Serves both the SSE format used by backend.gemini_async (?alt=sse) and the
+streamed JSON array used by the google-generativeai REST transport.
+
+    cd backend && python benchmarks/fake_gemini_server.py --port 8765 --chunks 10 --delay 0.2
+    GEMINI_API_BASE=http://127.0.0.1:8765 GEMINI_API_KEY=fake ...
+"""
+import argparse
+import asyncio
+import json
+
+QUESTION = {
+    "question": "What is the capital of France?",
+    "options": {"a": "Berlin", "b": "Madrid", "c": "Paris", "d": "Lisbon"},
+    "difficulty": "Beginner",
+    "tags": ["geography", "capital cities"],
+    "correct_answer": "c",
+    "attempted_option": "",
+    "hints": "Famous for Eiffel Tower",
+    "solution": "Paris is the capital of France.",
+}
+
+
+def response_chunks(count):
+    """Split a fenced JSON quiz of `count` questions into `count` text chunks"""
+    questions = [dict(QUESTION, question=f"{QUESTION['question']} ({i + 1})") for i in range(count)]
+    text = "```json\n" + json.dumps(questions, indent=2) + "\n```"
+    size = max(1, len(text) // count)
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def chunk_payload(text):
+    return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}]}
+
+
+async def handle(reader, writer, chunks, delay):
+    request_line = await reader.readline()
+    content_length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            content_length = int(value.strip())
+    if content_length:
+        await reader.readexactly(content_length)
+
+    sse = b"alt=sse" in request_line
+    content_type = "text/event-stream" if sse else "application/json"
+    writer.write(
+        f"HTTP/1.1 200 OK\r\nContent-Type: {content_type}\r\nConnection: close\r\n\r\n".encode()
+    )
+    if not sse:
+        writer.write(b"[")
+    for i, text in enumerate(chunks):
+        await asyncio.sleep(delay)
+        payload = json.dumps(chunk_payload(text))
+        if sse:
+            writer.write(f"data: {payload}\r\n\r\n".encode())
+        else:
+            writer.write(((",\n" if i else "") + payload).encode())
+        await writer.drain()
+    if not sse:
+        writer.write(b"]")
+    await writer.drain()
+    writer.close()
+
+
+async def main(args):
+    chunks = response_chunks(args.chunks)
+    server = await asyncio.start_server(
+        lambda r, w: handle(r, w, chunks, args.delay), args.host, args.port
+    )
+    print(f"Fake Gemini listening on http://{args.host}:{args.port} "
+          f"({len(chunks)} chunks, {args.delay}s apart)")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--chunks", type=int, default=10, help="questions per response, streamed in about as many chunks")
+    parser.add_argument("--delay", type=float, default=0.2, help="seconds between chunks")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,106 @@
+"""
+Concurrent load generator for the generation endpoints.
+
+Fires --requests POSTs (or GETs, with --method GET) at --url with
+--concurrency in flight, then reports throughput and latency percentiles.
+benchmarks/bench_server_profiles.py uses it to compare runserver with the
+production gunicorn profiles. To compare per-worker capacity of the
+sync and async views, start the fake upstream, then run the same load
+against each server profile with a single worker:
+
+    python benchmarks/fake_gemini_server.py --delay 0.2 &
+    export GEMINI_API_BASE=http://127.0.0.1:8765 GEMINI_API_KEY=fake GENERATION_CACHE_TTL=0
+
+    # before: sync views, one worker
+    gunicorn backend.wsgi -w 1 --threads 8 -b 127.0.0.1:8080 &
+    python benchmarks/loadtest.py --url http://127.0.0.1:8080/api/tutorials/create_notes -c 64 -n 256
+
+    # after: async views, one worker
+    DJANGO_ASYNC_VIEWS=true uvicorn backend.asgi:application --workers 1 --port 8080 &
+    python benchmarks/loadtest.py --url http://127.0.0.1:8080/api/tutorials/create_notes -c 64 -n 256
+
+Use --unique-topics so requests don't collapse into a single cached or
+coalesced generation.
+
+To skip the fake upstream and the Gemini client altogether, run the server
+with the in-process fake provider (see backend/llm.py). Tune the simulated
+model speed with LLM_FAKE_TOKENS_PER_SECOND and LLM_FAKE_FIRST_TOKEN_LATENCY.
+Set LLM_FAKE_RECORDINGS to replay responses captured with LLM_RECORD_PATH:
+
+    LLM_PROVIDER=fake uvicorn backend.asgi:application --workers 1 --port 8080 &
+
+All load comes from one client, so start the server with RATE_LIMIT_ENABLED=false
+to measure raw capacity. Leave it on to see the 429s and queueing a real quota
+produces (see backend/ratelimit.py).
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+import httpx
+
+
+async def run(args):
+    headers = {"Content-Type": "application/json"}
+    token = args.token or os.getenv("LOADTEST_ID_TOKEN")
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+
+    body = json.loads(args.body)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+    failures = 0
+
+    async def one(client, i):
+        nonlocal failures
+        payload = dict(body)
+        if args.unique_topics:
+            payload["topic"] = f"{payload.get('topic', 'topic')} {i}"
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                if args.method == "GET":
+                    response = await client.get(args.url, headers=headers)
+                else:
+                    response = await client.post(args.url, json=payload, headers=headers)
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            failures += not ok
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(one(client, i) for i in range(args.requests)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"requests:    {args.requests} ({failures} failed) at concurrency {args.concurrency}")
+    print(f"wall time:   {elapsed:.2f} s")
+    print(f"throughput:  {args.requests / elapsed:.1f} req/s")
+    print(f"latency p50: {statistics.median(latencies) * 1000:.0f} ms")
+    print(f"latency p95: {latencies[int(len(latencies) * 0.95) - 1] * 1000:.0f} ms")
+    return {
+        "failures": failures,
+        "throughput": args.requests / elapsed,
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent load generator for the generation endpoints")
+    parser.add_argument("--url", required=True)
+    parser.add_argument("--method", choices=("POST", "GET"), default="POST")
+    parser.add_argument("-c", "--concurrency", type=int, default=32)
+    parser.add_argument("-n", "--requests", type=int, default=128)
+    parser.add_argument("--body", default='{"topic": "Photosynthesis", "numQuestions": 10, '
+                                          '"difficulty": "Beginner", "timeLimit": 10, "userId": "loadtest"}')
+    parser.add_argument("--token", help="Firebase ID token (or set LOADTEST_ID_TOKEN)")
+    parser.add_argument("--unique-topics", action="store_true")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,64 @@
+"""
+Gunicorn configuration for production (used by the Dockerfile).
+
+    DJANGO_SETTINGS_MODULE=backend.settings_production gunicorn backend.asgi:application
+
+Gunicorn loads this file from the working directory. It supervises the worker
+processes: it restarts crashed workers, replaces workers gracefully on SIGHUP (new
+workers start before the old ones drain) and drains in-flight requests on
+SIGTERM.
+
+With preload_app on (the default here), SIGHUP rereads this file but forks the new
+workers from the master's already-imported app, so it does not pick up code changes.
+Deploy new code with a new master instead: roll out new containers and SIGTERM the
+old ones so they drain, or on a single host send the old master SIGUSR2 (starts a new
+master with the new code), then SIGWINCH and SIGQUIT once the new workers are up.
+
+By default each worker runs uvicorn's event loop (ASGI). Streaming responses
+and the async generation views then wait on the LLM without holding a thread
+per request, so a few workers are enough. For sync workers with a thread pool
+instead, set GUNICORN_WORKER_CLASS=gthread and serve backend.wsgi:application.
+
+Every value can be overridden with the environment variable next to it.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "uvicorn_worker.UvicornWorker")
+_cores = multiprocessing.cpu_count()
+# Event loop workers need about one per core. Thread pool workers also block on I/O, so they get the classic 2n+1.
+_default_workers = _cores + 1 if worker_class.endswith("UvicornWorker") else 2 * _cores + 1
+workers = int(os.getenv("WEB_CONCURRENCY", _default_workers))
+# Only used by the gthread worker class
+threads = int(os.getenv("GUNICORN_THREADS", 8))
+
+# Keep client connections open between requests. This should be longer than the
+# idle timeout of the load balancer in front, so it is never the side that closes first.
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 75))
+# Heartbeat timeout: a worker that stops responding for this long is restarted.
+# Long LLM calls are bounded separately by REQUEST_DEADLINES.
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 120))
+# Time given to in-flight requests, including streams, on reload or shutdown
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 60))
+
+# Recycle workers now and then so slow leaks can't accumulate; the jitter keeps them
+# from all restarting at once
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 5000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 500))
+
+# Import the app once in the master and fork workers from it: worker (re)starts are fast,
+# and the workers share the imported code's memory. This is safe because importing the
+# app opens no connections and starts no threads. The Firestore client, for example, is
+# created on first use in each worker (see backend/firebase_config.py). While this is on,
+# code changes need a new master (see the module docstring); SIGHUP only reloads settings.
+# GUNICORN_PRELOAD=false makes SIGHUP reload code too, at the cost of slower worker starts.
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+# Heartbeat files on tmpfs; a container's overlay filesystem can stall them
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG")  # e.g. "-" for stdout; off by default
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
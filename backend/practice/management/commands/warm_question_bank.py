@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from practice.question_bank import QuestionBank
+from practice.utils import generate_questions
+
+
+class Command(BaseCommand):
+    help = "Pre-generate practice question sets for the given topics"
+
+    def add_arguments(self, parser):
+        parser.add_argument("topics", nargs="+")
+        parser.add_argument("--sets", type=int, default=None, help="Fresh sets to keep per topic")
+
+    def handle(self, *args, **options):
+        bank = QuestionBank(settings.QUESTION_BANK)
+        if options["sets"] is not None:
+            bank.min_fresh_sets = options["sets"]
+        for topic in options["topics"]:
+            added = bank.warm(topic, generate_questions)
+            self.stdout.write(f"{topic}: added {added} sets, {bank.fresh_sets(topic)} fresh")
+        self.stdout.write(self.style.SUCCESS("Question bank warmed"))
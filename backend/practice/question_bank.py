@@ -0,0 +1,211 @@
+"""
+Persistent bank of generated practice question sets.
+
+Every generated set is saved in the quiz tables: one Quiz row per set, of kind
+Quiz.PRACTICE and keyed by the normalized topic and difficulty, with one
+Question row per question. A practice request is served the least-served set
+for its topic; quizzes stored for the quiz endpoints are never served. That is a single
+indexed query, so warm topics are answered in milliseconds instead of waiting
+on Gemini.
+
+A set counts as "fresh" until it has been served MAX_SERVES times. A background
+warmer thread tracks how often each topic is requested. For popular topics, and
+for any topic served from an exhausted set, it tops the bank back up to
+MIN_FRESH_SETS fresh sets. Configure through settings.QUESTION_BANK.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+
+from backend.generation_cache import normalize_text
+from backend.ratelimit import BACKGROUND, current_user
+from backend.questions import Question as TypedQuestion
+from quiz.models import Question, Quiz
+
+PRACTICE_DIFFICULTY = "Mixed"  # practice sets span beginner to advanced
+
+DEFAULT_CONFIG = {
+    "ENABLED": True,
+    "MIN_FRESH_SETS": 2,
+    "MAX_SERVES": 5,
+    "POPULAR_THRESHOLD": 3,
+    "WARM_INTERVAL": 30,
+}
+
+
+def topic_key(topic):
+    return normalize_text(topic)[:255]
+
+
+def question_row(quiz, position, question):
+    options = question.options
+    return Question(
+        quiz=quiz,
+        position=position,
+        text=question.text,
+        option1=options[0],
+        option2=options[1],
+        option3=options[2],
+        option4=options[3],
+        correct_answer=question.correct_answer,
+        difficulty=question.difficulty,
+        tags=list(question.tags),
+        hints=question.hints,
+        solution=question.solution,
+    )
+
+
+def from_question_row(row):
+    """Inverse of question_row"""
+    return TypedQuestion(
+        row.text,
+        (row.option1, row.option2, row.option3, row.option4),
+        row.correct_answer,
+        row.difficulty,
+        tuple(row.tags),
+        row.hints,
+        row.solution,
+    )
+
+
+class QuestionBank:
+    def __init__(self, config=None):
+        config = {**DEFAULT_CONFIG, **(config or {})}
+        self.min_fresh_sets = config["MIN_FRESH_SETS"]
+        self.max_serves = config["MAX_SERVES"]
+        self.popular_threshold = config["POPULAR_THRESHOLD"]
+        self.warm_interval = config["WARM_INTERVAL"]
+        self._demand = {}  # topic_key -> [topic, requests since the last warm cycle]
+        self._low = {}  # topic_key -> topic, served from an exhausted set
+        self._lock = threading.Lock()
+        self._warmer = None
+        self.stats = {"hits": 0, "misses": 0, "sets_added": 0, "warm_cycles": 0}
+
+    def add_set(self, topic, questions, difficulty=PRACTICE_DIFFICULTY):
+        """Store one generated set; returns the Quiz row or None if there was nothing to store"""
+        if not questions:
+            return None
+        with transaction.atomic():
+            quiz = Quiz.objects.create(
+                topic=topic[:255],
+                topic_key=topic_key(topic),
+                num_questions=len(questions),
+                difficulty=difficulty,
+                kind=Quiz.PRACTICE,
+            )
+            Question.objects.bulk_create(
+                question_row(quiz, position, question) for position, question in enumerate(questions)
+            )
+        self.stats["sets_added"] += 1
+        return quiz
+
+    def take(self, topic, difficulty=PRACTICE_DIFFICULTY):
+        """Return the least-served stored set for `topic` as a list of Question objects, or None"""
+        self.record_demand(topic)
+        key = topic_key(topic)
+        quiz = (
+            Quiz.objects.filter(kind=Quiz.PRACTICE, topic_key=key, difficulty=difficulty)
+            .order_by("times_served", "-created_at")
+            .first()
+        )
+        if quiz is None:
+            self.stats["misses"] += 1
+            return None
+
+        Quiz.objects.filter(pk=quiz.pk).update(times_served=F("times_served") + 1)
+        if quiz.times_served + 1 >= self.max_serves:
+            # Serve it anyway, but have the warmer generate fresh sets
+            with self._lock:
+                self._low[key] = topic
+        self.stats["hits"] += 1
+        return [from_question_row(row) for row in quiz.questions.all()]
+
+    def fresh_sets(self, topic, difficulty=PRACTICE_DIFFICULTY):
+        return Quiz.objects.filter(
+            kind=Quiz.PRACTICE, topic_key=topic_key(topic), difficulty=difficulty, times_served__lt=self.max_serves
+        ).count()
+
+    def record_demand(self, topic):
+        self.start_warmer()
+        with self._lock:
+            entry = self._demand.setdefault(topic_key(topic), [topic, 0])
+            entry[1] += 1
+
+    def topics_to_warm(self):
+        """Popular and exhausted topics since the last call; resets the counters"""
+        with self._lock:
+            topics = {key: topic for key, (topic, count) in self._demand.items() if count >= self.popular_threshold}
+            topics.update(self._low)
+            self._demand.clear()
+            self._low.clear()
+        return list(topics.values())
+
+    def warm(self, topic, generate):
+        """
+        Generate sets for `topic` until it has MIN_FRESH_SETS fresh ones; returns the number added.
+
+        `generate` is practice.utils.generate_questions, which stores each set it produces.
+        """
+        added = 0
+        for _ in range(max(0, self.min_fresh_sets - self.fresh_sets(topic))):
+            if not generate(topic):
+                break  # refusals and failures aren't worth retrying in the background
+            added += 1
+        return added
+
+    def warm_cycle(self, generate):
+        self.stats["warm_cycles"] += 1
+        for topic in self.topics_to_warm():
+            try:
+                added = self.warm(topic, generate)
+                if added:
+                    print(f"Question bank: added {added} sets for '{topic}'")
+            except Exception as e:
+                print(f"Question bank: warming '{topic}' failed: {e}")
+
+    def start_warmer(self):
+        """Start the background warmer thread in this process (once)"""
+        if self._warmer is not None and self._warmer.is_alive():
+            return
+        with self._lock:
+            if self._warmer is not None and self._warmer.is_alive():
+                return
+            self._warmer = threading.Thread(target=self._run_warmer, name="question-bank-warmer", daemon=True)
+            self._warmer.start()
+
+    def _run_warmer(self):
+        # Imported here because practice.utils imports this module
+        from .utils import generate_questions
+
+        # Background calls only use LLM quota that interactive requests leave spare
+        current_user.set(BACKGROUND)
+        while True:
+            time.sleep(self.warm_interval)
+            try:
+                self.warm_cycle(generate_questions)
+            finally:
+                close_old_connections()
+
+
+_bank = None
+_bank_lock = threading.Lock()
+
+
+def get_bank():
+    """Process-wide question bank, or None if disabled in settings.QUESTION_BANK"""
+    global _bank
+    config = {**DEFAULT_CONFIG, **getattr(settings, "QUESTION_BANK", {})}
+    if not config["ENABLED"]:
+        return None
+    if _bank is None:
+        with _bank_lock:
+            if _bank is None:
+                _bank = QuestionBank(config)
+    return _bank
+
+
+def bank_stats():
+    return _bank.stats if _bank is not None else {}
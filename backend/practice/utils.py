@@ -1,62 +1,20 @@
-import google.generativeai as genai
-import requests
-import os
 import time
-import socket
+from contextlib import aclosing, closing
+from asgiref.sync import sync_to_async
 from dotenv import load_dotenv
+from backend.deadlines import DeadlineExceeded
+from backend.ratelimit import RateLimited
+from backend.llm import get_provider
+from backend.generation_cache import make_key
+from backend.singleflight import get_async_flight, get_flight
+from backend.streaming import JSONArrayStream
+from backend.questions import from_rows, parse_questions, to_rows, validate_questions
+from .question_bank import get_bank
 
 load_dotenv()
 
-def is_proxy_needed():
-    """Check if we're likely in the hostel network that needs a proxy"""
-    # You can customize this check based on your network environment
-    # For example, check the local IP address pattern or try to connect to a known host
-    try:
-        # Try to get hostname - this might help identify the network
-        hostname = socket.gethostname()
-        
-        # Or check IP address pattern
-        ip = socket.gethostbyname(hostname)
-        if os.path.exists("use_proxy.flag"):
-            return True
-            
-        # For demo, just check if we're in a specific network
-        return ip.startswith("172.31.")
-    except:
-        # If any error occurs, default to no proxy
-        return False
-
-def configure_api():
-    """Configure the Gemini API with or without proxy based on the network"""
-    # Always configure with the API key
-    api_config = {
-        "api_key": os.getenv("GEMINI_API_KEY"),
-        "transport": "rest",
-    }
-    
-    # Check if we need to use proxy
-    if is_proxy_needed():
-        print("Detected hostel network - configuring with proxy")
-        # Set proxy for environment
-        os.environ["HTTP_PROXY"] = "http://172.31.2.4:8080"
-        os.environ["HTTPS_PROXY"] = "http://172.31.2.4:8080"
-    else:
-        print("No proxy needed - clearing proxy settings")
-        # Clear any proxy settings that might be lingering
-        if "HTTP_PROXY" in os.environ:
-            del os.environ["HTTP_PROXY"]
-        if "HTTPS_PROXY" in os.environ:
-            del os.environ["HTTPS_PROXY"]
-    
-    # Configure the API
-    genai.configure(**api_config)
-
-def generate_questions(topic):
-    # Make sure API is configured correctly for current network
-    configure_api()
-    
-    model = genai.GenerativeModel("gemini-2.0-flash")
-    prompt = f"""
+def build_prompt(topic):
+    return f"""
     If the given topic '{topic}' is NSFW, or is some sensitive topic or something you don't understand or something not safe for children to know, just dont give anything - give an empty json list.
     But if '{topic}' is a normal topic then generate 20 multiple-choice questions on the topic "{topic}" with three difficulty levels:
     - First 12 should be beginner-level
@@ -77,41 +35,111 @@ def generate_questions(topic):
     
     Return the result as a JSON array, without any markdown formatting.
     """
+
+def _generate_questions_text(topic, deadline=None):
+    prompt = build_prompt(topic)
+    provider = get_provider()
     start_time = time.time()  # Track execution time
-    print("🚀 Sending request to Gemini API...")
+    print(f"🚀 Sending request to {provider.name}...")
 
     try:
-        response = model.generate_content(prompt, stream=True)  # Enable streaming  
-        text = ""  
-        for chunk in response:  
-            text += chunk.text  
-        
-        end_time = time.time()
-        print(f"✅ Received response in {end_time - start_time:.2f} seconds")
-        return text
+        text = provider.generate_text(prompt, kind="practice", deadline=deadline)
+    except (DeadlineExceeded, RateLimited):
+        raise
     except Exception as e:
         print(f"Error generating content: {e}")
-        # If error occurs and might be proxy-related, try the other configuration
-        if "proxy" in str(e).lower() or "connection" in str(e).lower():
-            print("Connection error detected. Trying with alternate proxy settings...")
-            # Toggle proxy setting and try again
-            if "HTTP_PROXY" in os.environ:
-                del os.environ["HTTP_PROXY"]
-                del os.environ["HTTPS_PROXY"]
-                print("Retrying without proxy...")
-            else:
-                os.environ["HTTP_PROXY"] = "http://172.31.2.4:8080"
-                os.environ["HTTPS_PROXY"] = "http://172.31.2.4:8080"
-                print("Retrying with proxy...")
-            
-            try:
-                response = model.generate_content(prompt, stream=True)
-                text = ""
-                for chunk in response:  
-                    text += chunk.text  
-                return text
-            except Exception as retry_error:
-                print(f"Retry also failed: {retry_error}")
         return ""
-    
 
+    end_time = time.time()
+    print(f"✅ Received response in {end_time - start_time:.2f} seconds")
+    return text
+
+def _generate_and_bank(topic, deadline=None):
+    questions = parse_questions(_generate_questions_text(topic, deadline))
+    bank = get_bank()
+    if bank is not None:
+        bank.add_set(topic, questions)
+    # Compact rows, so the result can be shared across workers
+    return to_rows(questions)
+
+def generate_questions(topic, deadline=None):
+    """
+    Generate a new practice set and save it to the question bank.
+
+    Concurrent requests for a topic share one Gemini call. Returns a list of Question objects.
+    """
+    return from_rows(get_flight("practice").do(make_key("practice", topic), _generate_and_bank, topic, deadline=deadline))
+
+def get_practice_questions(topic, deadline=None):
+    """Return practice questions for `topic`, from the question bank when it has a set"""
+    bank = get_bank()
+    if bank is not None:
+        questions = bank.take(topic)
+        if questions:
+            return questions
+    return generate_questions(topic, deadline)
+
+async def _generate_and_bank_async(topic, deadline=None):
+    text = await get_provider().generate_text_async(build_prompt(topic), kind="practice", deadline=deadline)
+    questions = parse_questions(text)
+    bank = get_bank()
+    if bank is not None:
+        await sync_to_async(bank.add_set)(topic, questions)
+    return to_rows(questions)
+
+async def generate_questions_async(topic, deadline=None):
+    """Async counterpart of generate_questions for the ASGI views"""
+    return from_rows(await get_async_flight("practice").do(make_key("practice", topic), _generate_and_bank_async, topic, deadline=deadline))
+
+async def get_practice_questions_async(topic, deadline=None):
+    """Async counterpart of get_practice_questions"""
+    bank = get_bank()
+    if bank is not None:
+        questions = await sync_to_async(bank.take)(topic)
+        if questions:
+            return questions
+    return await generate_questions_async(topic, deadline)
+
+def stream_questions(topic, deadline=None):
+    """
+    Yield practice questions one by one as soon as Gemini finishes each of them.
+
+    Question bank hits are served immediately; otherwise the streamed set is saved
+    to the bank once it is complete.
+    """
+    bank = get_bank()
+    if bank is not None:
+        questions = bank.take(topic)
+        if questions:
+            yield from questions
+            return
+
+    parser = JSONArrayStream()
+    questions = []
+    with closing(get_provider().stream_text(build_prompt(topic), kind="practice", deadline=deadline)) as chunks:
+        for text in chunks:
+            for question in validate_questions(parser.feed(text)):
+                questions.append(question)
+                yield question
+    if bank is not None:
+        bank.add_set(topic, questions)
+
+async def stream_questions_async(topic, deadline=None):
+    """Async counterpart of stream_questions"""
+    bank = get_bank()
+    if bank is not None:
+        questions = await sync_to_async(bank.take)(topic)
+        if questions:
+            for question in questions:
+                yield question
+            return
+
+    parser = JSONArrayStream()
+    questions = []
+    async with aclosing(get_provider().stream_text_async(build_prompt(topic), kind="practice", deadline=deadline)) as chunks:
+        async for text in chunks:
+            for question in validate_questions(parser.feed(text)):
+                questions.append(question)
+                yield question
+    if bank is not None:
+        await sync_to_async(bank.add_set)(topic, questions)
@@ -1,41 +1,128 @@
-from .utils import generate_questions
+from .utils import get_practice_questions, get_practice_questions_async, stream_questions, stream_questions_async
+from backend.deadlines import Deadline
+from backend.ratelimit import rate_limited
+from backend.questions import to_dicts
+from backend.responses import error_event, error_response
+from backend.streaming import ndjson_response
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 import json
-import re
 
-def extract_json_from_markdown(markdown_text):
-    # Extract JSON block inside triple backticks
-    match = re.search(r'```json([\s\S]*?)```', markdown_text)
 
-    if not match:
-        raise ValueError("No JSON block found in Markdown.")
+def parse_practice_request(request):
+    """
+    Parse and validate a practice request body.
 
+    Returns (topic, None) on success or (None, JsonResponse) describing the error.
+    """
     try:
-        json_data = json.loads(match.group(1).strip())  # Convert JSON string to Python dict
-        return json_data
-    except json.JSONDecodeError:
-        raise ValueError("Invalid JSON format.")
+        data = json.loads(request.body)
+    except Exception as e:
+        return None, JsonResponse({"error": str(e)}, status=400)
+    if not isinstance(data, dict):
+        return None, JsonResponse({"error": "Request body must be a JSON object"}, status=400)
+
+    topic = data.get("topic")
+    if not topic:
+        return None, JsonResponse({"error": "Topic is required"}, status=400)
+    if not isinstance(topic, str) or not topic.strip():
+        return None, JsonResponse({"error": "Topic must be a non-empty string"}, status=400)
+    return topic, None
+
+
+def practice_response(questions):
+    if len(questions) == 0:
+        return JsonResponse({"error": "Cannot create practice questions!"}, status=500)
+    return JsonResponse({"questions": to_dicts(questions)}, status=200)
+
+
+def question_event(index, question):
+    return {"type": "question", "index": index, "question": question.to_dict()}
+
+
+def done_event(count):
+    if count == 0:
+        return {"type": "error", "error": "Cannot create practice questions!"}
+    return {"type": "done", "count": count}
 
 
 @csrf_exempt  # Disable CSRF for testing (not recommended in production)
 @require_POST  # Only allow POST requests
+@rate_limited
 def create_practice_questions(request):
+    topic, error = parse_practice_request(request)
+    if error is not None:
+        return error
     try:
-        data = json.loads(request.body)
-        topic = data.get("topic")
-        
-        if not topic:
-            return JsonResponse({"error": "Topic is required"}, status=400)
-
-        # Your logic to generate questions
-        questions = generate_questions(topic) 
-        if len(questions) == 0:
-            return JsonResponse({"error": "Cannot create practice questions!"}, status=500)
+        # Served from the question bank when the topic is warm
+        return practice_response(get_practice_questions(topic, Deadline.from_request(request)))
+    except Exception as e:
+        return error_response(e)
 
-        questions = extract_json_from_markdown(questions) 
-        return JsonResponse({"questions": questions}, status=200)
 
+@csrf_exempt
+@require_POST
+@rate_limited
+async def create_practice_questions_async(request):
+    """Async (ASGI) variant of create_practice_questions"""
+    topic, error = parse_practice_request(request)
+    if error is not None:
+        return error
+    try:
+        return practice_response(await get_practice_questions_async(topic, Deadline.from_request(request)))
     except Exception as e:
-        return JsonResponse({"error": str(e)}, status=500)
+        return error_response(e)
+
+
+@csrf_exempt
+@require_POST
+@rate_limited
+def create_practice_questions_stream(request):
+    """
+    Streaming variant of create_practice_questions.
+
+    Emits one newline-delimited JSON "question" event per question as soon as it
+    is generated, followed by a "done" (or "error") event.
+    """
+    topic, error = parse_practice_request(request)
+    if error is not None:
+        return error
+    deadline = Deadline.from_request(request, stream=True)
+
+    def events():
+        count = 0
+        try:
+            for question in stream_questions(topic, deadline):
+                yield question_event(count, question)
+                count += 1
+        except Exception as e:
+            yield error_event(e)
+            return
+        yield done_event(count)
+
+    return ndjson_response(events())
+
+
+@csrf_exempt
+@require_POST
+@rate_limited
+async def create_practice_questions_stream_async(request):
+    """Async (ASGI) variant of create_practice_questions_stream, with the same events"""
+    topic, error = parse_practice_request(request)
+    if error is not None:
+        return error
+    deadline = Deadline.from_request(request, stream=True)
+
+    async def events():
+        count = 0
+        try:
+            async for question in stream_questions_async(topic, deadline):
+                yield question_event(count, question)
+                count += 1
+        except Exception as e:
+            yield error_event(e)
+            return
+        yield done_event(count)
+
+    return ndjson_response(events())
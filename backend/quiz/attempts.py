@@ -0,0 +1,252 @@
+"""
+Graded quiz attempts and the analytics tables behind them.
+
+Every generated quiz is saved in the quiz tables (store_quiz) for the user it
+was generated for, and its id goes back to the client along with the questions.
+A submission sends that id and the selected options, nothing else. Only that
+user can submit the quiz, and only once. The answers are graded against the
+stored correct answers, never against the client's copy of the quiz. One
+transaction then writes:
+
+- a QuizAttempt row, plus one AttemptAnswer row per question in a single bulk insert
+- increments to the user's UserStats, to their UserTopicStats for the quiz's
+  topic, and to that topic's TopicStats
+
+Each summary row changes with one UPDATE of F() expressions. Concurrent
+submissions therefore never lose updates, and nothing is read first. Dashboards
+read a user's totals, streak and per-topic scores with indexed lookups of those
+rows, so the cost doesn't grow with the number of attempts behind them.
+"""
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from backend.questions import OPTION_KEYS
+from practice.question_bank import question_row, topic_key
+from .models import AttemptAnswer, Question, Quiz, QuizAttempt, TopicStats, UserStats, UserTopicStats
+
+MAX_RECENT_ATTEMPTS = 100
+MAX_TIME_SPENT = 24 * 3600
+
+_stats = {"quizzes_stored": 0, "attempts": 0, "answers_written": 0}
+
+
+class AttemptExists(Exception):
+    pass
+
+
+def store_quiz(topic, difficulty, questions, user_id):
+    """Save a quiz generated for `user_id` so their attempt can be graded; returns its id, or None if it wasn't saved"""
+    try:
+        with transaction.atomic():
+            quiz = Quiz.objects.create(
+                user_id=user_id,
+                topic=topic[:255],
+                topic_key=topic_key(topic),
+                num_questions=len(questions),
+                difficulty=str(difficulty)[:255],
+                kind=Quiz.QUIZ,
+            )
+            Question.objects.bulk_create(
+                question_row(quiz, position, question) for position, question in enumerate(questions)
+            )
+    except Exception as e:
+        # The quiz is still returned; it just can't be graded server-side
+        print(f"Saving quiz '{topic}' failed: {e}")
+        return None
+    _stats["quizzes_stored"] += 1
+    return quiz.pk
+
+
+def selected_options(answers, count):
+    """
+    Normalize submitted answers to one option per question ('' if unanswered).
+
+    `answers` is a list in question order or an object keyed by question index.
+    Raises ValueError if it doesn't fit a quiz of `count` questions.
+    """
+    if isinstance(answers, dict):
+        try:
+            by_index = {int(index): option for index, option in answers.items()}
+        except (TypeError, ValueError):
+            raise ValueError("answers must be keyed by question index")
+        if any(not 0 <= index < count for index in by_index):
+            raise ValueError(f"The quiz has {count} questions")
+        answers = [by_index.get(index) for index in range(count)]
+    elif not isinstance(answers, list):
+        raise ValueError("answers must be a list or an object")
+    if len(answers) > count:
+        raise ValueError(f"The quiz has {count} questions, got {len(answers)} answers")
+
+    selected = []
+    for option in answers + [None] * (count - len(answers)):
+        option = (option or "").strip().lower() if isinstance(option, str) or option is None else option
+        if option != "" and option not in OPTION_KEYS:
+            raise ValueError(f"Invalid option {option!r}")
+        selected.append(option)
+    return selected
+
+
+def _increments(correct, total, score, submitted_at):
+    return {
+        "attempts": F("attempts") + 1,
+        "questions_answered": F("questions_answered") + total,
+        "correct_answers": F("correct_answers") + correct,
+        "score_total": F("score_total") + score,
+        "best_score": Greatest("best_score", Value(score)),
+        "last_attempt_at": submitted_at,
+    }
+
+
+def _streak(today):
+    """The streak after an attempt on `today`: unchanged the same day, +1 the next day, else restarted"""
+    return Case(
+        When(last_attempt_date=today, then=F("current_streak")),
+        When(last_attempt_date=today - timedelta(days=1), then=F("current_streak") + 1),
+        default=Value(1),
+    )
+
+
+def _bump(model, lookup, defaults, changes):
+    """Apply the `changes` expressions to the row matching `lookup`, creating it first if there is none"""
+    if model.objects.filter(**lookup).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **defaults)
+    except IntegrityError:
+        pass  # another submission created it first
+    model.objects.filter(**lookup).update(**changes)
+
+
+def submit_attempt(user_id, quiz_id, answers, time_spent=None):
+    """
+    Grade and record one attempt at a stored quiz; returns the result for the API.
+
+    Raises Quiz.DoesNotExist for an unknown quiz or one stored for another user,
+    AttemptExists if the user already submitted it, and ValueError for answers
+    that don't fit it.
+    """
+    # The range check also turns away NaN and Infinity, which json.loads accepts
+    if time_spent is not None and (not isinstance(time_spent, (int, float)) or not 0 <= time_spent <= MAX_TIME_SPENT):
+        raise ValueError(f"time_spent must be a number of seconds, at most {MAX_TIME_SPENT}")
+    quiz = Quiz.objects.only("id", "topic", "topic_key").get(pk=quiz_id, user_id=user_id)
+    questions = list(
+        Question.objects.filter(quiz_id=quiz.pk)
+        .order_by("position")
+        .values_list("id", "text", "correct_answer", "tags", "solution")
+    )
+    if not questions:
+        raise ValueError("The quiz has no questions")
+    selected = selected_options(answers, len(questions))
+
+    graded = [option == correct for option, (_, _, correct, _, _) in zip(selected, questions)]
+    correct = sum(graded)
+    total = len(questions)
+    score = correct / total * 100
+    key = quiz.topic_key or topic_key(quiz.topic)
+    submitted_at = timezone.now()
+    today = timezone.localdate(submitted_at)
+
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                attempt = QuizAttempt.objects.create(
+                    user_id=user_id,
+                    quiz=quiz,
+                    topic_key=key,
+                    correct=correct,
+                    total=total,
+                    score=score,
+                    time_spent=round(time_spent) if time_spent is not None else None,
+                    submitted_at=submitted_at,
+                )
+        except IntegrityError:
+            # attempt_once_per_user: a resubmission must not count twice
+            raise AttemptExists("This quiz has already been submitted")
+        AttemptAnswer.objects.bulk_create(
+            AttemptAnswer(attempt=attempt, question_id=question[0], selected_option=option, is_correct=is_correct)
+            for question, option, is_correct in zip(questions, selected, graded)
+        )
+        increments = _increments(correct, total, score, submitted_at)
+        _bump(UserStats, {"user_id": user_id}, {}, {
+            **increments,
+            "current_streak": _streak(today),
+            "max_streak": Greatest("max_streak", _streak(today)),
+            "last_attempt_date": today,
+        })
+        _bump(UserTopicStats, {"user_id": user_id, "topic_key": key}, {"topic": quiz.topic}, increments)
+        _bump(TopicStats, {"topic_key": key}, {"topic": quiz.topic}, increments)
+        user_stats = UserStats.objects.get(user_id=user_id)
+        user_topic_stats = UserTopicStats.objects.get(user_id=user_id, topic_key=key)
+
+    _stats["attempts"] += 1
+    _stats["answers_written"] += total
+
+    wrong_tags = {}
+    analysis = []
+    for (_, text, correct_answer, tags, solution), option, is_correct in zip(questions, selected, graded):
+        analysis.append({
+            "question": text,
+            "attempted_option": option,
+            "correct_answer": correct_answer,
+            "is_correct": is_correct,
+            "tags": tags,
+            "solution": solution,
+        })
+        if not is_correct:
+            for tag in tags:
+                wrong_tags[tag] = wrong_tags.get(tag, 0) + 1
+
+    return {
+        "attempt_id": attempt.pk,
+        "quiz_id": quiz.pk,
+        "topic": quiz.topic,
+        "score": {"correct": correct, "wrong": total - correct, "total": total, "percentage": score},
+        "question_analysis": analysis,
+        "wrong_tags": wrong_tags,
+        "stats": user_stats.to_dict(),
+        "topic_stats": user_topic_stats.to_dict(),
+    }
+
+
+def user_summary(user_id, topics=20):
+    """The user's totals and streak, and their most recently attempted topics"""
+    stats = UserStats.objects.filter(user_id=user_id).first() or UserStats(user_id=user_id)
+    recent = UserTopicStats.objects.filter(user_id=user_id).order_by("-last_attempt_at")[:topics]
+    return {"stats": stats.to_dict(), "topics": [row.to_dict() for row in recent]}
+
+
+def topic_summary(topic):
+    """Totals over every user's attempts at `topic`, or None if nobody has attempted it"""
+    stats = TopicStats.objects.filter(topic_key=topic_key(topic)).first()
+    return stats.to_dict() if stats is not None else None
+
+
+def recent_attempts(user_id, limit=10):
+    rows = (
+        QuizAttempt.objects.filter(user_id=user_id)
+        .order_by("-submitted_at")
+        .values("id", "quiz_id", "quiz__topic", "correct", "total", "score", "time_spent", "submitted_at")
+        [:min(limit, MAX_RECENT_ATTEMPTS)]
+    )
+    return [
+        {
+            "attempt_id": row["id"],
+            "quiz_id": row["quiz_id"],
+            "topic": row["quiz__topic"],
+            "correct": row["correct"],
+            "total": row["total"],
+            "score": row["score"],
+            "time_spent": row["time_spent"],
+            "submitted_at": row["submitted_at"].isoformat(),
+        }
+        for row in rows
+    ]
+
+
+def attempt_stats():
+    return dict(_stats)
@@ -0,0 +1,52 @@
+# Generated by Django 5.1.7 on 2026-10-18 19:07
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0004_userstreak'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='question',
+            options={'ordering': ['position']},
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='hints',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='position',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='solution',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='times_served',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='topic_key',
+            field=models.CharField(db_index=True, default='', max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(fields=['topic_key', 'difficulty', 'times_served'], name='quiz_bank_lookup'),
+        ),
+    ]
@@ -0,0 +1,109 @@
+# Generated by Django 5.1.7 on 2026-10-18 19:56
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0005_question_bank'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TopicStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.IntegerField(default=0)),
+                ('questions_answered', models.IntegerField(default=0)),
+                ('correct_answers', models.IntegerField(default=0)),
+                ('score_total', models.FloatField(default=0)),
+                ('best_score', models.FloatField(default=0)),
+                ('last_attempt_at', models.DateTimeField(blank=True, null=True)),
+                ('topic_key', models.CharField(max_length=255, unique=True)),
+                ('topic', models.CharField(max_length=255)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.IntegerField(default=0)),
+                ('questions_answered', models.IntegerField(default=0)),
+                ('correct_answers', models.IntegerField(default=0)),
+                ('score_total', models.FloatField(default=0)),
+                ('best_score', models.FloatField(default=0)),
+                ('last_attempt_at', models.DateTimeField(blank=True, null=True)),
+                ('user_id', models.CharField(max_length=128, unique=True)),
+                ('current_streak', models.IntegerField(default=0)),
+                ('max_streak', models.IntegerField(default=0)),
+                ('last_attempt_date', models.DateField(blank=True, null=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='QuizAttempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.CharField(max_length=128)),
+                ('topic_key', models.CharField(max_length=255)),
+                ('correct', models.IntegerField()),
+                ('total', models.IntegerField()),
+                ('score', models.FloatField()),
+                ('time_spent', models.IntegerField(blank=True, null=True)),
+                ('submitted_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attempts', to='quiz.quiz')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AttemptAnswer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('selected_option', models.CharField(blank=True, default='', max_length=1)),
+                ('is_correct', models.BooleanField()),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='quiz.question')),
+                ('attempt', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='quiz.quizattempt')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserTopicStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.IntegerField(default=0)),
+                ('questions_answered', models.IntegerField(default=0)),
+                ('correct_answers', models.IntegerField(default=0)),
+                ('score_total', models.FloatField(default=0)),
+                ('best_score', models.FloatField(default=0)),
+                ('last_attempt_at', models.DateTimeField(blank=True, null=True)),
+                ('user_id', models.CharField(max_length=128)),
+                ('topic_key', models.CharField(max_length=255)),
+                ('topic', models.CharField(max_length=255)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user_id', '-last_attempt_at'], name='user_topic_recent')],
+                'constraints': [models.UniqueConstraint(fields=('user_id', 'topic_key'), name='user_topic_stats_unique')],
+            },
+        ),
+        migrations.DeleteModel(
+            name='UserStreak',
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['user_id', '-submitted_at'], name='attempt_user_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['topic_key', '-submitted_at'], name='attempt_topic_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='attemptanswer',
+            index=models.Index(fields=['question', 'is_correct'], name='answer_question_outcome'),
+        ),
+    ]
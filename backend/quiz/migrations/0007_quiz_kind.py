@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-18 20:18
+
+from django.db import migrations, models
+
+
+def mark_bank_sets(apps, schema_editor):
+    """Existing question bank sets are the "Mixed" quizzes nobody has submitted an attempt at"""
+    Quiz = apps.get_model("quiz", "Quiz")
+    Quiz.objects.filter(difficulty="Mixed", attempts__isnull=True).update(kind="practice")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0006_attempts'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='quiz',
+            name='quiz_bank_lookup',
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='kind',
+            field=models.CharField(default='quiz', max_length=16),
+        ),
+        migrations.RunPython(mark_bank_sets, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(fields=['kind', 'topic_key', 'difficulty', 'times_served'], name='quiz_bank_lookup'),
+        ),
+    ]
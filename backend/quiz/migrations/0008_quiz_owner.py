@@ -0,0 +1,40 @@
+# Generated by Django 5.1.7 on 2026-10-18 20:26
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def assign_owners(apps, schema_editor):
+    """
+    A stored quiz belongs to whoever submitted it first. Later submissions by the
+    same user are deleted so the unique constraint can be added; the summary rows
+    already counted them and are left as they are.
+    """
+    Quiz = apps.get_model("quiz", "Quiz")
+    QuizAttempt = apps.get_model("quiz", "QuizAttempt")
+    first = QuizAttempt.objects.values("quiz_id").annotate(first_id=Min("id"))
+    for row in first:
+        user_id = QuizAttempt.objects.values_list("user_id", flat=True).get(pk=row["first_id"])
+        Quiz.objects.filter(pk=row["quiz_id"]).update(user_id=user_id)
+    kept = QuizAttempt.objects.values("user_id", "quiz_id").annotate(first_id=Min("id")).values_list("first_id", flat=True)
+    QuizAttempt.objects.exclude(pk__in=list(kept)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0007_quiz_kind'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='user_id',
+            field=models.CharField(blank=True, default='', max_length=128),
+        ),
+        migrations.RunPython(assign_owners, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='quizattempt',
+            constraint=models.UniqueConstraint(fields=('user_id', 'quiz'), name='attempt_once_per_user'),
+        ),
+    ]
@@ -4,9 +4,23 @@ from django.utils.timezone import now
 from datetime import timedelta
 
 class Quiz(models.Model):
+    QUIZ = "quiz"  # generated for one quiz request (see quiz/attempts.py)
+    PRACTICE = "practice"  # a question bank set, served to any practice request
+
     topic = models.CharField(max_length=255)
     num_questions = models.IntegerField()
     difficulty = models.CharField(max_length=255)
+    kind = models.CharField(max_length=16, default=QUIZ)
+    user_id = models.CharField(max_length=128, blank=True, default="")  # Firebase uid a QUIZ was generated for
+    # Question bank bookkeeping (see practice/question_bank.py)
+    topic_key = models.CharField(max_length=255, default="", db_index=True)  # normalized topic
+    times_served = models.IntegerField(default=0)
+    created_at = models.DateTimeField(default=now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["kind", "topic_key", "difficulty", "times_served"], name="quiz_bank_lookup"),
+        ]
 
     def __str__(self):
         return f"{self.topic} - {self.num_questions} {self.difficulty} Questions"
@@ -22,7 +36,109 @@ class Question(models.Model):
     difficulty = models.CharField(max_length=255)
     attempted_option = models.CharField(max_length=1, blank=True, null=True)  #will store 'a', 'b', 'c', or 'd'
     tags = models.JSONField(default=list) 
+    hints = models.TextField(blank=True, default="")
+    solution = models.TextField(blank=True, default="")
+    position = models.IntegerField(default=0)  # order within the quiz
+
+    class Meta:
+        ordering = ["position"]
 
     def __str__(self):
         return self.text
 
+
+
+class QuizAttempt(models.Model):
+    """One graded submission of a quiz (see quiz/attempts.py)"""
+    user_id = models.CharField(max_length=128)  # Firebase uid
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name="attempts")
+    topic_key = models.CharField(max_length=255)
+    correct = models.IntegerField()
+    total = models.IntegerField()
+    score = models.FloatField()  # percentage
+    time_spent = models.IntegerField(blank=True, null=True)  # seconds
+    submitted_at = models.DateTimeField(default=now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user_id", "quiz"], name="attempt_once_per_user"),
+        ]
+        indexes = [
+            models.Index(fields=["user_id", "-submitted_at"], name="attempt_user_recent"),
+            models.Index(fields=["topic_key", "-submitted_at"], name="attempt_topic_recent"),
+        ]
+
+
+class AttemptAnswer(models.Model):
+    attempt = models.ForeignKey(QuizAttempt, on_delete=models.CASCADE, related_name="answers")
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name="answers")
+    selected_option = models.CharField(max_length=1, blank=True, default="")  # 'a'..'d', '' if skipped
+    is_correct = models.BooleanField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["question", "is_correct"], name="answer_question_outcome"),
+        ]
+
+
+class AttemptTotals(models.Model):
+    """Running totals over a set of attempts, updated in place on every submission"""
+    attempts = models.IntegerField(default=0)
+    questions_answered = models.IntegerField(default=0)
+    correct_answers = models.IntegerField(default=0)
+    score_total = models.FloatField(default=0)
+    best_score = models.FloatField(default=0)
+    last_attempt_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        abstract = True
+
+    def totals(self):
+        return {
+            "attempts": self.attempts,
+            "questions_answered": self.questions_answered,
+            "correct_answers": self.correct_answers,
+            "average_score": self.score_total / self.attempts if self.attempts else 0,
+            "best_score": self.best_score,
+            "accuracy": self.correct_answers / self.questions_answered * 100 if self.questions_answered else 0,
+            "last_attempt_at": self.last_attempt_at.isoformat() if self.last_attempt_at else None,
+        }
+
+
+class UserStats(AttemptTotals):
+    user_id = models.CharField(max_length=128, unique=True)
+    current_streak = models.IntegerField(default=0)  # consecutive days with an attempt
+    max_streak = models.IntegerField(default=0)
+    last_attempt_date = models.DateField(blank=True, null=True)
+
+    def to_dict(self):
+        return {
+            **self.totals(),
+            "current_streak": self.current_streak,
+            "max_streak": self.max_streak,
+        }
+
+
+class UserTopicStats(AttemptTotals):
+    user_id = models.CharField(max_length=128)
+    topic_key = models.CharField(max_length=255)
+    topic = models.CharField(max_length=255)  # as first entered, for display
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user_id", "topic_key"], name="user_topic_stats_unique"),
+        ]
+        indexes = [
+            models.Index(fields=["user_id", "-last_attempt_at"], name="user_topic_recent"),
+        ]
+
+    def to_dict(self):
+        return {"topic": self.topic, **self.totals()}
+
+
+class TopicStats(AttemptTotals):
+    topic_key = models.CharField(max_length=255, unique=True)
+    topic = models.CharField(max_length=255)
+
+    def to_dict(self):
+        return {"topic": self.topic, **self.totals()}
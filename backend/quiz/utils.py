@@ -1,95 +1,27 @@
-import google.generativeai as genai
-import requests
 import os
 import time
-import socket
-import json
+import random
+import asyncio
+import threading
+import contextvars
+import weakref
+from contextlib import aclosing, closing
+from asgiref.sync import sync_to_async
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
 from dotenv import load_dotenv
+from backend.deadlines import DeadlineExceeded
+from backend.ratelimit import RateLimited
+from backend.llm import get_provider
+from backend.generation_cache import get_cache, normalize_text
+from backend.singleflight import get_async_flight, get_flight
+from backend.questions import from_rows, parse_questions, to_rows, validate_questions
+from backend.streaming import JSONArrayStream
+from backend.topic_index import get_topic_index
 load_dotenv()
 
-def is_proxy_needed():
-    """Check if we're likely in the hostel network that needs a proxy"""
-    # First check if the user explicitly wants to use a proxy via flag file
-    if os.path.exists("use_proxy.flag"):
-        return True
-        
-    try:
-        # Try to get hostname and IP address
-        hostname = socket.gethostname()
-        ip = socket.gethostbyname(hostname)
-        
-        # Check if we're in a specific network that requires proxy
-        return ip.startswith("172.31.")
-    except Exception as e:
-        print(f"Error detecting network: {e}")
-        # If any error occurs, default to no proxy
-        return False
-
-def configure_api(force_proxy=None):
-    """
-    Configure the Gemini API with or without proxy based on the network
-    
-    Args:
-        force_proxy: Override automatic detection. 
-                    True to force using proxy, 
-                    False to force not using proxy,
-                    None to use automatic detection
-    """
-    # Always configure with the API key
-    api_config = {
-        "api_key": os.getenv("GEMINI_API_KEY"),
-        "transport": "rest",
-    }
-    
-    # Determine if proxy is needed
-    use_proxy = force_proxy if force_proxy is not None else is_proxy_needed()
-    
-    if use_proxy:
-        print("Configuring with proxy")
-        # Set proxy for environment
-        os.environ["HTTP_PROXY"] = "http://172.31.2.4:8080"
-        os.environ["HTTPS_PROXY"] = "http://172.31.2.4:8080"
-    else:
-        print("Configuring without proxy")
-        # Clear any proxy settings that might be lingering
-        if "HTTP_PROXY" in os.environ:
-            del os.environ["HTTP_PROXY"]
-        if "HTTPS_PROXY" in os.environ:
-            del os.environ["HTTPS_PROXY"]
-    
-    # Configure the API
-    genai.configure(**api_config)
-
-def extract_json_from_response(text):
-    """Extract valid JSON from the API response, handling different formats"""
-    # Try to parse directly first
-    try:
-        return json.loads(text)
-    except json.JSONDecodeError:
-        pass
-    
-    # Try to extract JSON from markdown code blocks
-    try:
-        match = re.search(r'```(?:json)?\s*([\s\S]*?)\s*```', text)
-        if match:
-            return json.loads(match.group(1).strip())
-    except (json.JSONDecodeError, AttributeError, IndexError):
-        pass
-    
-    # Try to find JSON array in the text
-    try:
-        match = re.search(r'(\[\s*\{.*\}\s*\])', text, re.DOTALL)
-        if match:
-            return json.loads(match.group(1))
-    except (json.JSONDecodeError, AttributeError, IndexError):
-        pass
-    
-    # If all else fails, return empty list
-    print("Could not extract valid JSON from response")
-    return []
-
-def generate_questions(topic, numQuestions, difficulty):
-    prompt = f"""
+def build_prompt(topic, numQuestions, difficulty):
+    return f"""
     Generate {numQuestions} multiple-choice quiz questions on {topic} with 2-3 tags each and difficulty {difficulty} (where Beginner is the easiest, Intermediate being medium-level and Advanced being hard questions) and the options should be like "a" : "x", "b" : "y", "c" : "z", "d" : "s".
     If the given topic '{topic}' is NSFW, or is some sensitive topic that kids shouldnt learn about or its something you dont understand, , just dont give anything - give an empty json list.
     But if '{topic}' is a normal topic then generate questions.
@@ -108,62 +40,212 @@ def generate_questions(topic, numQuestions, difficulty):
         "solution" : "Paris is the capital of France and famous for Eiffel Tower and croissants."
     }}
     """
-    
-    # Strategy:
-    # 1. Try with automatic proxy detection
-    # 2. If that fails, try with forced proxy
-    # 3. If that fails, try without proxy
-    
-    strategies = [
-        {"name": "Auto detection", "force_proxy": None},
-        {"name": "With proxy", "force_proxy": True},
-        {"name": "Without proxy", "force_proxy": False}
-    ]
-    
-    for strategy in strategies:        
-        try:
-            # Configure API with the current strategy
-            configure_api(force_proxy=strategy["force_proxy"])
-            
-            # Create model and generate content
-            model = genai.GenerativeModel("gemini-2.0-flash")
-            response = model.generate_content(prompt, stream=True)
-            
-            # Combine streamed response chunks
-            text = ""
-            for chunk in response:
-                text += chunk.text
-                        
-            # Process and return the response
-            if text:
-                # Try to parse it as JSON and make sure we have an array
-                try:
-                    # For backward compatibility, try the markdown extraction first
-                    import re
-                    match = re.search(r'```json([\s\S]*?)```', text)
-                    if match:
-                        json_data = json.loads(match.group(1).strip())
-                        if isinstance(json_data, list):
-                            return text
-                    
-                    # If not markdown, try direct JSON parsing
-                    json_data = json.loads(text)
-                    if isinstance(json_data, list):
-                        return json.dumps(json_data)
-                    
-                    # If we got here but it's not a list, return the raw text
-                    # so the view function can handle extraction
-                    return text
-                except:
-                    # Just return the raw text if parsing fails
-                    return text
-            
-        except Exception as e:
-            print(f"Error with {strategy['name']} strategy: {e}")
-    
-    # If all strategies failed
-    print("All connection strategies failed")
-    return ""
 
-# Import re here to ensure it's available
-import re
\ No newline at end of file
+def _generate_questions_text(topic, numQuestions, difficulty, deadline=None):
+    prompt = build_prompt(topic, numQuestions, difficulty)
+    try:
+        return get_provider().generate_text(prompt, kind="quiz", deadline=deadline)
+    except (DeadlineExceeded, RateLimited):
+        raise
+    except Exception as e:
+        print(f"Error generating quiz questions: {e}")
+        return ""
+
+def _index_scope(numQuestions, difficulty):
+    return f"{normalize_text(numQuestions)}:{normalize_text(difficulty)}"
+
+def _cached_pool(cache, key, topic, numQuestions, difficulty):
+    """
+    Return the cached pool for `key`, or else the pool of an already generated topic
+    that means the same thing ("What is photosynthesis?" for "Photosynthesis"), or None.
+    """
+    index = get_topic_index("quiz")
+    scope = _index_scope(numQuestions, difficulty)
+    # One request is one cache lookup in the hit/miss counters, however many keys it tries
+    pool = cache.get(key, count=False)
+    if pool is not None:
+        if index is not None:
+            index.add(topic, scope)
+    else:
+        match = index.nearest(topic, scope) if index is not None else None
+        if match is not None:
+            pool = cache.get(cache.make_key(match[0], numQuestions, difficulty), count=False)
+    cache.record(pool is not None)
+    return pool
+
+def _store_pool(cache, key, topic, numQuestions, difficulty, pool):
+    cache.set(key, pool)
+    index = get_topic_index("quiz")
+    if index is not None:
+        index.add(topic, _index_scope(numQuestions, difficulty))
+
+def _fill_pool(cache, key, topic, count, difficulty, deadline=None):
+    """Generate a question pool for `key` as compact rows, caching it unless it came back empty"""
+    pool = to_rows(parse_questions(_generate_questions_text(topic, count * cache.pool_factor, difficulty, deadline)))
+    if pool:
+        _store_pool(cache, key, topic, count, difficulty, pool)
+    return pool
+
+def _question_count(numQuestions):
+    try:
+        return int(numQuestions)
+    except (TypeError, ValueError):
+        return 10
+
+def generate_questions(topic, numQuestions, difficulty, deadline=None):
+    """
+    Return a list of Question objects, served from the generation cache when possible.
+
+    On a miss, POOL_FACTOR * numQuestions questions are generated and cached, and each
+    request receives a random sample of numQuestions from that pool so repeated
+    quizzes on the same topic are not identical. A topic phrased differently from one
+    already generated (see backend.topic_index) reuses that pool. An empty list means generation
+    failed or the topic was refused. Raises DeadlineExceeded if `deadline` runs out.
+    """
+    cache = get_cache("quiz")
+    key = cache.make_key(topic, numQuestions, difficulty)
+    count = _question_count(numQuestions)
+
+    pool = _cached_pool(cache, key, topic, numQuestions, difficulty)
+    if pool is None:
+        # Concurrent requests for the same key share a single Gemini call
+        pool = get_flight("quiz").do(key, _fill_pool, cache, key, topic, count, difficulty, deadline=deadline)
+
+    return _sample(pool, count)
+
+def _sample(pool, count):
+    return from_rows(random.sample(pool, min(count, len(pool))))
+
+async def _fill_pool_async(cache, key, topic, count, difficulty, deadline=None):
+    prompt = build_prompt(topic, count * cache.pool_factor, difficulty)
+    text = await get_provider().generate_text_async(prompt, kind="quiz", deadline=deadline)
+    pool = to_rows(parse_questions(text))
+    if pool:
+        await sync_to_async(_store_pool, thread_sensitive=False)(cache, key, topic, count, difficulty, pool)
+    return pool
+
+async def generate_questions_async(topic, numQuestions, difficulty, deadline=None):
+    """
+    Async counterpart of generate_questions for the ASGI views.
+
+    Cache reads and writes run in a worker thread: with the SQLite backend they can
+    wait on another worker's write lock, which would stall the event loop.
+    """
+    cache = get_cache("quiz")
+    key = cache.make_key(topic, numQuestions, difficulty)
+    count = _question_count(numQuestions)
+
+    pool = await sync_to_async(_cached_pool, thread_sensitive=False)(cache, key, topic, numQuestions, difficulty)
+    if pool is None:
+        pool = await get_async_flight("quiz").do(key, _fill_pool_async, cache, key, topic, count, difficulty, deadline=deadline)
+
+    return _sample(pool, count)
+
+def stream_questions(topic, numQuestions, difficulty, deadline=None):
+    """
+    Yield quiz questions one by one as soon as Gemini finishes each of them.
+
+    Cache hits are served immediately; on a miss the complete pool is cached once
+    the stream ends, so later requests (streaming or not) reuse it.
+    """
+    cache = get_cache("quiz")
+    key = cache.make_key(topic, numQuestions, difficulty)
+    count = _question_count(numQuestions)
+
+    pool = _cached_pool(cache, key, topic, numQuestions, difficulty)
+    if pool is not None:
+        yield from _sample(pool, count)
+        return
+
+    parser = JSONArrayStream()
+    pool = []
+    prompt = build_prompt(topic, count * cache.pool_factor, difficulty)
+    with closing(get_provider().stream_text(prompt, kind="quiz", deadline=deadline)) as chunks:
+        for text in chunks:
+            for question in validate_questions(parser.feed(text)):
+                pool.append(question)
+                if len(pool) <= count:
+                    yield question
+    if pool:
+        _store_pool(cache, key, topic, numQuestions, difficulty, to_rows(pool))
+
+async def stream_questions_async(topic, numQuestions, difficulty, deadline=None):
+    """Async counterpart of stream_questions; a client disconnect arrives as cancellation and closes the upstream stream"""
+    cache = get_cache("quiz")
+    key = cache.make_key(topic, numQuestions, difficulty)
+    count = _question_count(numQuestions)
+
+    pool = await sync_to_async(_cached_pool, thread_sensitive=False)(cache, key, topic, numQuestions, difficulty)
+    if pool is not None:
+        for question in _sample(pool, count):
+            yield question
+        return
+
+    parser = JSONArrayStream()
+    pool = []
+    prompt = build_prompt(topic, count * cache.pool_factor, difficulty)
+    async with aclosing(get_provider().stream_text_async(prompt, kind="quiz", deadline=deadline)) as chunks:
+        async for text in chunks:
+            for question in validate_questions(parser.feed(text)):
+                pool.append(question)
+                if len(pool) <= count:
+                    yield question
+    if pool:
+        await sync_to_async(_store_pool, thread_sensitive=False)(cache, key, topic, numQuestions, difficulty, to_rows(pool))
+
+_batch_pool = None
+_batch_pool_lock = threading.Lock()
+
+def _get_batch_pool():
+    """Process-wide pool shared by all batch requests, so concurrent batches can't pile up Gemini calls"""
+    global _batch_pool
+    if _batch_pool is None:
+        with _batch_pool_lock:
+            if _batch_pool is None:
+                _batch_pool = ThreadPoolExecutor(
+                    max_workers=settings.QUIZ_BATCH["MAX_WORKERS"],
+                    thread_name_prefix="quiz-batch",
+                )
+    return _batch_pool
+
+def _generate_one(spec, deadline=None):
+    try:
+        return generate_questions(*spec, deadline=deadline), None
+    except Exception as e:
+        return [], e
+
+def generate_questions_batch(specs, deadline=None):
+    """
+    Generate questions for several (topic, numQuestions, difficulty) specs concurrently.
+
+    Returns one (questions, error) pair per spec, in order. A failing spec doesn't affect
+    the others. Identical specs share one Gemini call through the cache and single-flight.
+    All specs share the request's `deadline`.
+    """
+    pool = _get_batch_pool()
+    # Each spec runs in a copy of the request's context, so the scheduler knows whose call it is
+    futures = [pool.submit(contextvars.copy_context().run, _generate_one, spec, deadline) for spec in specs]
+    return [future.result() for future in futures]
+
+_batch_semaphores = weakref.WeakKeyDictionary()
+
+def _get_batch_semaphore():
+    """The event loop's semaphore, shared by all batch requests on it like the thread pool above"""
+    loop = asyncio.get_running_loop()
+    semaphore = _batch_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _batch_semaphores[loop] = asyncio.Semaphore(settings.QUIZ_BATCH["MAX_WORKERS"])
+    return semaphore
+
+async def generate_questions_batch_async(specs, deadline=None):
+    """Async counterpart of generate_questions_batch; at most MAX_WORKERS specs run at once across requests"""
+    semaphore = _get_batch_semaphore()
+
+    async def run(spec):
+        async with semaphore:
+            try:
+                return await generate_questions_async(*spec, deadline=deadline), None
+            except Exception as e:
+                return [], e
+
+    return await asyncio.gather(*(run(spec) for spec in specs))
@@ -1,30 +1,102 @@
 import json
-from .utils import generate_questions
-import re
+from asgiref.sync import sync_to_async
+from .attempts import AttemptExists, recent_attempts, store_quiz, submit_attempt, topic_summary, user_summary
+from .models import Quiz
+from .utils import (
+    generate_questions, generate_questions_async, generate_questions_batch,
+    generate_questions_batch_async, stream_questions, stream_questions_async,
+)
 from django.contrib.auth.decorators import login_required
 from django.utils.timezone import now
 from django.contrib.auth.models import User
 import traceback
 from django.views.decorators.csrf import csrf_exempt
-from backend.settings import db
+from django.conf import settings
 from django.http import JsonResponse
-from google.cloud import firestore
- 
-def extract_json_from_markdown(markdown_text):
-    # Extract JSON block inside triple backticks
-    match = re.search(r'```json([\s\S]*?)```', markdown_text)
+from django.views.decorators.http import require_GET
+from backend.deadlines import Deadline, DeadlineExceeded
+from backend.ratelimit import RateLimited, rate_limited
+from backend.questions import to_dicts
+from backend.responses import error_event, error_response
+from backend.streaming import ndjson_response
 
-    if not match:
-        raise ValueError("No JSON block found in Markdown.")
 
+def valid_topic(topic):
+    return isinstance(topic, str) and bool(topic.strip())
+
+
+def parse_quiz_request(request):
+    """
+    Parse and validate a quiz creation request body.
+
+    Returns (quiz_data, None) on success or (None, JsonResponse) describing the error.
+    """
+    request_body = request.body.decode('utf-8')
+    print(f"Raw request body: {request_body[:200]}")  # Debug first 200 chars
+
+    if not request_body.strip():
+        return None, JsonResponse({"error": "Empty request body"}, status=400)
+
+    # Parse JSON data
     try:
-        json_data = json.loads(match.group(1).strip())  # Convert JSON string to Python dict
-        return json_data
-    except json.JSONDecodeError:
-        raise ValueError("Invalid JSON format.")
+        data = json.loads(request_body)
+    except json.JSONDecodeError as e:
+        print(f"JSON parsing error: {e}")
+        return None, JsonResponse({"error": f"Invalid JSON in request: {str(e)}"}, status=400)
+    if not isinstance(data, dict):
+        return None, JsonResponse({"error": "Request body must be a JSON object"}, status=400)
+
+    print(f"Parsed request data: {data}")
+
+    quiz_data = {
+        "userId": data.get("userId"),
+        "topic": data.get("topic"),
+        "numQuestions": data.get("numQuestions"),
+        "difficulty": data.get("difficulty"),
+        "timeLimit": data.get("timeLimit"),
+    }
+
+    # Validate required fields
+    if not all(quiz_data.values()):
+        return None, JsonResponse({"error": "All fields (topic, numQuestions, difficulty, timeLimit, userId) are required"}, status=400)
+    if not valid_topic(quiz_data["topic"]):
+        return None, JsonResponse({"error": "topic must be a non-empty string"}, status=400)
+
+    return quiz_data, None
+
+
+def quiz_response(quiz_data, questions, user_id):
+    """
+    Store the generated quiz for `user_id` and build the response. It queries the
+    database, so async views call it through sync_to_async.
+    """
+    if not questions:
+        return JsonResponse({"error": "Failed to generate quiz questions"}, status=500)
+
+    # Return the generated questions to the frontend, with the id to submit attempts against
+    quiz_data["quiz_id"] = store_quiz(quiz_data["topic"], quiz_data["difficulty"], questions, user_id)
+    quiz_data["questions"] = to_dicts(questions)
+    return JsonResponse({
+        "data": quiz_data,
+        "message": "Quiz questions generated successfully"
+    }, status=200)
+
+
+def question_event(index, question):
+    return {"type": "question", "index": index, "question": question.to_dict()}
+
+
+def done_event(quiz_data, questions, user_id):
+    """The final event of a quiz stream; stores the quiz, so async views call it through sync_to_async"""
+    if not questions:
+        return {"type": "error", "error": "Failed to generate quiz questions"}
+    return {"type": "done", "count": len(questions),
+            "quiz_id": store_quiz(quiz_data["topic"], quiz_data["difficulty"], questions, user_id),
+            "message": "Quiz questions generated successfully"}
 
 
 @csrf_exempt
+@rate_limited
 def create_quiz(request):
     """Create a new quiz with questions generated by AI"""
     print("Quiz creation endpoint called")
@@ -33,57 +105,292 @@ def create_quiz(request):
         return JsonResponse({"error": "Only POST method is supported"}, status=405)
     
     try:
-        request_body = request.body.decode('utf-8')
-        print(f"Raw request body: {request_body[:200]}")  # Debug first 200 chars
-        
-        if not request_body.strip():
-            return JsonResponse({"error": "Empty request body"}, status=400)
-        
-        # Parse JSON data
+        quiz_data, error = parse_quiz_request(request)
+        if error is not None:
+            return error
+
+        questions = generate_questions(
+            quiz_data["topic"], quiz_data["numQuestions"], quiz_data["difficulty"], Deadline.from_request(request)
+        )
+        return quiz_response(quiz_data, questions, request.firebaseUser["uid"])
+
+    except Exception as e:
+        return error_response(e)
+
+
+@csrf_exempt
+@rate_limited
+async def create_quiz_async(request):
+    """Async (ASGI) variant of create_quiz; waiting on Gemini doesn't hold a worker thread"""
+    if request.method != "POST":
+        return JsonResponse({"error": "Only POST method is supported"}, status=405)
+
+    try:
+        quiz_data, error = parse_quiz_request(request)
+        if error is not None:
+            return error
+
+        questions = await generate_questions_async(
+            quiz_data["topic"], quiz_data["numQuestions"], quiz_data["difficulty"], Deadline.from_request(request)
+        )
+        return await sync_to_async(quiz_response)(quiz_data, questions, request.firebaseUser["uid"])
+
+    except Exception as e:
+        return error_response(e)
+
+
+@csrf_exempt
+@rate_limited
+def create_quiz_stream(request):
+    """
+    Streaming variant of create_quiz.
+
+    Responds with newline-delimited JSON events: one "meta" event with the quiz
+    fields, one "question" event per question as soon as it is generated, and a
+    final "done" (or "error") event. The "done" event carries the stored quiz_id.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "Only POST method is supported"}, status=405)
+
+    try:
+        quiz_data, error = parse_quiz_request(request)
+        if error is not None:
+            return error
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+    deadline = Deadline.from_request(request, stream=True)
+    user_id = request.firebaseUser["uid"]
+
+    def events():
+        yield {"type": "meta", "data": quiz_data}
+        questions = []
+        try:
+            for question in stream_questions(quiz_data["topic"], quiz_data["numQuestions"], quiz_data["difficulty"], deadline):
+                yield question_event(len(questions), question)
+                questions.append(question)
+        except Exception as e:
+            yield error_event(e)
+            return
+        yield done_event(quiz_data, questions, user_id)
+
+    return ndjson_response(events())
+
+
+@csrf_exempt
+@rate_limited
+async def create_quiz_stream_async(request):
+    """Async (ASGI) variant of create_quiz_stream, with the same events"""
+    if request.method != "POST":
+        return JsonResponse({"error": "Only POST method is supported"}, status=405)
+
+    try:
+        quiz_data, error = parse_quiz_request(request)
+        if error is not None:
+            return error
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+    deadline = Deadline.from_request(request, stream=True)
+    user_id = request.firebaseUser["uid"]
+
+    async def events():
+        yield {"type": "meta", "data": quiz_data}
+        questions = []
         try:
-            data = json.loads(request_body)
-        except json.JSONDecodeError as e:
-            print(f"JSON parsing error: {e}")
-            return JsonResponse({"error": f"Invalid JSON in request: {str(e)}"}, status=400)
-        
-        print(f"Parsed request data: {data}")
-        
-        # Extract required fields
-        topic = data.get("topic")
-        numQuestions = data.get("numQuestions")
-        difficulty = data.get("difficulty")
-        timeLimit = data.get("timeLimit")
-        userId = data.get("userId")
-        
-        # Validate required fields
-        if not all([topic, numQuestions, difficulty, timeLimit, userId]):
-            return JsonResponse({"error": "All fields (topic, numQuestions, difficulty, timeLimit, userId) are required"}, status=400)
-        
-        # Generate questions
-        questions = generate_questions(topic, numQuestions, difficulty)
-        
-        # Validate questions
-        if not questions:
-            return JsonResponse({"error": "Failed to generate quiz questions"}, status=500)
-        if len(questions) == 0:
-            return JsonResponse({"error": "Cannot create practice questions!"}, status=500)
-
-        questions = extract_json_from_markdown(questions) 
-
-        # Return the generated questions to the frontend
+            async for question in stream_questions_async(quiz_data["topic"], quiz_data["numQuestions"], quiz_data["difficulty"], deadline):
+                yield question_event(len(questions), question)
+                questions.append(question)
+        except Exception as e:
+            yield error_event(e)
+            return
+        yield await sync_to_async(done_event)(quiz_data, questions, user_id)
+
+    return ndjson_response(events())
+
+
+def parse_batch_request(request):
+    """
+    Parse a batch quiz request: {"userId", "timeLimit", "quizzes": [{"topic", "numQuestions", "difficulty"}, ...]}.
+
+    Each spec may override timeLimit. Returns (specs, results, None) or (None, None, JsonResponse).
+    `specs` holds the quiz_data of the valid specs keyed by their index, and `results`
+    is pre-filled with an error entry for each invalid one.
+    """
+    try:
+        data = json.loads(request.body.decode('utf-8') or "{}")
+    except json.JSONDecodeError as e:
+        return None, None, JsonResponse({"error": f"Invalid JSON in request: {str(e)}"}, status=400)
+    if not isinstance(data, dict):
+        return None, None, JsonResponse({"error": "Request body must be a JSON object"}, status=400)
+
+    quizzes = data.get("quizzes")
+    if not isinstance(quizzes, list) or not quizzes:
+        return None, None, JsonResponse({"error": "quizzes must be a non-empty list"}, status=400)
+    max_specs = settings.QUIZ_BATCH["MAX_SPECS"]
+    if len(quizzes) > max_specs:
+        return None, None, JsonResponse({"error": f"At most {max_specs} quizzes per batch"}, status=400)
+
+    specs = {}
+    results = [None] * len(quizzes)
+    for index, spec in enumerate(quizzes):
+        spec = spec if isinstance(spec, dict) else {}
         quiz_data = {
-            "userId": userId,
-            "topic": topic,
-            "numQuestions": numQuestions,
-            "difficulty": difficulty,
-            "timeLimit": timeLimit,
-            "questions": questions
+            "userId": data.get("userId"),
+            "topic": spec.get("topic"),
+            "numQuestions": spec.get("numQuestions"),
+            "difficulty": spec.get("difficulty"),
+            "timeLimit": spec.get("timeLimit", data.get("timeLimit")),
         }
-        
-        return JsonResponse({
-            "data": quiz_data,
-            "message": "Quiz questions generated successfully"
-        }, status=200)
-            
+        if not all(quiz_data.values()):
+            results[index] = {"index": index, "status": "error",
+                              "error": "All fields (topic, numQuestions, difficulty, timeLimit, userId) are required"}
+        elif not valid_topic(quiz_data["topic"]):
+            results[index] = {"index": index, "status": "error", "error": "topic must be a non-empty string"}
+        else:
+            specs[index] = quiz_data
+    return specs, results, None
+
+
+def batch_response(specs, results, generated, user_id):
+    """
+    Fill `results` from the generated (text, error) pairs, store each generated quiz for `user_id`,
+    and build the batch JsonResponse. It queries the database, so async views call it
+    through sync_to_async.
+    """
+    for (index, quiz_data), (questions, error) in zip(specs.items(), generated):
+        if error is None and not questions:
+            error = "Failed to generate quiz questions"
+        if error is not None:
+            results[index] = {"index": index, "status": "error", "error": str(error)}
+        else:
+            quiz_data["quiz_id"] = store_quiz(quiz_data["topic"], quiz_data["difficulty"], questions, user_id)
+            quiz_data["questions"] = to_dicts(questions)
+            results[index] = {"index": index, "status": "ok", "data": quiz_data}
+
+    succeeded = sum(1 for result in results if result["status"] == "ok")
+    errors = [error for _, error in generated]
+    timed_out = bool(errors) and all(isinstance(error, DeadlineExceeded) for error in errors)
+    limited = bool(errors) and all(isinstance(error, RateLimited) for error in errors)
+    response = JsonResponse({
+        "data": results,
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "message": "Quiz questions generated successfully" if succeeded == len(results)
+                   else f"{len(results) - succeeded} of {len(results)} quizzes failed",
+    }, status=200 if succeeded else 504 if timed_out else 429 if limited else 500)
+    if limited and not succeeded:
+        response["Retry-After"] = max(errors, key=lambda error: error.retry_after).retry_after_header
+    return response
+
+
+@csrf_exempt
+@rate_limited
+def create_quiz_batch(request):
+    """
+    Create several quizzes in one request.
+
+    Specs are generated concurrently on a bounded worker pool, so the wall time is
+    close to the slowest spec rather than the sum. Results come back in request
+    order with a per-spec status; the request only fails if every spec failed.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "Only POST method is supported"}, status=405)
+
+    try:
+        specs, results, error = parse_batch_request(request)
+        if error is not None:
+            return error
+
+        generated = generate_questions_batch(
+            [(q["topic"], q["numQuestions"], q["difficulty"]) for q in specs.values()],
+            Deadline.from_request(request),
+        )
+        return batch_response(specs, results, generated, request.firebaseUser["uid"])
+
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
+
+
+@csrf_exempt
+@rate_limited
+async def create_quiz_batch_async(request):
+    """Async (ASGI) variant of create_quiz_batch"""
+    if request.method != "POST":
+        return JsonResponse({"error": "Only POST method is supported"}, status=405)
+
+    try:
+        specs, results, error = parse_batch_request(request)
+        if error is not None:
+            return error
+
+        generated = await generate_questions_batch_async(
+            [(q["topic"], q["numQuestions"], q["difficulty"]) for q in specs.values()],
+            Deadline.from_request(request),
+        )
+        return await sync_to_async(batch_response)(specs, results, generated, request.firebaseUser["uid"])
+
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+@csrf_exempt
+def submit_quiz_attempt(request):
+    """
+    Grade an attempt at a stored quiz and record it (see quiz/attempts.py).
+
+    Body: {"quiz_id", "answers": ["a", "", "c", ...] or {"0": "a", ...}, "time_spent"?: seconds}.
+    Returns the score, a per-question analysis and the user's updated totals.
+    Only the user the quiz was generated for can submit it, and only once (409 after that).
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "Only POST method is supported"}, status=405)
+
+    try:
+        data = json.loads(request.body.decode('utf-8') or "{}")
+    except json.JSONDecodeError as e:
+        return JsonResponse({"error": f"Invalid JSON in request: {str(e)}"}, status=400)
+    if not isinstance(data, dict) or not data.get("quiz_id") or "answers" not in data:
+        return JsonResponse({"error": "quiz_id and answers are required"}, status=400)
+
+    try:
+        result = submit_attempt(request.firebaseUser["uid"], data["quiz_id"], data["answers"], data.get("time_spent"))
+    except Quiz.DoesNotExist:
+        return JsonResponse({"error": "Quiz not found"}, status=404)
+    except AttemptExists as e:
+        return JsonResponse({"error": str(e)}, status=409)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+    return JsonResponse(result, status=200)
+
+
+@require_GET
+def quiz_stats(request):
+    """The current user's quiz totals, streak and per-topic scores; ?topics= limits the topics (default 20)"""
+    try:
+        topics = int(request.GET.get("topics", 20))
+    except ValueError:
+        return JsonResponse({"error": "topics must be a number"}, status=400)
+    return JsonResponse(user_summary(request.firebaseUser["uid"], max(0, min(topics, 100))), status=200)
+
+
+@require_GET
+def quiz_attempts(request):
+    """The current user's most recent attempts; ?limit= (default 10, at most 100)"""
+    try:
+        limit = int(request.GET.get("limit", 10))
+    except ValueError:
+        return JsonResponse({"error": "limit must be a number"}, status=400)
+    return JsonResponse({"attempts": recent_attempts(request.firebaseUser["uid"], max(0, limit))}, status=200)
+
+
+@require_GET
+def quiz_topic_stats(request):
+    """Totals over all users' attempts at ?topic="""
+    topic = request.GET.get("topic")
+    if not topic:
+        return JsonResponse({"error": "topic is required"}, status=400)
+    stats = topic_summary(topic)
+    if stats is None:
+        return JsonResponse({"error": "No attempts for this topic"}, status=404)
+    return JsonResponse(stats, status=200)
@@ -0,0 +1,228 @@
+"""
+Store of generated notes, keyed by topic and prompt version.
+
+Students ask for the same curriculum topics again and again, so notes are
+generated once per topic and then served from here. Topics are normalized
+("Newton's laws" and " newton's LAWS " share an entry). Each key also carries
+the prompt version, a hash of the notes prompt template. Editing the prompt
+therefore makes every older entry miss, and entries from other versions are
+purged when the store opens.
+
+Markdown is stored zlib-compressed. The store keeps at most MAX_BYTES of
+compressed notes and evicts the least recently used entries beyond that.
+Two backends are available:
+
+- "memory": in-process, private to each worker (default)
+- "sqlite": a SQLite file shared by every worker on the host
+
+Configure through settings.NOTES_STORE.
+"""
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from django.conf import settings
+
+from backend.generation_cache import normalize_text
+
+DEFAULT_CONFIG = {
+    "BACKEND": "memory",
+    "PATH": "notes_store.sqlite3",
+    "MAX_BYTES": 32 * 1024 * 1024,
+    "TTL": 30 * 24 * 3600,
+    "COMPRESSION_LEVEL": 6,
+}
+
+
+class MemoryNotesBackend:
+    """LRU of compressed notes bounded by their total size"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._data = OrderedDict()  # (topic, version) -> (expires_at, blob)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, blob = entry
+            if expires_at < time.time():
+                self._remove(key)
+                return None
+            self._data.move_to_end(key)
+            return blob
+
+    def set(self, key, blob, ttl):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (time.time() + ttl, blob)
+            self.bytes += len(blob)
+            while self.bytes > self.max_bytes and len(self._data) > 1:
+                self._remove(next(iter(self._data)))
+
+    def _remove(self, key):
+        _, blob = self._data.pop(key)
+        self.bytes -= len(blob)
+
+    def purge_versions(self, version):
+        with self._lock:
+            for key in [key for key in self._data if key[1] != version]:
+                self._remove(key)
+
+    def usage(self):
+        with self._lock:
+            return len(self._data), self.bytes
+
+
+class SQLiteNotesBackend:
+    """Compressed notes in a SQLite file shared across worker processes"""
+
+    def __init__(self, path, max_bytes):
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS notes_store (
+                topic TEXT NOT NULL,
+                version TEXT NOT NULL,
+                notes BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (topic, version)
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS notes_store_accessed ON notes_store (accessed_at)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT notes, expires_at FROM notes_store WHERE topic = ? AND version = ?", key
+        ).fetchone()
+        if row is None:
+            return None
+        blob, expires_at = row
+        now = time.time()
+        if expires_at < now:
+            conn.execute("DELETE FROM notes_store WHERE topic = ? AND version = ?", key)
+            return None
+        conn.execute("UPDATE notes_store SET accessed_at = ? WHERE topic = ? AND version = ?", (now, *key))
+        return blob
+
+    def set(self, key, blob, ttl):
+        conn = self._connect()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO notes_store (topic, version, notes, size, expires_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (*key, blob, len(blob), now + ttl, now),
+        )
+        self._evict(conn)
+
+    def _evict(self, conn):
+        """Drop the least recently used entries until the total size fits MAX_BYTES"""
+        conn.execute(
+            "DELETE FROM notes_store WHERE rowid IN ("
+            " SELECT rowid FROM ("
+            "  SELECT rowid, SUM(size) OVER (ORDER BY accessed_at DESC, rowid DESC) AS running"
+            "  FROM notes_store)"
+            " WHERE running > ?)",
+            (self.max_bytes,),
+        )
+
+    def purge_versions(self, version):
+        self._connect().execute("DELETE FROM notes_store WHERE version != ?", (version,))
+
+    def usage(self):
+        count, size = self._connect().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM notes_store").fetchone()
+        return count, size
+
+
+class NotesStore:
+    def __init__(self, backend, version, ttl=30 * 24 * 3600, compression_level=6):
+        self.backend = backend
+        self.version = version
+        self.ttl = ttl
+        self.compression_level = compression_level
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "raw_bytes_stored": 0, "compressed_bytes_stored": 0}
+        backend.purge_versions(version)
+
+    def _key(self, topic):
+        return normalize_text(topic), self.version
+
+    def get(self, topic):
+        """Return the stored markdown for `topic`, or None"""
+        blob = self.backend.get(self._key(topic))
+        with self._lock:
+            self.stats["hits" if blob is not None else "misses"] += 1
+        return None if blob is None else zlib.decompress(blob).decode("utf-8")
+
+    def set(self, topic, notes):
+        raw = notes.encode("utf-8")
+        blob = zlib.compress(raw, self.compression_level)
+        self.backend.set(self._key(topic), blob, self.ttl)
+        with self._lock:
+            self.stats["stored"] += 1
+            self.stats["raw_bytes_stored"] += len(raw)
+            self.stats["compressed_bytes_stored"] += len(blob)
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats["hits"] + stats["misses"]
+        entries, size = self.backend.usage()
+        return {
+            **stats,
+            "hit_rate": stats["hits"] / lookups if lookups else 0.0,
+            "compression_ratio": round(stats["raw_bytes_stored"] / stats["compressed_bytes_stored"], 2)
+            if stats["compressed_bytes_stored"] else None,
+            "entries": entries,
+            "bytes": size,
+            "prompt_version": self.version,
+        }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_notes_store():
+    """Process-wide notes store for the current notes prompt (see tutorials.utils)"""
+    global _store
+    if _store is None:
+        # Imported here because tutorials.utils imports this module
+        from .utils import PROMPT_VERSION
+
+        with _store_lock:
+            if _store is None:
+                config = {**DEFAULT_CONFIG, **getattr(settings, "NOTES_STORE", {})}
+                if config["BACKEND"] == "sqlite":
+                    backend = SQLiteNotesBackend(config["PATH"], config["MAX_BYTES"])
+                else:
+                    backend = MemoryNotesBackend(config["MAX_BYTES"])
+                _store = NotesStore(backend, PROMPT_VERSION, config["TTL"], config["COMPRESSION_LEVEL"])
+    return _store
+
+
+def notes_store_stats():
+    return _store.snapshot() if _store is not None else {}
@@ -1,156 +1,120 @@
-import google.generativeai as genai
-import requests
 import os
 import time
-import socket
-import json
+import hashlib
+from contextlib import aclosing, closing
+from asgiref.sync import sync_to_async
 from dotenv import load_dotenv
+from backend.llm import get_provider
+from backend.generation_cache import make_key
+from backend.singleflight import get_async_flight, get_flight
+from backend.topic_index import get_topic_index
+from .notes_store import get_notes_store
 load_dotenv()
 
-def is_proxy_needed():
-    """Check if we're likely in the hostel network that needs a proxy"""
-    # First check if the user explicitly wants to use a proxy via flag file
-    if os.path.exists("use_proxy.flag"):
-        return True
-        
-    try:
-        # Try to get hostname and IP address
-        hostname = socket.gethostname()
-        ip = socket.gethostbyname(hostname)
-        
-        # Check if we're in a specific network that requires proxy
-        return ip.startswith("172.31.")
-    except Exception as e:
-        print(f"Error detecting network: {e}")
-        # If any error occurs, default to no proxy
-        return False
-
-def configure_api(force_proxy=None):
-    """
-    Configure the Gemini API with or without proxy based on the network
-    
-    Args:
-        force_proxy: Override automatic detection. 
-                    True to force using proxy, 
-                    False to force not using proxy,
-                    None to use automatic detection
-    """
-    # Always configure with the API key
-    api_config = {
-        "api_key": os.getenv("GEMINI_API_KEY"),
-        "transport": "rest",
-    }
-    
-    # Determine if proxy is needed
-    use_proxy = force_proxy if force_proxy is not None else is_proxy_needed()
-    
-    if use_proxy:
-        print("Configuring with proxy")
-        # Set proxy for environment
-        os.environ["HTTP_PROXY"] = "http://172.31.2.4:8080"
-        os.environ["HTTPS_PROXY"] = "http://172.31.2.4:8080"
-    else:
-        print("Configuring without proxy")
-        # Clear any proxy settings that might be lingering
-        if "HTTP_PROXY" in os.environ:
-            del os.environ["HTTP_PROXY"]
-        if "HTTPS_PROXY" in os.environ:
-            del os.environ["HTTPS_PROXY"]
-    
-    # Configure the API
-    genai.configure(**api_config)
-
-def extract_json_from_response(text):
-    """Extract valid JSON from the API response, handling different formats"""
-    # Try to parse directly first
-    try:
-        return json.loads(text)
-    except json.JSONDecodeError:
-        pass
-    
-    # Try to extract JSON from markdown code blocks
-    try:
-        match = re.search(r'```(?:json)?\s*([\s\S]*?)\s*```', text)
-        if match:
-            return json.loads(match.group(1).strip())
-    except (json.JSONDecodeError, AttributeError, IndexError):
-        pass
-    
-    # Try to find JSON array in the text
-    try:
-        match = re.search(r'(\[\s*\{.*\}\s*\])', text, re.DOTALL)
-        if match:
-            return json.loads(match.group(1))
-    except (json.JSONDecodeError, AttributeError, IndexError):
-        pass
-    
-    # If all else fails, return empty list
-    print("Could not extract valid JSON from response")
-    return []
-
-def generate_notes(topic):
-    prompt = f"""
+def build_prompt(topic):
+    return f"""
         You're an expert teacher. Explain the topic {topic} in simple, concise, and well-structured notes.\n
         Use headings, bullet points, and examples wherever necessary.\n
         Also be formal. Start with the notes right away!
         The goal is to help a student understand this topic quickly and clearly.
     """
-    
-    # Strategy:
-    # 1. Try with automatic proxy detection
-    # 2. If that fails, try with forced proxy
-    # 3. If that fails, try without proxy
-    
-    strategies = [
-        {"name": "Auto detection", "force_proxy": None},
-        {"name": "With proxy", "force_proxy": True},
-        {"name": "Without proxy", "force_proxy": False}
-    ]
-    
-    for strategy in strategies:        
-        try:
-            # Configure API with the current strategy
-            configure_api(force_proxy=strategy["force_proxy"])
-            
-            # Create model and generate content
-            model = genai.GenerativeModel("gemini-2.0-flash")
-            response = model.generate_content(prompt, stream=True)
-            
-            # Combine streamed response chunks
-            text = ""
-            for chunk in response:
-                text += chunk.text
-                        
-            # Process and return the response
-            if text:
-                # Try to parse it as JSON and make sure we have an array
-                try:
-                    # For backward compatibility, try the markdown extraction first
-                    import re
-                    match = re.search(r'```json([\s\S]*?)```', text)
-                    if match:
-                        json_data = json.loads(match.group(1).strip())
-                        if isinstance(json_data, list):
-                            return text
-                    
-                    # If not markdown, try direct JSON parsing
-                    json_data = json.loads(text)
-                    if isinstance(json_data, list):
-                        return json.dumps(json_data)
-                    
-                    # If we got here but it's not a list, return the raw text
-                    # so the view function can handle extraction
-                    return text
-                except:
-                    # Just return the raw text if parsing fails
-                    return text
-            
-        except Exception as e:
-            print(f"Error with {strategy['name']} strategy: {e}")
-    
-    # If all strategies failed
-    print("All connection strategies failed")
-    return ""
-
-# Import re here to ensure it's available
-import re
\ No newline at end of file
+
+# Part of every notes store key, so editing the prompt retires the notes made with the old one
+PROMPT_VERSION = hashlib.sha256(build_prompt("{topic}").encode("utf-8")).hexdigest()[:12]
+
+def _flight_key(topic):
+    return make_key("notes", PROMPT_VERSION, topic)
+
+def _stored_notes(store, topic):
+    """Stored notes for `topic`, or for an already generated topic that means the same thing"""
+    index = get_topic_index("notes")
+    notes = store.get(topic)
+    if notes is not None:
+        if index is not None:
+            index.add(topic)
+        return notes
+    match = index.nearest(topic) if index is not None else None
+    return store.get(match[0]) if match is not None else None
+
+def _store_notes(store, topic, notes):
+    store.set(topic, notes)
+    index = get_topic_index("notes")
+    if index is not None:
+        index.add(topic)
+
+def _generate_notes_text(topic, deadline=None):
+    """Generate markdown notes and save them to the notes store"""
+    notes = get_provider().generate_text(build_prompt(topic), kind="notes", deadline=deadline)
+    if notes.strip():
+        _store_notes(get_notes_store(), topic, notes)
+    return notes
+
+def generate_notes(topic, deadline=None):
+    """Return notes for `topic`, from the notes store when possible (see _stored_notes)"""
+    notes = _stored_notes(get_notes_store(), topic)
+    if notes is not None:
+        return notes
+    # Concurrent requests for the same topic share a single Gemini call
+    return get_flight("notes").do(_flight_key(topic), _generate_notes_text, topic, deadline=deadline)
+
+async def _generate_notes_text_async(topic, deadline=None):
+    notes = await get_provider().generate_text_async(build_prompt(topic), kind="notes", deadline=deadline)
+    if notes.strip():
+        await sync_to_async(_store_notes, thread_sensitive=False)(get_notes_store(), topic, notes)
+    return notes
+
+async def generate_notes_async(topic, deadline=None):
+    """Async counterpart of generate_notes for the ASGI views; the notes store is read and written off the event loop"""
+    notes = await sync_to_async(_stored_notes, thread_sensitive=False)(get_notes_store(), topic)
+    if notes is not None:
+        return notes
+    return await get_async_flight("notes").do(_flight_key(topic), _generate_notes_text_async, topic, deadline=deadline)
+
+def stream_notes(topic, deadline=None):
+    """
+    Yield markdown notes chunk by chunk as the model produces them.
+
+    The generator is pull-based: the next chunk is only read from Gemini once the
+    server has written the previous one, so a slow client slows the upstream read
+    instead of piling chunks up in memory. If the client goes away, the server
+    closes this generator, which closes the upstream stream and skips caching;
+    the same happens when `deadline` runs out. The complete document is saved to the notes store.
+    """
+    store = get_notes_store()
+    notes = _stored_notes(store, topic)
+    if notes is not None:
+        yield notes
+        return
+
+    parts = []
+    with closing(get_provider().stream_text(build_prompt(topic), kind="notes", deadline=deadline)) as chunks:
+        for text in chunks:
+            parts.append(text)
+            yield text
+
+    notes = "".join(parts)
+    if notes.strip():
+        _store_notes(store, topic, notes)
+
+async def stream_notes_async(topic, deadline=None):
+    """
+    Async counterpart of stream_notes for the ASGI views.
+
+    A client disconnect cancels the response task, which closes the upstream
+    stream here and skips caching. The notes store is used off the event loop.
+    """
+    store = get_notes_store()
+    notes = await sync_to_async(_stored_notes, thread_sensitive=False)(store, topic)
+    if notes is not None:
+        yield notes
+        return
+
+    parts = []
+    async with aclosing(get_provider().stream_text_async(build_prompt(topic), kind="notes", deadline=deadline)) as chunks:
+        async for text in chunks:
+            parts.append(text)
+            yield text
+
+    notes = "".join(parts)
+    if notes.strip():
+        await sync_to_async(_store_notes, thread_sensitive=False)(store, topic, notes)
@@ -1,116 +1,224 @@
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 import json
-from .utils import generate_notes
+from .utils import generate_notes, generate_notes_async, stream_notes, stream_notes_async
+from .youtube import YouTubeError, get_search
+from backend.deadlines import Deadline
+from backend.ratelimit import rate_limited
+from backend.responses import error_event, error_response
+from backend.streaming import ndjson_response
 import os
 from django.views.decorators.http import require_GET
-import requests
+
+
+def parse_search_request(request):
+    """
+    Parse and validate a YouTube search request body.
+
+    Returns ((query, api_key), None) on success or (None, JsonResponse) describing the error.
+    """
+    try:
+        data = json.loads(request.body.decode("utf-8"))
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        return None, JsonResponse({"error": f"Invalid JSON in request: {str(e)}"}, status=400)
+    if not isinstance(data, dict):
+        return None, JsonResponse({"error": "Request body must be a JSON object"}, status=400)
+    query = data.get("q", "").strip()
+    if not query:
+        return None, JsonResponse({"error": "Search query is required."}, status=400)
+
+    api_key = os.getenv("YOUTUBE_API_KEY")
+    if not api_key:
+        return None, JsonResponse({"error": "YouTube API key not configured in environment."}, status=500)
+    return (query, api_key), None
+
+
+def search_error(e):
+    if isinstance(e, YouTubeError):
+        return JsonResponse({"error": f"YouTube API error: {e}"}, status=500)
+    return JsonResponse({"error": f"Unexpected error: {str(e)}"}, status=500)
+
+
+def search_response(videos):
+    return JsonResponse({"videos": videos, "message": "Videos fetched successfully."}, status=200)
+
 
 @csrf_exempt
 def search_youtube_videos(request):
     """Search for educational YouTube videos based on query param 'q'"""
     if request.method != "POST":
         return JsonResponse({"error": "Only POST method allowed."}, status=405)
-    
+
+    search, error = parse_search_request(request)
+    if error is not None:
+        return error
     try:
-        data = json.loads(request.body.decode("utf-8"))
-        query = data.get("q", "").strip()
-        if not query:
-            return JsonResponse({"error": "Search query is required."}, status=400)
-
-        # Enhance search to be educational
-        safe_query = f"{query} educational"
-
-        api_key = os.getenv("YOUTUBE_API_KEY")
-        if not api_key:
-            return JsonResponse({"error": "YouTube API key not configured in environment."}, status=500)
-
-        base_url = "https://www.googleapis.com/youtube/v3/search"
-        params = {
-            "part": "snippet",
-            "maxResults": 15,
-            "q": safe_query,
-            "type": "video",
-            "videoEmbeddable": "true",
-            "key": api_key,
-        }
-
-        response = requests.get(base_url, params=params)
-        if response.status_code != 200:
-            try:
-                error_msg = response.json().get('error', {}).get('message', 'Unknown error')
-            except Exception:
-                error_msg = 'Unknown error while parsing YouTube API response.'
-            return JsonResponse({"error": f"YouTube API error: {error_msg}"}, status=500)
-
-        data = response.json()
-
-        # Optionally extract and simplify data if needed
-        videos = [
-            {
-                "title": item["snippet"]["title"],
-                "videoId": item["id"]["videoId"],
-                "thumbnail": item["snippet"]["thumbnails"]["high"]["url"],
-                "channelTitle": item["snippet"]["channelTitle"],
-                "publishedAt": item["snippet"]["publishedAt"],
-            }
-            for item in data.get("items", [])
-        ]
-
-        return JsonResponse({"videos": videos, "message": "Videos fetched successfully."}, status=200)
+        # Served from the YouTube cache when the query was searched recently
+        return search_response(get_search().search(*search))
+    except Exception as e:
+        return search_error(e)
+
 
+@csrf_exempt
+async def search_youtube_videos_async(request):
+    """Async (ASGI) variant of search_youtube_videos"""
+    if request.method != "POST":
+        return JsonResponse({"error": "Only POST method allowed."}, status=405)
+
+    search, error = parse_search_request(request)
+    if error is not None:
+        return error
+    try:
+        return search_response(await get_search().search_async(*search))
     except Exception as e:
-        return JsonResponse({"error": f"Unexpected error: {str(e)}"}, status=500)
+        return search_error(e)
+
+
+def parse_notes_request(request):
+    """
+    Parse and validate a notes request body.
+
+    Returns (notes_data, None) on success or (None, JsonResponse) describing the error.
+    """
+    try:
+        request_body = request.body.decode('utf-8')
+    except UnicodeDecodeError as e:
+        return None, JsonResponse({"error": f"Invalid JSON in request: {str(e)}"}, status=400)
+    print(f"Raw request body: {request_body[:200]}")  # Debug first 200 chars
+
+    if not request_body.strip():
+        return None, JsonResponse({"error": "Empty request body"}, status=400)
+
+    # Parse JSON data
+    try:
+        data = json.loads(request_body)
+    except json.JSONDecodeError as e:
+        print(f"JSON parsing error: {e}")
+        return None, JsonResponse({"error": f"Invalid JSON in request: {str(e)}"}, status=400)
+    if not isinstance(data, dict):
+        return None, JsonResponse({"error": "Request body must be a JSON object"}, status=400)
+
+    print(f"Parsed request data: {data}")
+
+    # Validate required fields
+    if not data.get("topic"):
+        return None, JsonResponse({"error": "Topic is required"}, status=400)
+    return {"userId": data.get("userId"), "topic": data.get("topic")}, None
+
+
+def notes_response(notes_data, notes):
+    if not notes or len(notes.strip()) == 0:
+        return JsonResponse({"error": "Failed to generate notes"}, status=500)
+
+    # Return the generated notes to the frontend
+    return JsonResponse({
+        "data": {**notes_data, "notes": notes},
+        "message": "Notes generated successfully"
+    }, status=200)
+
+
+def notes_error(e):
+    print(f"Unexpected error: {str(e)}")
+    return error_response(e, f"Unexpected server error: {str(e)}")
+
+
+def notes_error_event(e):
+    print(f"Unexpected error: {str(e)}")
+    return error_event(e, f"Unexpected server error: {str(e)}")
+
+
+def done_event(received):
+    if not received:
+        return {"type": "error", "error": "Failed to generate notes"}
+    return {"type": "done", "message": "Notes generated successfully"}
+
 
 @csrf_exempt
+@rate_limited
 def create_notes(request):
     """Create notes generated by AI"""
     if request.method != "POST":
         return JsonResponse({"error": "Only POST method is supported"}, status=405)
 
+    notes_data, error = parse_notes_request(request)
+    if error is not None:
+        return error
     try:
-        request_body = request.body.decode('utf-8')
-        print(f"Raw request body: {request_body[:200]}")  # Debug first 200 chars
+        return notes_response(notes_data, generate_notes(notes_data["topic"], Deadline.from_request(request)))
+    except Exception as e:
+        return notes_error(e)
 
-        if not request_body.strip():
-            return JsonResponse({"error": "Empty request body"}, status=400)
 
-        # Parse JSON data
-        try:
-            data = json.loads(request_body)
-        except json.JSONDecodeError as e:
-            print(f"JSON parsing error: {e}")
-            return JsonResponse({"error": f"Invalid JSON in request: {str(e)}"}, status=400)
+@csrf_exempt
+@rate_limited
+async def create_notes_async(request):
+    """Async (ASGI) variant of create_notes"""
+    if request.method != "POST":
+        return JsonResponse({"error": "Only POST method is supported"}, status=405)
+
+    notes_data, error = parse_notes_request(request)
+    if error is not None:
+        return error
+    try:
+        return notes_response(notes_data, await generate_notes_async(notes_data["topic"], Deadline.from_request(request)))
+    except Exception as e:
+        return notes_error(e)
 
-        print(f"Parsed request data: {data}")
 
-        # Extract required fields
-        topic = data.get("topic")
-        userId = data.get("userId")
+@csrf_exempt
+@rate_limited
+def create_notes_stream(request):
+    """
+    Streaming variant of create_notes.
+
+    Responds with newline-delimited JSON events: "meta", then one "chunk" event per
+    piece of markdown as Gemini produces it, then "done" (or "error").
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "Only POST method is supported"}, status=405)
+
+    notes_data, error = parse_notes_request(request)
+    if error is not None:
+        return error
+    deadline = Deadline.from_request(request, stream=True)
 
-        # Validate required fields
-        if not topic:
-            return JsonResponse({"error": "Topic is required"}, status=400)
+    def events():
+        yield {"type": "meta", "data": notes_data}
+        received = False
+        try:
+            for text in stream_notes(notes_data["topic"], deadline):
+                received = received or bool(text.strip())
+                yield {"type": "chunk", "text": text}
+        except Exception as e:
+            yield notes_error_event(e)
+            return
+        yield done_event(received)
 
-        # Generate notes
-        notes = generate_notes(topic)
+    return ndjson_response(events())
 
-        # Validate notes
-        if not notes or len(notes.strip()) == 0:
-            return JsonResponse({"error": "Failed to generate notes"}, status=500)
 
-        # Return the generated notes to the frontend
-        notes_data = {
-            "userId": userId,
-            "topic": topic,
-            "notes": notes
-        }
+@csrf_exempt
+@rate_limited
+async def create_notes_stream_async(request):
+    """Async (ASGI) variant of create_notes_stream, with the same events"""
+    if request.method != "POST":
+        return JsonResponse({"error": "Only POST method is supported"}, status=405)
 
-        return JsonResponse({
-            "data": notes_data,
-            "message": "Notes generated successfully"
-        }, status=200)
+    notes_data, error = parse_notes_request(request)
+    if error is not None:
+        return error
+    deadline = Deadline.from_request(request, stream=True)
 
-    except Exception as e:
-        print(f"Unexpected error: {str(e)}")
-        return JsonResponse({"error": f"Unexpected server error: {str(e)}"}, status=500)
+    async def events():
+        yield {"type": "meta", "data": notes_data}
+        received = False
+        try:
+            async for text in stream_notes_async(notes_data["topic"], deadline):
+                received = received or bool(text.strip())
+                yield {"type": "chunk", "text": text}
+        except Exception as e:
+            yield notes_error_event(e)
+            return
+        yield done_event(received)
+
+    return ndjson_response(events())
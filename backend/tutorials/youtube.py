@@ -0,0 +1,273 @@
+"""
+Cached YouTube video search.
+
+Every search costs 100 units of YouTube Data API quota, and students search for
+the same topics over and over. Results are cached by normalized query, so
+"Photosynthesis!" and " photosynthesis " share an entry. The cache is the
+generation cache's "youtube" namespace (see backend.generation_cache), so the
+sqlite backend shares it between workers. An entry stores only the five fields
+the API returns, as compact rows.
+
+An entry is fresh for TTL seconds. After that it is served stale for up to
+STALE_TTL more seconds, while a background thread refreshes it. The refresh is
+conditional: it sends the entry's ETag, and a 304 Not Modified just renews it.
+Concurrent misses for one query share a single upstream call. Upstream calls
+reuse one pooled requests.Session, or one httpx.AsyncClient per event loop in
+the async view. httpx is imported when the async view first goes upstream.
+Configure through settings.YOUTUBE_CACHE.
+"""
+import asyncio
+import re
+import statistics
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from backend.generation_cache import get_cache, make_key, normalize_text
+from backend.singleflight import get_async_flight, get_flight
+
+YOUTUBE_SEARCH_URL = "https://www.googleapis.com/youtube/v3/search"
+FIELDS = ("title", "videoId", "thumbnail", "channelTitle", "publishedAt")
+
+DEFAULT_CONFIG = {
+    "TTL": 6 * 3600,
+    "STALE_TTL": 7 * 24 * 3600,
+    "TIMEOUT": 15.0,
+    "REFRESH_WORKERS": 2,
+}
+
+_PUNCTUATION = re.compile(r"[^\w\s+#]")
+
+
+class YouTubeError(Exception):
+    """The YouTube API answered with an error"""
+
+
+def normalize_query(query):
+    """Lowercase, drop punctuation (keeping C++ and C#) and collapse whitespace"""
+    return normalize_text(_PUNCTUATION.sub(" ", query))
+
+
+def youtube_search_params(query, api_key):
+    """Query parameters for an educational, embeddable YouTube video search"""
+    return {
+        "part": "snippet",
+        "maxResults": 15,
+        # Enhance search to be educational
+        "q": f"{query} educational",
+        "type": "video",
+        "videoEmbeddable": "true",
+        "key": api_key,
+    }
+
+
+def youtube_error_message(response):
+    try:
+        return response.json().get('error', {}).get('message', 'Unknown error')
+    except Exception:
+        return 'Unknown error while parsing YouTube API response.'
+
+
+def compact_videos(data):
+    """One [title, videoId, thumbnail, channelTitle, publishedAt] row per search result"""
+    return [
+        [
+            item["snippet"]["title"],
+            item["id"]["videoId"],
+            item["snippet"]["thumbnails"]["high"]["url"],
+            item["snippet"]["channelTitle"],
+            item["snippet"]["publishedAt"],
+        ]
+        for item in data.get("items", [])
+    ]
+
+
+def expand_videos(rows):
+    return [dict(zip(FIELDS, row)) for row in rows]
+
+
+class YouTubeSearch:
+    def __init__(self, config=None):
+        config = {**DEFAULT_CONFIG, **(config or {})}
+        self.ttl = config["TTL"]
+        self.stale_ttl = config["STALE_TTL"]
+        self.timeout = config["TIMEOUT"]
+        self.refresh_workers = config["REFRESH_WORKERS"]
+        self.cache = get_cache("youtube")
+        self._session = None
+        self._clients = weakref.WeakKeyDictionary()  # httpx.AsyncClient is bound to its event loop
+        self._executor = None
+        self._refreshing = set()
+        self._latencies = deque(maxlen=256)
+        self._lock = threading.Lock()
+        self.stats = {
+            "fresh_hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "upstream_calls": 0,
+            "upstream_errors": 0,
+            "refreshes": 0,
+            "not_modified": 0,
+        }
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _get_session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=16))
+                    self._session = session
+        return self._session
+
+    def _get_client(self):
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            import httpx
+
+            client = httpx.AsyncClient(timeout=httpx.Timeout(self.timeout, connect=5.0))
+            self._clients[loop] = client
+        return client
+
+    def _request_args(self, query, api_key, etag):
+        headers = {"If-None-Match": etag} if etag else {}
+        return youtube_search_params(query, api_key), headers
+
+    def _entry(self, response, elapsed):
+        """Build a cache entry from an upstream response; None means 304 Not Modified"""
+        with self._lock:
+            self.stats["upstream_calls"] += 1
+            self._latencies.append(elapsed)
+        if response.status_code == 304:
+            return None
+        if response.status_code != 200:
+            self._count("upstream_errors")
+            raise YouTubeError(youtube_error_message(response))
+        data = response.json()
+        return {
+            "fetched_at": time.time(),
+            "etag": response.headers.get("ETag") or data.get("etag"),
+            "videos": compact_videos(data),
+        }
+
+    def _fetch(self, query, api_key, etag=None):
+        params, headers = self._request_args(query, api_key, etag)
+        start = time.monotonic()
+        response = self._get_session().get(YOUTUBE_SEARCH_URL, params=params, headers=headers, timeout=self.timeout)
+        return self._entry(response, time.monotonic() - start)
+
+    async def _fetch_async(self, query, api_key, etag=None):
+        params, headers = self._request_args(query, api_key, etag)
+        start = time.monotonic()
+        response = await self._get_client().get(YOUTUBE_SEARCH_URL, params=params, headers=headers)
+        return self._entry(response, time.monotonic() - start)
+
+    def _store(self, key, entry):
+        # Kept past its TTL so it can be served stale while it is refreshed
+        self.cache.set(key, entry, ttl=self.ttl + self.stale_ttl)
+
+    def _fill(self, key, query, api_key):
+        entry = self._fetch(query, api_key)
+        self._store(key, entry)
+        return entry["videos"]
+
+    async def _fill_async(self, key, query, api_key):
+        entry = await self._fetch_async(query, api_key)
+        await sync_to_async(self._store, thread_sensitive=False)(key, entry)
+        return entry["videos"]
+
+    def _lookup(self, query, api_key):
+        """Return (key, cached rows or None) for a normalized `query`; schedules a refresh for stale entries"""
+        key = make_key("youtube", query)
+        entry = self.cache.get(key)
+        if entry is None:
+            self._count("misses")
+            return key, None
+        if time.time() - entry["fetched_at"] <= self.ttl:
+            self._count("fresh_hits")
+        else:
+            self._count("stale_hits")
+            self._refresh_in_background(key, query, api_key, entry)
+        return key, entry["videos"]
+
+    def _refresh_in_background(self, key, query, api_key, entry):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.refresh_workers, thread_name_prefix="youtube-refresh")
+        self._executor.submit(self._refresh, key, query, api_key, entry)
+
+    def _refresh(self, key, query, api_key, entry):
+        try:
+            fresh = self._fetch(query, api_key, entry.get("etag"))
+            if fresh is None:
+                self._count("not_modified")
+                fresh = {**entry, "fetched_at": time.time()}
+            self._store(key, fresh)
+            self._count("refreshes")
+        except Exception as e:
+            # Keep serving the stale entry; the next stale hit tries again
+            print(f"YouTube refresh for '{query}' failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def search(self, query, api_key):
+        """Return the videos for `query` as dicts; raises YouTubeError for API errors"""
+        query = normalize_query(query)
+        key, rows = self._lookup(query, api_key)
+        if rows is None:
+            rows = get_flight("youtube").do(key, self._fill, key, query, api_key)
+        return expand_videos(rows)
+
+    async def search_async(self, query, api_key):
+        """Async counterpart of search; the cache is read and written off the event loop"""
+        query = normalize_query(query)
+        key, rows = await sync_to_async(self._lookup, thread_sensitive=False)(query, api_key)
+        if rows is None:
+            rows = await get_async_flight("youtube").do(key, self._fill_async, key, query, api_key)
+        return expand_videos(rows)
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+            latencies = sorted(self._latencies)
+        lookups = stats["fresh_hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["fresh_hits"] + stats["stale_hits"]) / lookups if lookups else 0.0
+        if latencies:
+            stats["upstream_latency_ms"] = {
+                "p50": round(statistics.median(latencies) * 1000, 1),
+                "p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1),
+            }
+        return stats
+
+
+_search = None
+_search_lock = threading.Lock()
+
+
+def get_search():
+    """Process-wide cached search configured by settings.YOUTUBE_CACHE"""
+    global _search
+    if _search is None:
+        with _search_lock:
+            if _search is None:
+                _search = YouTubeSearch(getattr(settings, "YOUTUBE_CACHE", {}))
+    return _search
+
+
+def youtube_stats():
+    return _search.snapshot() if _search is not None else {}
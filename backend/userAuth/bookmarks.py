@@ -0,0 +1,129 @@
+"""
+Bookmarked questions stored as a keyed subcollection.
+
+Each bookmark is its own document at users/{uid}/bookmarks/{key}, where
+key is a content hash of the question. Adding and removing are single
+keyed writes, so the cost no longer grows with the number of bookmarks.
+They are idempotent: bookmarking the same question twice keeps one entry
+and its original timestamp.
+
+The Firestore SDK is imported inside the functions, so importing this module
+(as the URLconf does) doesn't load it.
+"""
+import datetime
+import hashlib
+import json
+
+from backend.questions import Question
+
+BOOKMARKS_SUBCOLLECTION = "bookmarks"
+# Per-attempt fields that don't change which question this is
+VOLATILE_FIELDS = {"attempted_option", "bookmarkedAt", "bookmarked_at"}
+
+
+def question_hash(question):
+    """
+    Stable content hash of a question, ignoring per-attempt fields.
+
+    Valid questions use Question.content_hash; anything else (e.g. legacy
+    bookmarks in an older shape) hashes its canonical JSON.
+    """
+    if not isinstance(question, Question):
+        question = Question.from_dict(question) or question
+    if isinstance(question, Question):
+        return question.content_hash
+    content = {k: v for k, v in question.items() if k not in VOLATILE_FIELDS}
+    canonical = json.dumps(content, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+def bookmarks_ref(db, uid):
+    return db.collection('users').document(uid).collection(BOOKMARKS_SUBCOLLECTION)
+
+
+def add_bookmark(db, uid, question, created_at=None):
+    """
+    Bookmark `question` (a Question or a question dict) for `uid`.
+
+    Returns (key, created) where created is False if it was already bookmarked.
+    """
+    from firebase_admin import firestore
+    from google.api_core.exceptions import AlreadyExists
+
+    key = question_hash(question)
+    try:
+        bookmarks_ref(db, uid).document(key).create({
+            "question": question.to_dict() if isinstance(question, Question) else question,
+            "created_at": created_at or firestore.SERVER_TIMESTAMP,
+        })
+        return key, True
+    except AlreadyExists:
+        return key, False
+
+
+def remove_bookmark(db, uid, key):
+    bookmarks_ref(db, uid).document(key).delete()
+
+
+def list_bookmarks(db, uid, limit=20, cursor=None):
+    """
+    Return (bookmarks, next_cursor), newest first.
+
+    `cursor` is the key of the last bookmark of the previous page.
+    """
+    from firebase_admin import firestore
+
+    query = bookmarks_ref(db, uid).order_by("created_at", direction=firestore.Query.DESCENDING)
+    if cursor:
+        last = bookmarks_ref(db, uid).document(cursor).get()
+        if last.exists:
+            query = query.start_after(last)
+    docs = list(query.limit(limit).stream())
+    bookmarks = [{"bookmark_id": doc.id, **doc.to_dict()} for doc in docs]
+    next_cursor = docs[-1].id if len(docs) == limit else None
+    return bookmarks, next_cursor
+
+
+def migrate_user_bookmarks(db, user_snapshot, field="bookmarked_questions", drop_array=False, batch_size=400):
+    """
+    Copy a user's bookmark array into the subcollection.
+
+    Array order is kept by giving each bookmark a created_at one millisecond
+    apart. Bookmarks already in the subcollection are left alone, so running it
+    again only copies what was added to the array since. The array itself is
+    kept unless `drop_array` is set. Only drop it once no client reads it any
+    more. Returns the number of bookmarks written.
+    """
+    from firebase_admin import firestore
+
+    questions = (user_snapshot.to_dict() or {}).get(field) or []
+    existing = {doc.id for doc in bookmarks_ref(db, user_snapshot.id).select([]).stream()}
+    base = datetime.datetime.now(datetime.timezone.utc)
+    batch = db.batch()
+    pending = 0
+    written = 0
+    seen = set()
+    for i, question in enumerate(questions):
+        if not isinstance(question, dict):
+            continue
+        key = question_hash(question)
+        if key in seen or key in existing:
+            continue
+        seen.add(key)
+        batch.set(bookmarks_ref(db, user_snapshot.id).document(key), {
+            "question": question,
+            "created_at": base + datetime.timedelta(milliseconds=i),
+        })
+        pending += 1
+        written += 1
+        if pending >= batch_size:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+    if drop_array:
+        # Drop the array in the same commit as the last bookmarks
+        batch.update(user_snapshot.reference, {field: firestore.DELETE_FIELD})
+        pending += 1
+    if pending:
+        batch.commit()
+    return written
@@ -0,0 +1,207 @@
+"""
+Precomputed leaderboard.
+
+Each quiz submission also copies the user's new totals into a denormalized
+`leaderboard` collection (see userAuth.submissions). That collection holds
+one small document per user with an `updated_at` server timestamp. Every
+worker keeps those entries in a RankedIndex and syncs it incrementally,
+reading only documents changed since its last sync. So top-N, pagination
+and "my rank" never scan the `users` collection.
+
+The Firestore client is injectable, so the leaderboard can run against the
+Firestore emulator (FIRESTORE_EMULATOR_HOST) or an in-memory fake. The
+Firestore SDK itself is only imported once the leaderboard is used.
+"""
+import bisect
+import threading
+import time
+
+from backend.firebase_config import get_firestore
+
+LEADERBOARD_COLLECTION = "leaderboard"
+SYNC_INTERVAL = 5  # seconds between incremental syncs
+
+
+def average_marks(total_marks, number_of_tests_attempted):
+    if not number_of_tests_attempted:
+        return 0
+    return total_marks / number_of_tests_attempted
+
+
+def make_entry(uid, email, total_marks, number_of_tests_attempted):
+    return {
+        "userID": uid,
+        "email": email,
+        "total_marks": total_marks,
+        "number_of_tests_attempted": number_of_tests_attempted,
+        "average_marks": average_marks(total_marks, number_of_tests_attempted),
+    }
+
+
+class RankedIndex:
+    """Entries ordered by average marks (highest first) with O(log n) rank lookups"""
+
+    def __init__(self):
+        self._keys = []  # sorted (-average_marks, userID)
+        self._entries = {}
+
+    @staticmethod
+    def _key(entry):
+        return (-entry["average_marks"], entry["userID"])
+
+    def upsert(self, entry):
+        self.remove(entry["userID"])
+        self._entries[entry["userID"]] = entry
+        bisect.insort(self._keys, self._key(entry))
+
+    def remove(self, uid):
+        old = self._entries.pop(uid, None)
+        if old is not None:
+            del self._keys[bisect.bisect_left(self._keys, self._key(old))]
+
+    def rank(self, uid):
+        """1-based rank of `uid`, or None if it isn't ranked"""
+        entry = self._entries.get(uid)
+        if entry is None:
+            return None
+        return bisect.bisect_left(self._keys, self._key(entry)) + 1
+
+    def page(self, offset, limit):
+        return [self._entries[uid] for _, uid in self._keys[offset:offset + limit]]
+
+    def get(self, uid):
+        return self._entries.get(uid)
+
+    def __len__(self):
+        return len(self._keys)
+
+
+class Leaderboard:
+    def __init__(self, db=None, collection=LEADERBOARD_COLLECTION, sync_interval=SYNC_INTERVAL):
+        self._db = db
+        self.collection = collection
+        self.sync_interval = sync_interval
+        self.index = RankedIndex()
+        self._watermark = None
+        self._last_sync = 0
+        self._lock = threading.Lock()
+
+    @property
+    def db(self):
+        return self._db or get_firestore()
+
+    def record(self, uid, email, total_marks, number_of_tests_attempted):
+        """
+        Write a user's committed totals to their leaderboard entry and this worker's index.
+
+        The values are absolute, copied from the user document, so an entry that was
+        never backfilled is corrected by the user's next submission. The write runs in
+        a transaction and is skipped if the entry already holds a later submission's
+        totals, so concurrent submissions can't move it backwards.
+        """
+        from firebase_admin import firestore
+
+        ref = self.db.collection(self.collection).document(uid)
+
+        @firestore.transactional
+        def write(transaction):
+            current = ref.get(transaction=transaction).to_dict() or {}
+            if current.get("number_of_tests_attempted", 0) > number_of_tests_attempted:
+                return False
+            transaction.set(ref, {
+                "userID": uid,
+                "email": email,
+                "total_marks": total_marks,
+                "number_of_tests_attempted": number_of_tests_attempted,
+                "updated_at": firestore.SERVER_TIMESTAMP,
+            })
+            return True
+
+        if write(self.db.transaction()):
+            return self.apply(uid, email, total_marks, number_of_tests_attempted)
+        return None  # a later entry is already stored; sync() picks it up
+
+    def apply(self, uid, email, total_marks, number_of_tests_attempted):
+        """Update this worker's index with totals that have already been committed"""
+        entry = make_entry(uid, email, total_marks, number_of_tests_attempted)
+        with self._lock:
+            self.index.upsert(entry)
+        return entry
+
+    def sync(self, force=False):
+        """Pull entries written by other workers since the last sync"""
+        from google.cloud.firestore_v1.base_query import FieldFilter
+
+        if not force and time.time() - self._last_sync < self.sync_interval:
+            return
+        with self._lock:
+            query = self.db.collection(self.collection)
+            if self._watermark is not None:
+                # >= so that writes sharing the watermark's timestamp aren't missed
+                query = query.where(filter=FieldFilter("updated_at", ">=", self._watermark))
+            for doc in query.stream():
+                data = doc.to_dict()
+                self.index.upsert(make_entry(
+                    doc.id,
+                    data.get("email"),
+                    data.get("total_marks", 0),
+                    data.get("number_of_tests_attempted", 0),
+                ))
+                updated_at = data.get("updated_at")
+                if updated_at is not None and (self._watermark is None or updated_at > self._watermark):
+                    self._watermark = updated_at
+            self._last_sync = time.time()
+
+    def top(self, offset=0, limit=10):
+        self.sync()
+        with self._lock:
+            return self.index.page(offset, limit), len(self.index)
+
+    def rank(self, uid):
+        """Return (rank, entry, total) for `uid`; rank and entry are None if unranked"""
+        self.sync()
+        with self._lock:
+            return self.index.rank(uid), self.index.get(uid), len(self.index)
+
+    def rebuild_from_users(self, batch_size=400):
+        """Backfill the leaderboard collection from the users collection"""
+        from firebase_admin import firestore
+
+        batch = self.db.batch()
+        pending = 0
+        count = 0
+        for user in self.db.collection("users").stream():
+            data = user.to_dict()
+            if "total_marks" not in data or "number_of_tests_attempted" not in data:
+                continue
+            batch.set(self.db.collection(self.collection).document(user.id), {
+                "userID": user.id,
+                "email": data.get("email"),
+                "total_marks": data["total_marks"],
+                "number_of_tests_attempted": data["number_of_tests_attempted"],
+                "updated_at": firestore.SERVER_TIMESTAMP,
+            })
+            pending += 1
+            count += 1
+            if pending >= batch_size:
+                batch.commit()
+                batch = self.db.batch()
+                pending = 0
+        if pending:
+            batch.commit()
+        self.sync(force=True)
+        return count
+
+
+_leaderboard = None
+_leaderboard_lock = threading.Lock()
+
+
+def get_leaderboard():
+    """Process-wide leaderboard backed by this process's Firestore client"""
+    global _leaderboard
+    if _leaderboard is None:
+        with _leaderboard_lock:
+            if _leaderboard is None:
+                _leaderboard = Leaderboard()
+    return _leaderboard
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from backend.firebase_config import get_firestore
+from userAuth.bookmarks import migrate_user_bookmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy bookmark arrays on user documents into the users/{uid}/bookmarks subcollection. "
+        "The arrays are kept unless --drop-array is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--field",
+            default="bookmarked_questions",
+            help="Array field to migrate (older web app versions write 'bookmarkedQuestions')",
+        )
+        parser.add_argument(
+            "--drop-array",
+            action="store_true",
+            help="Delete the array after copying it. Only use this once no client reads the array any more.",
+        )
+
+    def handle(self, *args, **options):
+        db = get_firestore()
+        field = options["field"]
+        users = 0
+        bookmarks = 0
+        for user in db.collection("users").stream():
+            if not (user.to_dict() or {}).get(field):
+                continue
+            bookmarks += migrate_user_bookmarks(db, user, field=field, drop_array=options["drop_array"])
+            users += 1
+        self.stdout.write(self.style.SUCCESS(f"Copied {bookmarks} bookmarks for {users} users"))
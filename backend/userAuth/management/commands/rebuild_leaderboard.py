@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from userAuth.leaderboard import get_leaderboard
+
+
+class Command(BaseCommand):
+    help = "Backfill the precomputed leaderboard collection from the users collection"
+
+    def handle(self, *args, **options):
+        count = get_leaderboard().rebuild_from_users()
+        self.stdout.write(self.style.SUCCESS(f"Leaderboard rebuilt with {count} users"))
@@ -1,11 +1,41 @@
+from django.conf import settings
 from django.http import JsonResponse
-from firebase_admin import auth
-from django.utils.deprecation import MiddlewareMixin
+from .token_verifier import verify_id_token
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+PUBLIC_PATHS = ("/admin",)
+DOCS_PATHS = ("/swagger", "/redoc")  # public only when DEBUG is on
+
+
+class FirebaseAuthMiddleware:
+    """
+    Verifies the Firebase ID token on every request.
+
+    Works under both WSGI and ASGI: with async views the token check runs in a
+    worker thread so it never blocks the event loop.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        response = self.process_request(request)
+        return response or self.get_response(request)
+
+    async def __acall__(self, request):
+        response = await sync_to_async(self.process_request, thread_sensitive=False)(request)
+        return response or await self.get_response(request)
 
-class FirebaseAuthMiddleware(MiddlewareMixin):
     def process_request(self, request):
-        if request.path.startswith("/admin"):
-            return None  # Skip Firebase auth for admin
+        if request.path.startswith(PUBLIC_PATHS) or (settings.DEBUG and request.path.startswith(DOCS_PATHS)):
+            return None  # Skip Firebase auth for admin, and for the API docs in development
 
         auth_header = request.headers.get("Authorization")
 
@@ -16,7 +46,7 @@ class FirebaseAuthMiddleware(MiddlewareMixin):
 
         id_token = auth_header.split(" ")[1]
         try:
-            decoded_token = auth.verify_id_token(id_token)  # ✅ Verify Firebase token
+            decoded_token = verify_id_token(id_token)  # ✅ Verify Firebase token (cached)
             request.firebaseUser = decoded_token
         except Exception as e:
             print("❌ Invalid Firebase token:", e)
@@ -1,5 +1,5 @@
 from rest_framework import permissions
-from firebase_admin import auth
+from .token_verifier import get_request_claims
 
 class FirebaseAuthentication(permissions.BasePermission):
     """
@@ -7,15 +7,12 @@ class FirebaseAuthentication(permissions.BasePermission):
     """
 
     def has_permission(self, request, view):
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return False
-
-        id_token = auth_header.split(' ')[1]
-
         try:
-            decoded_token = auth.verify_id_token(id_token)
-            request.user = decoded_token  # Store decoded Firebase user
-            return True
+            # Reuses the claims FirebaseAuthMiddleware already verified for this request
+            decoded_token = get_request_claims(request)
         except Exception:
             return False
+        if decoded_token is None:
+            return False
+        request.user = decoded_token  # Store decoded Firebase user
+        return True
@@ -0,0 +1,49 @@
+"""
+Write path for quiz submissions.
+
+A submission is one update of the user's totals with server-side increments.
+There is no read-modify-write, so concurrent submissions can't overwrite each
+other. The new totals come back from the write's transform results, so no
+extra read is needed either. They are then copied, as absolute values, into the
+user's leaderboard entry (see Leaderboard.record). An entry that was missing or
+had drifted is therefore corrected on the next submission. That is also why a
+failed leaderboard write is only logged: the totals have already committed, and
+failing the request would make the client retry and count the submission twice.
+"""
+from .leaderboard import get_leaderboard
+
+# Firestore returns transform results ordered by field path
+_COUNTER_FIELDS = sorted(["total_marks", "number_of_tests_attempted"])
+
+
+def record_submission(db, uid, email, marks, leaderboard=None):
+    """
+    Atomically add `marks` and one attempt to the user's totals.
+
+    Returns (total_marks, number_of_tests_attempted) after the update. Raises
+    google.api_core.exceptions.NotFound if the user document doesn't exist.
+    """
+    from firebase_admin import firestore
+    from google.cloud.firestore_v1 import _helpers
+
+    leaderboard = leaderboard or get_leaderboard()
+    user_ref = db.collection('users').document(uid)
+
+    # update() carries an exists=True precondition, so a missing user fails
+    write_result = user_ref.update({
+        'total_marks': firestore.Increment(marks),
+        'number_of_tests_attempted': firestore.Increment(1),
+    })
+
+    values = dict(zip(
+        _COUNTER_FIELDS,
+        (_helpers.decode_value(value, db) for value in write_result.transform_results),
+    ))
+    total_marks = values['total_marks']
+    number_of_tests_attempted = values['number_of_tests_attempted']
+
+    try:
+        leaderboard.record(uid, email, total_marks, number_of_tests_attempted)
+    except Exception as e:
+        print(f"Leaderboard update for {uid} failed: {e}")
+    return total_marks, number_of_tests_attempted
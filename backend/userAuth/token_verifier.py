@@ -0,0 +1,180 @@
+"""
+Local verification of Firebase ID tokens.
+
+firebase_admin.auth.verify_id_token re-checks the RS256 signature on every
+call, and the middleware, the DRF permission and some views each called it
+for the same request. This verifier:
+
+- caches Google's public signing keys (JWKS) for as long as the key
+  endpoint's Cache-Control header allows, refetching early only for an
+  unknown key id
+- caches decoded tokens by SHA-256 of the token until their `exp`
+- lets callers reuse the claims already attached to the request by
+  FirebaseAuthMiddleware, so a request is verified at most once
+
+Failures raise the same firebase_admin exceptions as auth.verify_id_token.
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+import requests
+from firebase_admin import auth
+
+from backend.firebase_config import get_firebase_app
+
+JWKS_URL = "https://www.googleapis.com/service_accounts/v1/jwk/securetoken@system.gserviceaccount.com"
+DEFAULT_KEYS_MAX_AGE = 300
+# Don't hammer the key endpoint when tokens arrive with a bogus key id
+MIN_REFRESH_INTERVAL = 30
+
+
+class FirebaseTokenVerifier:
+    def __init__(self, project_id, jwks_url=JWKS_URL, max_cached_tokens=10000, session=None):
+        self.project_id = project_id
+        self.jwks_url = jwks_url
+        self.max_cached_tokens = max_cached_tokens
+        self.session = session or requests.Session()
+        self.issuer = f"https://securetoken.google.com/{project_id}"
+        self._keys = {}
+        self._keys_expire_at = 0
+        self._keys_fetched_at = 0
+        self._keys_lock = threading.Lock()
+        self._tokens = OrderedDict()
+        self._tokens_lock = threading.Lock()
+        self.stats = {"token_cache_hits": 0, "verifications": 0, "key_fetches": 0}
+
+    def _fetch_keys(self):
+        response = self.session.get(self.jwks_url, timeout=10)
+        response.raise_for_status()
+        keys = {}
+        for jwk in response.json().get("keys", []):
+            keys[jwk["kid"]] = jwt.PyJWK(jwk, algorithm="RS256")
+
+        max_age = DEFAULT_KEYS_MAX_AGE
+        match = re.search(r"max-age=(\d+)", response.headers.get("Cache-Control", ""))
+        if match:
+            max_age = int(match.group(1)) - int(response.headers.get("Age", 0) or 0)
+
+        now = time.time()
+        self._keys = keys
+        self._keys_fetched_at = now
+        self._keys_expire_at = now + max(0, max_age)
+        self.stats["key_fetches"] += 1
+
+    def _get_key(self, kid):
+        now = time.time()
+        key = self._keys.get(kid) if now < self._keys_expire_at else None
+        if key is not None:
+            return key
+        with self._keys_lock:
+            key = self._keys.get(kid) if time.time() < self._keys_expire_at else None
+            if key is None and (
+                time.time() >= self._keys_expire_at
+                or time.time() - self._keys_fetched_at >= MIN_REFRESH_INTERVAL
+            ):
+                self._fetch_keys()
+                key = self._keys.get(kid)
+        if key is None:
+            raise auth.InvalidIdTokenError(f"Firebase ID token has an unknown key id: {kid}")
+        return key
+
+    def _decode(self, id_token):
+        try:
+            header = jwt.get_unverified_header(id_token)
+        except jwt.PyJWTError as e:
+            raise auth.InvalidIdTokenError(f"Malformed Firebase ID token: {e}", cause=e)
+        if header.get("alg") != "RS256":
+            raise auth.InvalidIdTokenError("Firebase ID token has incorrect algorithm")
+
+        key = self._get_key(header.get("kid"))
+        try:
+            claims = jwt.decode(
+                id_token,
+                key.key,
+                algorithms=["RS256"],
+                audience=self.project_id,
+                issuer=self.issuer,
+                options={"require": ["exp", "iat", "sub"]},
+            )
+        except jwt.ExpiredSignatureError as e:
+            raise auth.ExpiredIdTokenError("Firebase ID token has expired", cause=e)
+        except jwt.PyJWTError as e:
+            raise auth.InvalidIdTokenError(f"Invalid Firebase ID token: {e}", cause=e)
+
+        if not claims["sub"] or len(claims["sub"]) > 128:
+            raise auth.InvalidIdTokenError("Firebase ID token has an invalid subject")
+        if claims.get("auth_time", 0) > time.time():
+            raise auth.InvalidIdTokenError("Firebase ID token has a future auth_time")
+        claims["uid"] = claims["sub"]
+        return claims
+
+    def verify(self, id_token):
+        """Return the decoded claims of `id_token`, verifying its signature at most once"""
+        token_hash = hashlib.sha256(id_token.encode("utf-8")).hexdigest()
+        now = time.time()
+        with self._tokens_lock:
+            cached = self._tokens.get(token_hash)
+            if cached is not None:
+                if cached["exp"] > now:
+                    self._tokens.move_to_end(token_hash)
+                    self.stats["token_cache_hits"] += 1
+                    return cached
+                del self._tokens[token_hash]
+
+        claims = self._decode(id_token)
+        with self._tokens_lock:
+            self.stats["verifications"] += 1
+            self._tokens[token_hash] = claims
+            while len(self._tokens) > self.max_cached_tokens:
+                self._tokens.popitem(last=False)
+        return claims
+
+    def clear(self):
+        with self._tokens_lock:
+            self._tokens.clear()
+        with self._keys_lock:
+            self._keys = {}
+            self._keys_expire_at = 0
+
+
+_verifier = None
+_verifier_lock = threading.Lock()
+
+
+def get_verifier():
+    global _verifier
+    if _verifier is None:
+        with _verifier_lock:
+            if _verifier is None:
+                _verifier = FirebaseTokenVerifier(os.getenv("GOOGLE_PROJECT_ID"))
+    return _verifier
+
+
+def verify_id_token(id_token):
+    """Drop-in replacement for auth.verify_id_token backed by the local caches"""
+    if os.getenv("FIREBASE_AUTH_EMULATOR_HOST"):
+        # Emulator tokens are unsigned; let the SDK handle them
+        return auth.verify_id_token(id_token, app=get_firebase_app())
+    return get_verifier().verify(id_token)
+
+
+def get_request_claims(request):
+    """
+    Return the Firebase claims for `request`, reusing the middleware's result.
+
+    Returns None if there is no bearer token; raises if the token is invalid.
+    """
+    claims = getattr(request, "firebaseUser", None)
+    if claims is not None:
+        return claims
+    auth_header = request.headers.get("Authorization")
+    if not auth_header or not auth_header.startswith("Bearer "):
+        return None
+    claims = verify_id_token(auth_header.split(" ")[1])
+    request.firebaseUser = claims
+    return claims
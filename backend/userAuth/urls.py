@@ -6,8 +6,11 @@ urlpatterns = [
     path('login/', views.login_user, name='login_user'),
     path('user/', views.get_user, name='get_user'),
     path('all_users/', views.get_all_users, name="get_all_users"),
+    path('leaderboard/me/', views.get_my_rank, name="get_my_rank"),
     path('get_user_from_cookie/', views.get_user_from_cookie, name="get_user_from_cookie"),
     path('update_weak_topics/', views.update_weak_topics, name='update_weak_topics'),
     path('update_total_marks/', views.update_total_marks, name='update_total_marks'),
     path('update_bookmarked_questions/', views.update_bookmarked_questions, name='update_bookmarked_questions'),
+    path('remove_bookmarked_question/', views.remove_bookmarked_question, name='remove_bookmarked_question'),
+    path('bookmarked_questions/', views.get_bookmarked_questions, name='get_bookmarked_questions'),
 ]
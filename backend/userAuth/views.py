@@ -2,10 +2,16 @@ from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 import json
-from firebase_admin import auth, firestore
+from firebase_admin import auth
 import requests
 from rest_framework.decorators import api_view, permission_classes
 from .permissions import FirebaseAuthentication
+from .token_verifier import get_request_claims
+from .leaderboard import get_leaderboard
+from .submissions import record_submission
+from .bookmarks import add_bookmark, list_bookmarks, question_hash, remove_bookmark
+from backend.firebase_config import get_firebase_app, get_firestore
+from backend.questions import Question
 from rest_framework.response import Response
 from dotenv import load_dotenv
 import os
@@ -26,10 +32,12 @@ def register_user(request):
     if not email or not password:
         return Response({'error': 'Email and password are required.'}, status=400)
 
-    db = firestore.client()
+    from firebase_admin import firestore
+
+    db = get_firestore()
     transaction = db.transaction()
     try:
-        user = auth.create_user(email=email, password=password)
+        user = auth.create_user(email=email, password=password, app=get_firebase_app())
     except Exception as e:
         return Response({"error": str(e)}, status=400)
 
@@ -56,7 +64,7 @@ def register_user(request):
 
     except Exception as e:
         try:
-            auth.delete_user(user.uid)
+            auth.delete_user(user.uid, app=get_firebase_app())
             return Response({"error": str(e), "rollback": "User deleted from Firebase Auth"}, status=400)
         except Exception as rollback_error:
             return Response({
@@ -136,10 +144,10 @@ def get_user_by_uid(uid):
     """
     try:
         # Fetch user from Firebase Authentication
-        firebase_user = auth.get_user(uid)
+        firebase_user = auth.get_user(uid, app=get_firebase_app())
 
         # Fetch user document from Firestore
-        db = firestore.client()
+        db = get_firestore()
         user_doc = db.collection('users').document(uid).get()
 
         if user_doc.exists:
@@ -168,31 +176,43 @@ def get_user_by_uid(uid):
 @api_view(['GET'])
 def get_all_users(request):
     """
-    Retrieve all users from the Firestore 'users' collection.
+    Return the leaderboard: users ranked by average marks, highest first.
+
+    Supports pagination with ?offset=<n>&limit=<n> (limit defaults to 100).
+    Served from the precomputed leaderboard instead of scanning the users collection.
     """
     try:
-        db = firestore.client()
-        users_ref = db.collection('users')
-        users = users_ref.stream()
-
-        users_list = []
-        for user in users:
-            user_data = user.to_dict()
-            important_user_data = {}
-            if ('total_marks' not in user_data.keys()):
-                continue
-            if ('number_of_tests_attempted' not in user_data.keys()):
-                continue
-            important_user_data['userID'] = user.id 
-            important_user_data['email'] = user_data['email']
-            important_user_data['total_marks'] = user_data['total_marks']
-            important_user_data['number_of_tests_attempted'] = user_data['number_of_tests_attempted']
-            important_user_data['average_marks'] = 0
-            if (user_data['number_of_tests_attempted'] != 0):
-                important_user_data['average_marks'] = user_data['total_marks']/user_data['number_of_tests_attempted']
-            users_list.append(important_user_data)
-        sorted_users_list = sorted(users_list, key=lambda x: x['average_marks'], reverse=True)
-        return Response({"users": users_list}, status=200)
+        offset = max(0, int(request.query_params.get('offset', 0)))
+        limit = min(500, max(1, int(request.query_params.get('limit', 100))))
+    except ValueError:
+        return Response({"error": "offset and limit must be integers"}, status=400)
+
+    try:
+        users_list, total = get_leaderboard().top(offset, limit)
+        next_offset = offset + limit if offset + limit < total else None
+        return Response({
+            "users": users_list,
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "next_offset": next_offset,
+        }, status=200)
+
+    except Exception as e:
+        return Response({"error": str(e)}, status=500)
+
+
+@api_view(['GET'])
+def get_my_rank(request):
+    """
+    Return the authenticated user's leaderboard rank.
+    """
+    try:
+        uid = request.firebaseUser['user_id']
+        rank, entry, total = get_leaderboard().rank(uid)
+        if rank is None:
+            return Response({"error": "User has no leaderboard entry yet"}, status=404)
+        return Response({"rank": rank, "total": total, "user": entry}, status=200)
 
     except Exception as e:
         return Response({"error": str(e)}, status=500)
@@ -204,14 +224,12 @@ def get_user_from_cookie(request):
     Retrieve the authenticated user ID from the Firebase token stored in cookies.
     """
     try:
-        auth_header = request.headers.get("Authorization")
+        decoded_token = get_request_claims(request)
         
-        if not auth_header or not auth_header.startswith("Bearer "):
+        if decoded_token is None:
             print("❌ No auth header found!")
             return Response({"error": "No authentication token provided"}, status=401)
 
-        id_token = auth_header.split(" ")[1]
-        decoded_token = auth.verify_id_token(id_token)
         uid = decoded_token.get('user_id')
 
         if not uid:
@@ -236,7 +254,7 @@ def update_weak_topics(request):
     """
     try:
         uid = request.firebaseUser['user_id']
-        db = firestore.client()
+        db = get_firestore()
         user_ref = db.collection('users').document(uid)
 
         # Get request data
@@ -269,33 +287,31 @@ def update_weak_topics(request):
 def update_total_marks(request):
     """
     Update the total marks of a Firestore user document.
+
+    Uses server-side increments in a single commit, so concurrent submissions
+    never lose updates, and returns the new totals without reading the document.
     """
+    from google.api_core.exceptions import NotFound
+
     try:
         uid = request.firebaseUser['user_id']
-        db = firestore.client()
-        user_ref = db.collection('users').document(uid)
+        db = get_firestore()
 
         # Get request data
         data = json.loads(request.body)
         new_marks = data.get('marks', 0)
 
-        # Check if user document exists
-        user_doc = user_ref.get()
-        if not user_doc.exists:
+        try:
+            updated_marks, number_of_tests_attempted = record_submission(
+                db, uid, request.firebaseUser.get('email'), new_marks
+            )
+        except NotFound:
             return JsonResponse({"error": "User not found"}, status=404)
 
-        # Retrieve current total marks
-        current_marks = user_doc.get('total_marks') or 0
-
-        # Add new marks to total
-        updated_marks = current_marks + new_marks
-
-        # Update Firestore document
-        user_ref.update({'total_marks': updated_marks})
-        user_ref.update({'number_of_tests_attempted': user_doc.get('number_of_tests_attempted')+1})
         return JsonResponse({
             "message": "Total marks and number of tests updated successfully",
-            "total_marks": updated_marks
+            "total_marks": updated_marks,
+            "number_of_tests_attempted": number_of_tests_attempted
         }, status=200)
 
     except Exception as e:
@@ -304,41 +320,81 @@ def update_total_marks(request):
 @api_view(['POST'])
 def update_bookmarked_questions(request):
     """
-    Update the `bookmarked_questions` of a Firestore user document.
-    Creates the field if it doesn't exist and avoids duplicates.
+    Bookmark a question for the current user.
+
+    Bookmarks live in the users/{uid}/bookmarks subcollection keyed by a content
+    hash, so adding one is a single idempotent write.
     """
     try:
         uid = request.firebaseUser['user_id']
-        db = firestore.client()
-        user_ref = db.collection('users').document(uid)
+        db = get_firestore()
 
         # ✅ Get request data
         data = json.loads(request.body)
         new_question = data.get('question', {})
 
-        if not new_question:
+        if not new_question or not isinstance(new_question, dict):
             return JsonResponse({"error": "No question provided"}, status=400)
 
-        # ✅ Check if the user document exists
-        user_doc = user_ref.get()
-        if not user_doc.exists:
-            return JsonResponse({"error": "User not found"}, status=404)
+        question = Question.from_dict(new_question)
+        if question is None:
+            return JsonResponse({"error": "Invalid question: needs question text, options a-d and a correct_answer"}, status=400)
+
+        # ✅ Add the bookmark (no-op if it already exists)
+        bookmark_id, created = add_bookmark(db, uid, question)
+
+        return JsonResponse({
+            "message": "Bookmarked questions updated successfully" if created else "Question already bookmarked",
+            "bookmark_id": bookmark_id,
+            "question": question.to_dict()
+        }, status=200)
+
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
 
-        # ✅ Fetch current data or initialize the field
-        user_data = user_doc.to_dict()
-        questions = user_data.get('bookmarked_questions', [])
+@api_view(['POST'])
+def remove_bookmarked_question(request):
+    """
+    Remove a bookmark by its `bookmark_id`, or by the bookmarked `question` itself.
+    """
+    try:
+        uid = request.firebaseUser['user_id']
+        db = get_firestore()
 
-        # ✅ Add new question while avoiding duplicates
-        if new_question not in questions:
-            questions.append(new_question)
+        data = json.loads(request.body)
+        bookmark_id = data.get('bookmark_id')
+        if not bookmark_id and isinstance(data.get('question'), dict):
+            bookmark_id = question_hash(data['question'])
 
-        # ✅ Update Firestore document
-        user_ref.update({'bookmarked_questions': questions})
+        if not bookmark_id:
+            return JsonResponse({"error": "bookmark_id or question is required"}, status=400)
 
+        remove_bookmark(db, uid, bookmark_id)
         return JsonResponse({
-            "message": "Bookmarked questions updated successfully",
-            "questions": questions
+            "message": "Question removed from bookmarks",
+            "bookmark_id": bookmark_id
         }, status=200)
 
     except Exception as e:
-        return JsonResponse({"error": str(e)}, status=500)
\ No newline at end of file
+        return JsonResponse({"error": str(e)}, status=500)
+
+@api_view(['GET'])
+def get_bookmarked_questions(request):
+    """
+    List the current user's bookmarks, newest first.
+
+    Paginate with ?limit=<n>&cursor=<next_cursor from the previous page>.
+    """
+    try:
+        limit = min(100, max(1, int(request.query_params.get('limit', 20))))
+    except ValueError:
+        return Response({"error": "limit must be an integer"}, status=400)
+
+    try:
+        uid = request.firebaseUser['user_id']
+        db = get_firestore()
+        bookmarks, next_cursor = list_bookmarks(db, uid, limit, request.query_params.get('cursor'))
+        return Response({"bookmarks": bookmarks, "next_cursor": next_cursor}, status=200)
+
+    except Exception as e:
+        return Response({"error": str(e)}, status=500)
@@ -3,6 +3,7 @@ import QuestionCard from "@/components/bookmarkedQuestions";
 import { Button } from "@/components/ui/button";
 import { Card, CardContent } from "@/components/ui/card";
 import { useAuth } from "@/context/AuthContext";
+import { getBookmarkedQuestions } from "@/services/quizService";
 import { BookMarked, ChevronLeft } from "lucide-react";
 import { useRouter } from "next/navigation";
 import { useEffect, useState } from "react";
@@ -22,6 +23,7 @@ const BookmarkedQuestionsPage = () => {
   const [collapsed, setCollapsed] = useState(false);
   const [isClient, setIsClient] = useState(false);
   const [searchQuery, setSearchQuery] = useState("");
+  const [bookmarkedQuestions, setBookmarkedQuestions] = useState<BookmarkedQuestion[]>([]);
   const [filteredQuestions, setFilteredQuestions] = useState<BookmarkedQuestion[]>([]);
   const { user, loading } = useAuth();
 
@@ -30,16 +32,19 @@ const BookmarkedQuestionsPage = () => {
   }, []);
 
   useEffect(() => {
-    const bookmarkedQuestions: BookmarkedQuestion[] = Array.isArray(user?.bookmarkedQuestions)
-      ? user.bookmarkedQuestions
-      : [];
+    if (!user?.uid) return;
+    getBookmarkedQuestions(user.uid)
+      .then(setBookmarkedQuestions)
+      .catch((error) => console.error("Error loading bookmarked questions:", error));
+  }, [user?.uid]);
 
+  useEffect(() => {
     const filtered = bookmarkedQuestions.filter((q) =>
       q.question?.toLowerCase().includes(searchQuery.toLowerCase())
     );
 
     setFilteredQuestions(filtered);
-  }, [searchQuery, user?.bookmarkedQuestions]);
+  }, [searchQuery, bookmarkedQuestions]);
 
   if (!isClient || loading) {
     return (
@@ -68,7 +73,7 @@ const BookmarkedQuestionsPage = () => {
     );
   }
 
-  const hasBookmarks = user.bookmarkedQuestions?.length > 0;
+  const hasBookmarks = bookmarkedQuestions.length > 0;
 
   return (
     <div className="flex min-h-screen bg-gray-50">
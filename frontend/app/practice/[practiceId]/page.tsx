@@ -1,7 +1,7 @@
 "use client";
 import { Button } from "@/components/ui/button";
 import { createPracticeQuestions } from "@/services/practiceService";
-import { bookmarkQuestion } from "@/services/quizService"; // Import the bookmarkQuestion function
+import { bookmarkQuestion, getBookmarkedQuestions } from "@/services/quizService";
 import { getAuth } from "firebase/auth"; // Import Firebase auth to get current user
 import { ArrowLeft } from "lucide-react";
 import { useParams, useRouter } from "next/navigation";
@@ -52,7 +52,7 @@ const PracticeSession = () => {
                 quizId: practiceId
             };
             
-            // Call the Firebase bookmarking function
+            // Saved through the backend's bookmark endpoint
             const result = await bookmarkQuestion(user.uid, questionWithId);
             
             // Update local state based on the result
@@ -129,25 +129,16 @@ const PracticeSession = () => {
             if (!user || !questions.length) return;
             
             try {
-                // Import Firebase functions
-                const { doc, getDoc } = await import("firebase/firestore");
-                const { db } = await import("@/firebaseConfig");
+                // Bookmarks are stored by content, so match them on the question text
+                const bookmarked = await getBookmarkedQuestions(user.uid);
+                const bookmarkedTexts = new Set(bookmarked.map(q => q.question));
                 
-                // Get user document
-                const userRef = doc(db, "users", user.uid);
-                const userDoc = await getDoc(userRef);
+                const bookmarkStatus = {};
+                questions.forEach(q => {
+                    bookmarkStatus[q.id] = bookmarkedTexts.has(q.question);
+                });
                 
-                if (userDoc.exists() && userDoc.data().bookmarkedQuestions) {
-                    const bookmarkedIds = userDoc.data().bookmarkedQuestions.map(q => q.id);
-                    
-                    // Create a map of question IDs to bookmark status
-                    const bookmarkStatus = {};
-                    questions.forEach(q => {
-                        bookmarkStatus[q.id] = bookmarkedIds.includes(q.id);
-                    });
-                    
-                    setBookmarkedQuestions(bookmarkStatus);
-                }
+                setBookmarkedQuestions(bookmarkStatus);
             } catch (error) {
                 console.error("Error checking bookmarked status:", error);
             }
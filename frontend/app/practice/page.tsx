@@ -9,12 +9,13 @@ import { useAuth } from "@/context/AuthContext";
 import { Card, CardContent, CardDescription, CardFooter, CardHeader, CardTitle } from "@/components/ui/card";
 import { useRouter } from "next/navigation";
 import { toast } from "react-hot-toast";
+import { getWeakTopics } from "@/services/quizService";
 const PracticePage = () => {
   const [collapsed, setCollapsed] = useState(true);
   const [selectedTopic, setSelectedTopic] = useState("");
   const router = useRouter();
   const { user } = useAuth();
-  const weakTopics = user?.weakTopics || [];
+  const [weakTopics, setWeakTopics] = useState<string[]>([]);
   const [isPending, startTransition] = useTransition();
   const [userId, setUserId] = useState("");
   const [suggestedTopics] = useState([
@@ -23,6 +24,13 @@ const PracticePage = () => {
     { name: "Physics", icon: <Lightbulb className="h-5 w-5 text-yellow-500" />, description: "Mechanics, thermodynamics, and quantum physics" },
   ]);
 
+  useEffect(() => {
+    if (!user) return;
+    getWeakTopics()
+      .then(setWeakTopics)
+      .catch((error) => console.error("Error fetching weak topics:", error));
+  }, [user]);
+
   const handleNavigation = (path: string) => {
     startTransition(() => {
       router.push(path);
@@ -7,8 +7,6 @@ import {
   ChevronRight, Flame, List, Trophy, Clock, 
   Github, Briefcase, Calendar as CalendarIcon
 } from "lucide-react";
-import { doc, updateDoc } from "firebase/firestore";
-import { db } from "@/firebaseConfig";
 import Sidebar from "@/components/dashboard/SideBar";
 import { Badge } from "@/components/ui/badge";
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
@@ -17,6 +15,8 @@ import { useAuth } from "@/context/AuthContext";
 import { Tooltip, TooltipContent, TooltipProvider, TooltipTrigger } from "@/components/ui/tooltip";
 import { Avatar, AvatarFallback, AvatarImage } from "@/components/ui/avatar";
 import { useRouter } from "next/navigation";
+import { getQuizStats, weakTopicNames } from "@/services/quizService";
+import { fetchQuizActivity } from "@/services/activityService";
 
 const ProfilePage = () => {
     const [collapsed, setCollapsed] = useState(true);
@@ -26,25 +26,21 @@ const ProfilePage = () => {
     const { user } = useAuth();
     const router = useRouter();
     
-    useEffect(() => {
-      const updateMaxStreakInFirestore = async () => {
-        if (user && user.uid) {
-          const updatedMaxStreak = Math.max(user.maxStreak, (user.currentStreak || user.streak?.count || 0));
+    const [quizStats, setQuizStats] = useState<any>(null);
+    const [activity, setActivity] = useState<Record<string, number>>({});
     
-          if (updatedMaxStreak > user.maxStreak) {
-            try {
-              const userRef = doc(db, "users", user.uid);
-              await updateDoc(userRef, {
-                maxStreak: updatedMaxStreak,
-              });
-            } catch (error) {
-              console.error("Error updating maxStreak:", error);
-            }
-          }
-        }
-      };
-    
-      updateMaxStreakInFirestore();
+    // Totals, streak and per-topic scores come from the backend, which records every graded attempt
+    useEffect(() => {
+      if (!user) return;
+      Promise.all([getQuizStats(), fetchQuizActivity(user.uid)])
+        .then(([summary, activityByDate]) => {
+          setQuizStats(summary);
+          setActivity(activityByDate);
+        })
+        .catch((err) => {
+          console.error("Error fetching quiz stats:", err);
+          setError("Failed to load quiz statistics");
+        });
     }, [user]);
     
       
@@ -92,20 +88,7 @@ const ProfilePage = () => {
                 const date = new Date();
                 date.setDate(today.getDate() - i);
                 
-                // Default to 0 activity
-                let value = 0;
-                
-                // If we have last submission date and it's the same as this date, show activity
-                if (user.lastQuizSubmissionDate) {
-                    const lastQuizDate = user.lastQuizSubmissionDate.seconds 
-                        ? new Date(user.lastQuizSubmissionDate.seconds * 1000)
-                        : new Date(user.lastQuizSubmissionDate);
-                    
-                    // If this is the day a quiz was submitted
-                    if (date.toDateString() === lastQuizDate.toDateString()) {
-                        value = Math.min(user.numberOfTestsAttempted || 1, 4);
-                    }
-                }
+                const value = Math.min(activity[date.toISOString().split('T')[0]] || 0, 4);
                 
                 data.push({
                     date: date.toISOString().split('T')[0], // YYYY-MM-DD format
@@ -123,7 +106,7 @@ const ProfilePage = () => {
             console.error("Error generating activity data:", err);
             setError("Failed to load activity information");
         }
-    }, [user]);
+    }, [user, activity]);
 
     // Animation variants
     const containerVariants = {
@@ -158,13 +141,16 @@ const ProfilePage = () => {
         );
     }
 
+    const totals = quizStats?.stats || {};
+    const lastQuizSubmissionDate = totals.last_attempt_at || null;
+    const currentStreak = totals.current_streak || 0;
+    const weakTopics = weakTopicNames(quizStats?.topics || []);
+
     // Calculate time until streak resets
     const getTimeUntilReset = () => {
-        if (!user.lastQuizSubmissionDate) return "Complete a quiz to start your streak!";
+        if (!lastQuizSubmissionDate) return "Complete a quiz to start your streak!";
     
-        const lastQuizDate = user.lastQuizSubmissionDate.seconds 
-            ? new Date(user.lastQuizSubmissionDate.seconds * 1000)
-            : new Date(user.lastQuizSubmissionDate);
+        const lastQuizDate = new Date(lastQuizSubmissionDate);
     
         // Normalize lastQuizDate to midnight
         lastQuizDate.setHours(0, 0, 0, 0);
@@ -194,7 +180,7 @@ const ProfilePage = () => {
         return "#196127"; // 4 or higher
     };
     
-    const isStreakMaintained = user.lastQuizSubmissionDate ? isStreakActive(user.lastQuizSubmissionDate) : false;
+    const isStreakMaintained = lastQuizSubmissionDate ? isStreakActive(lastQuizSubmissionDate) : false;
     
     return (
         <div className=" min-h-screen bg-gradient-to-br from-gray-50 to-gray-100">
@@ -247,7 +233,7 @@ const ProfilePage = () => {
                                         <TooltipTrigger asChild>
                                             <Badge variant="outline" className={`${isStreakMaintained ? 'bg-amber-50 text-amber-700 border-amber-200' : 'bg-gray-50 text-gray-700 border-gray-200'} font-medium`}>
                                                 <Flame className={`w-3 h-3 mr-1 ${isStreakMaintained ? 'text-amber-500' : 'text-gray-500'}`} /> 
-                                                Streak: {user.currentStreak || user.streak?.count  ||0} days
+                                                Streak: {currentStreak} days
                                             </Badge>
                                         </TooltipTrigger>
                                         <TooltipContent className="p-3 max-w-xs">
@@ -260,10 +246,10 @@ const ProfilePage = () => {
                                 </TooltipProvider>
                                 
                                 <Badge variant="outline" className="bg-blue-50 text-blue-700 border-blue-200 font-medium">
-                                    <Trophy className="w-3 h-3 mr-1" /> Best: {user.maxStreak || 0} days
+                                    <Trophy className="w-3 h-3 mr-1" /> Best: {totals.max_streak || 0} days
                                 </Badge>
                                 <Badge variant="outline" className="bg-green-50 text-green-700 border-green-200 font-medium">
-                                    <Calendar className="w-3 h-3 mr-1" /> Last Quiz: {formatDate(user.lastQuizSubmissionDate)}
+                                    <Calendar className="w-3 h-3 mr-1" /> Last Quiz: {formatDate(lastQuizSubmissionDate)}
                                 </Badge>
                             </div>
                         </div>
@@ -300,18 +286,18 @@ const ProfilePage = () => {
                                 <div className="flex justify-between items-center mb-4">
                                     <div>
                                         <p className="text-sm text-gray-500">Current Streak</p>
-                                        <p className="text-3xl font-bold text-amber-600">{user.currentStreak || user.streak?.count || 0} days</p>
+                                        <p className="text-3xl font-bold text-amber-600">{currentStreak} days</p>
                                     </div>
                                     <div className="text-right">
                                         <p className="text-sm text-gray-500">Best Streak</p>
-                                        <p className="text-3xl font-bold text-blue-600">{user.maxStreak || 0} days</p>
+                                        <p className="text-3xl font-bold text-blue-600">{totals.max_streak || 0} days</p>
                                     </div>
                                 </div>
                                 
                                 <div className="bg-gray-100 h-8 rounded-full overflow-hidden relative">
                                     <div 
                                         className="h-full bg-gradient-to-r from-amber-400 to-amber-600 rounded-full transition-all duration-700"
-                                        style={{ width: `${Math.min(((user.currentStreak || user.streak?.count || 0) / 10) * 100, 100)}%` }}
+                                        style={{ width: `${Math.min((currentStreak / 10) * 100, 100)}%` }}
                                     ></div>
                                     <div className="absolute top-0 left-0 w-full h-full flex items-center justify-center text-sm font-semibold">
                                         {isStreakMaintained ? 
@@ -323,7 +309,7 @@ const ProfilePage = () => {
                                 <div className="mt-4 flex justify-between items-center">
                                     <div className="flex items-center gap-1 text-sm text-gray-500">
                                         <Clock size={14} />
-                                        <span>Last activity: {formatDate(user.lastQuizSubmissionDate)}</span>
+                                        <span>Last activity: {formatDate(lastQuizSubmissionDate)}</span>
                                     </div>
                                     <button 
                                         onClick={() => router.push("/quiz")}
@@ -355,12 +341,12 @@ const ProfilePage = () => {
                             <CardContent>
                                 <div className="flex items-baseline">
                                     <p className="text-3xl font-bold text-purple-600">
-                                        {user.numberOfTestsAttempted || 0}
+                                        {totals.attempts || 0}
                                     </p>
                                     <span className="ml-2 text-sm text-gray-500">quizzes</span>
                                 </div>
                                 <Progress 
-                                    value={Math.min((user.numberOfTestsAttempted || 0) * 10, 100)} 
+                                    value={Math.min((totals.attempts || 0) * 10, 100)} 
                                     className="h-1 mt-3 bg-purple-100" 
                                 />
                             </CardContent>
@@ -380,12 +366,12 @@ const ProfilePage = () => {
                             <CardContent>
                                 <div className="flex items-baseline">
                                     <p className="text-3xl font-bold text-blue-600">
-                                        {(user.averageMarks || 0).toFixed(1)}
+                                        {(totals.average_score || 0).toFixed(1)}
                                     </p>
                                     <span className="ml-2 text-sm text-gray-500">points</span>
                                 </div>
                                 <Progress 
-                                    value={Math.min((user.averageMarks || 0) * 10, 100)} 
+                                    value={Math.min((totals.average_score || 0) * 10, 100)} 
                                     className="h-1 mt-3 bg-blue-100" 
                                 />
                             </CardContent>
@@ -405,12 +391,12 @@ const ProfilePage = () => {
                             <CardContent>
                                 <div className="flex items-baseline">
                                     <p className="text-3xl font-bold text-rose-600">
-                                        {user.weakTopics?.length || 0}
+                                        {weakTopics.length || 0}
                                     </p>
                                     <span className="ml-2 text-sm text-gray-500">topics</span>
                                 </div>
                                 <Progress 
-                                    value={Math.min((user.weakTopics?.length || 0) * 10, 100)} 
+                                    value={Math.min((weakTopics.length || 0) * 10, 100)} 
                                     className="h-1 mt-3 bg-rose-100" 
                                 />
                             </CardContent>
@@ -428,9 +414,9 @@ const ProfilePage = () => {
                         </div>
                         
                         <div className="bg-white shadow-md rounded-xl p-6 border border-gray-100">
-                            {(user.weakTopics?.length > 0) ? (
+                            {(weakTopics.length > 0) ? (
                                 <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-3">
-                                    {(user.weakTopics || []).map((topic, index) => (
+                                    {weakTopics.map((topic, index) => (
                                         <div 
                                             key={index} 
                                             className="flex items-center gap-2 bg-gradient-to-r from-rose-50 to-white p-3 rounded-lg border border-rose-100"
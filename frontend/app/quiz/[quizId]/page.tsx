@@ -15,7 +15,7 @@ import {
 import { Button } from "@/components/ui/button";
 import { Card, CardContent } from "@/components/ui/card";
 import { useAuth } from "@/context/AuthContext";
-import { clearAttemptedOptions, getQuizById, updateAnswer } from "@/services/quizService";
+import { bookmarkQuestion, clearAttemptedOptions, getBookmarkedQuestions, getQuizById, removeBookmarkedQuestion, updateAnswer } from "@/services/quizService";
 import toast from 'react-hot-toast';
 
 export default function QuizPage({ params }: { params: Promise<{ quizId: string }> }) {
@@ -34,29 +34,17 @@ export default function QuizPage({ params }: { params: Promise<{ quizId: string
   const [lastQuizDate, setLastQuizDate] = useState<Date | null>(null);
   const [isPending, startTransition] = useTransition();
 
-  // Add this new function to fetch bookmarked questions
+  // Bookmark state is keyed by question text; bookmarks are stored by content, not by client-side ids
   const fetchBookmarkedQuestions = async () => {
     if (!user) return;
     
     try {
-      // Import these functions at the top of your file from Firebase
-      const { doc, getDoc } = await import("firebase/firestore");
-      const { db } = await import("@/firebaseConfig"); // Adjust path as needed
-      
-      const userRef = doc(db, "users", user.uid);
-      const userDoc = await getDoc(userRef);
-      
-      if (userDoc.exists() && userDoc.data().bookmarkedQuestions) {
-        const bookmarkedQuestions = userDoc.data().bookmarkedQuestions;
-        const bookmarkState: Record<string, boolean> = {};
-        
-        // Create a map of bookmarked question IDs
-        bookmarkedQuestions.forEach((q: any) => {
-          bookmarkState[q.id] = true;
-        });
-        
-        setBookmarked(bookmarkState);
-      }
+      const bookmarkedQuestions = await getBookmarkedQuestions(user.uid);
+      const bookmarkState: Record<string, boolean> = {};
+      bookmarkedQuestions.forEach((q: any) => {
+        bookmarkState[q.question] = true;
+      });
+      setBookmarked(bookmarkState);
     } catch (error) {
       console.error("Error fetching bookmarked questions:", error);
     }
@@ -230,53 +218,23 @@ export default function QuizPage({ params }: { params: Promise<{ quizId: string
   const handleBookmark = async (questionIndex: number) => {
     if (!user) return;
     
-    const questionId = questions[questionIndex].id || `question_${questionIndex}`;
-    const questionToBookmark = {
-      ...questions[questionIndex],
-      quizId,
-      quizTitle,
-      id: questionId  // Ensure the question has an ID
-    };
+    const question = questions[questionIndex];
+    const questionKey = question.question;
     
     try {
       // Toggle bookmark status immediately for responsive UI
-      const newBookmarkedState = !bookmarked[questionId];
+      const newBookmarkedState = !bookmarked[questionKey];
       
       // Update UI immediately
       setBookmarked(prev => ({
         ...prev,
-        [questionId]: newBookmarkedState
+        [questionKey]: newBookmarkedState
       }));
       
-      // Import these functions at the top of your file from Firebase
-      const { doc, getDoc, updateDoc, arrayRemove, arrayUnion } = await import("firebase/firestore");
-      const { db } = await import("@/firebaseConfig"); // Adjust path as needed
-      
-      // Reference to the user's document
-      const userRef = doc(db, "users", user.uid);
-      const userDoc = await getDoc(userRef);
-      
       if (newBookmarkedState) {
-        // Add bookmark
-        if (!userDoc.exists()) {
-          // Create new user document with bookmarked question
-          const { setDoc } = await import("firebase/firestore");
-          await setDoc(userRef, {
-            bookmarkedQuestions: [questionToBookmark]
-          });
-        } else {
-          // Add to existing bookmarks
-          await updateDoc(userRef, {
-            bookmarkedQuestions: arrayUnion(questionToBookmark)
-          });
-        }
+        await bookmarkQuestion(user.uid, question);
       } else {
-        // Remove bookmark if document exists and has bookmarks
-        if (userDoc.exists() && userDoc.data().bookmarkedQuestions) {
-          await updateDoc(userRef, {
-            bookmarkedQuestions: arrayRemove(questionToBookmark)
-          });
-        }
+        await removeBookmarkedQuestion(user.uid, question);
       }
       
       toast.success(
@@ -290,7 +248,7 @@ export default function QuizPage({ params }: { params: Promise<{ quizId: string
       // Revert UI state on error
       setBookmarked(prev => ({
         ...prev,
-        [questionId]: !prev[questionId]
+        [questionKey]: !prev[questionKey]
       }));
       
       toast.error("Failed to update bookmark. Please try again.");
@@ -437,7 +395,6 @@ export default function QuizPage({ params }: { params: Promise<{ quizId: string
   const progress = ((currentIndex + 1) / questions.length) * 100;
   const currentQuestion = questions[currentIndex];
   const selectedAnswer = answers[currentIndex]; 
-  const questionId = currentQuestion.id || `question_${currentIndex}`;
 
   // Get option entries from the options object
   const optionEntries = currentQuestion.options 
@@ -509,11 +466,11 @@ export default function QuizPage({ params }: { params: Promise<{ quizId: string
                   <Button
                     variant="ghost"
                     size="sm"
-                    className={`${bookmarked[questionId] ? "text-yellow-500 hover:text-yellow-600" : "text-gray-400 hover:text-gray-500"}`}
+                    className={`${bookmarked[currentQuestion.question] ? "text-yellow-500 hover:text-yellow-600" : "text-gray-400 hover:text-gray-500"}`}
                     onClick={() => handleBookmark(currentIndex)}>
-                    <Bookmark className={`w-5 h-5 ${bookmarked[questionId] ? "fill-yellow-500" : ""}`} />
+                    <Bookmark className={`w-5 h-5 ${bookmarked[currentQuestion.question] ? "fill-yellow-500" : ""}`} />
                     <span className="ml-1 text-sm">
-                      {bookmarked[questionId] ? "Bookmarked" : "Bookmark"}
+                      {bookmarked[currentQuestion.question] ? "Bookmarked" : "Bookmark"}
                     </span>
                   </Button>
                 </div>
@@ -42,7 +42,7 @@ const QuestionCard: React.FC<QuestionCardProps> = ({ q, index }) => {
         try {
             if (bookmarked) {
                 // If already bookmarked, remove it
-                const result = await removeBookmarkedQuestion(userId, q.id);
+                const result = await removeBookmarkedQuestion(userId, q);
                 if (result.success) {
                     setBookmarked(false);
                     console.log(result.message);
@@ -1,34 +1,20 @@
 // This file would be saved as /services/activityService.js
 
-import { db } from "../firebaseConfig";
-import { doc, getDoc } from "firebase/firestore";
+import { getRecentAttempts } from "./quizService";
 
 // Function to fetch quiz activity data for heatmap
 export const fetchQuizActivity = async (userId) => {
   try {
-    // Get user document reference
-    const userRef = doc(db, "users", userId);
-    const userDoc = await getDoc(userRef);
-    
-    if (!userDoc.exists()) {
-      throw new Error("User not found");
-    }
-    
-    const userData = userDoc.data();
-    
-    // Extract quiz history from user data
-    const quizHistory = userData.quiz_history || [];
+    // The backend keeps the user's graded attempts; the most recent 100 cover the heatmap
+    const quizHistory = await getRecentAttempts(100);
     
     // Process quiz history into a format suitable for heatmap
     // Maps dates to count of quizzes taken on that date
     const activityData = {};
     
     quizHistory.forEach(entry => {
-      if (entry.date) {
-        // Convert Firestore timestamp to JS Date
-        const date = entry.date.seconds 
-          ? new Date(entry.date.seconds * 1000)
-          : new Date(entry.date);
+      if (entry.submitted_at) {
+        const date = new Date(entry.submitted_at);
         
         // Format date as YYYY-MM-DD for consistent keys
         const dateKey = date.toISOString().split('T')[0];
@@ -1,7 +1,6 @@
 import { addDoc, collection, deleteDoc, doc, getDoc, getDocs, query, serverTimestamp, updateDoc, where } from 'firebase/firestore';
 import Cookies from 'js-cookie';
 import { db } from '../firebaseConfig';
-import { updateUserStreak } from "./streakService";
 const BASE_URL = process.env.NEXT_PUBLIC_BACKEND_URL || "http://127.0.0.1:8000";
 
 // Create a new quiz - generate questions with AI and then save to Firestore
@@ -48,6 +47,46 @@ export const createQuiz = async ({ topic, difficulty, numQuestions, timeLimit, u
   }
 };
 
+// Create several quizzes at once - questions for all topics are generated in one batch request
+// quizzes: [{ topic, difficulty, numQuestions, timeLimit? }]
+export const createQuizBatch = async ({ quizzes, timeLimit, userId }) => {
+  try {
+    const idToken = Cookies.get("idToken"); // Get token
+    if (!idToken) {
+        console.error("❌ No idToken found in cookies!");
+        throw new Error("Authentication token missing");
+    }
+
+    const response = await fetch(`${BASE_URL}/api/quizzes/create_quiz_batch`, {
+        method: "POST",
+        credentials: "include", // Ensures cookies are sent
+        headers: {
+            "Content-Type": "application/json",
+            "Authorization": `Bearer ${idToken}`, // Send token in header
+        },
+        body: JSON.stringify({ quizzes, timeLimit, userId }),
+    });
+
+    const result = await response.json();
+    if (!response.ok && !Array.isArray(result.data)) {
+        throw new Error(result.error || `HTTP error! Status: ${response.status}`);
+    }
+
+    // Save each generated quiz; failed specs are reported back with their error
+    return await Promise.all(result.data.map(async (item) => {
+      if (item.status !== "ok") {
+        return { index: item.index, error: item.error };
+      }
+      const quizData = { ...item.data, createdAt: serverTimestamp() };
+      const quizRef = await addDoc(collection(db, "quizzes"), quizData);
+      return { index: item.index, id: quizRef.id, message: "Quiz created successfully" };
+    }));
+  } catch (error) {
+    console.error("Error creating quizzes:", error);
+    throw error;
+  }
+};
+
 // Fetch all quizzes for a specific user
 export const getAllQuizzes = async (userId) => {
   try {
@@ -135,6 +174,48 @@ export const deleteQuiz = async (quizId) => {
 };
 
 
+const backendFetch = async (path, options = {}) => {
+  const idToken = Cookies.get("idToken");
+  if (!idToken) {
+    throw new Error("Authentication token missing");
+  }
+  const response = await fetch(`${BASE_URL}${path}`, {
+    ...options,
+    credentials: "include",
+    headers: {
+      "Content-Type": "application/json",
+      "Authorization": `Bearer ${idToken}`,
+    },
+  });
+  const result = await response.json();
+  if (!response.ok) {
+    throw new Error(result.error || `HTTP error! Status: ${response.status}`);
+  }
+  return result;
+};
+
+// Grade an attempt on the backend; answers are the selected options in question order ("" if skipped)
+export const submitAttempt = (quizId, answers, timeSpent = null) =>
+  backendFetch("/api/quizzes/submit_attempt", {
+    method: "POST",
+    body: JSON.stringify({ quiz_id: quizId, answers, time_spent: timeSpent }),
+  });
+
+// The current user's totals, streak and per-topic scores
+export const getQuizStats = () => backendFetch("/api/quizzes/stats");
+
+// The current user's most recent graded attempts
+export const getRecentAttempts = async (limit = 10) =>
+  (await backendFetch(`/api/quizzes/attempts?limit=${limit}`)).attempts;
+
+// The names of the topics (from getQuizStats) the user averages below WEAK_TOPIC_SCORE percent on
+const WEAK_TOPIC_SCORE = 50;
+export const weakTopicNames = (topics) =>
+  topics.filter(topic => topic.average_score < WEAK_TOPIC_SCORE).map(topic => topic.topic);
+
+// The current user's weak topics, most recently attempted first
+export const getWeakTopics = async () => weakTopicNames((await getQuizStats()).topics);
+
 // Submit a quiz and calculate score
 export const submitQuiz = async (quizId, userId) => {
   try {
@@ -149,100 +230,77 @@ export const submitQuiz = async (quizId, userId) => {
     const quizData = quizDoc.data();
     const questions = quizData.questions || [];
     
-    const totalQuestions = questions.length;
+    let totalQuestions = questions.length;
     let correctCount = 0;
     let wrongCount = 0;
-    const wrongTags = {};
-    const questionAnalysis = [];
-
-    // Check each question's attempted_option against correct_answer
-    for (const question of questions) {
-      const attemptedOption = question.attempted_option;
-      const correctAnswer = question.correct_answer;
-      const isCorrect = attemptedOption === correctAnswer;
-
-      // Add to question analysis
-      questionAnalysis.push({
-        question: question.question,
-        isCorrect,
-        attemptedOption,
-        correctAnswer,
-        tags: question.tags || []
-      });
-
-      if (isCorrect) {
-        correctCount += 1;
-      } else {
-        wrongCount += 1;
-        const tags = question.tags || [];
-        for (const tag of tags) {
-          wrongTags[tag] = (wrongTags[tag] || 0) + 1;
+    let wrongTags = {};
+    let questionAnalysis = [];
+    let scorePercentage = 0;
+    let stats = null;
+
+    if (quizData.quiz_id) {
+      // The backend grades against its stored copy of the quiz and updates the user's totals
+      const timeSpentSeconds = quizData.timeStarted?.toMillis && quizData.timeEnded?.toMillis ?
+        Math.round((quizData.timeEnded.toMillis() - quizData.timeStarted.toMillis()) / 1000) : null;
+      const result = await submitAttempt(
+        quizData.quiz_id,
+        questions.map(question => question.attempted_option || ""),
+        timeSpentSeconds
+      );
+      totalQuestions = result.score.total;
+      correctCount = result.score.correct;
+      wrongCount = result.score.wrong;
+      scorePercentage = result.score.percentage;
+      wrongTags = result.wrong_tags;
+      stats = result.stats;
+      questionAnalysis = result.question_analysis.map(item => ({
+        question: item.question,
+        isCorrect: item.is_correct,
+        attemptedOption: item.attempted_option,
+        correctAnswer: item.correct_answer,
+        tags: item.tags
+      }));
+    } else {
+      // Quizzes created before the backend stored them are graded here
+      for (const question of questions) {
+        const attemptedOption = question.attempted_option;
+        const correctAnswer = question.correct_answer;
+        const isCorrect = attemptedOption === correctAnswer;
+
+        questionAnalysis.push({
+          question: question.question,
+          isCorrect,
+          attemptedOption,
+          correctAnswer,
+          tags: question.tags || []
+        });
+
+        if (isCorrect) {
+          correctCount += 1;
+        } else {
+          wrongCount += 1;
+          const tags = question.tags || [];
+          for (const tag of tags) {
+            wrongTags[tag] = (wrongTags[tag] || 0) + 1;
+          }
         }
       }
+      scorePercentage = totalQuestions > 0 ? (correctCount / totalQuestions) * 100 : 0;
     }
 
-    // Calculate score percentage
-    const scorePercentage = totalQuestions > 0 ? (correctCount / totalQuestions) * 100 : 0;
-
-    // Update the user's statistics
-    const userRef = doc(db, "users", userId);
-    const userDoc = await getDoc(userRef);
-
-    if (!userDoc.exists()) {
-      throw new Error("User not found");
-    }
-    const streakResult = await updateUserStreak(userId, new Date());
-
-    const userData = userDoc.data();
-    
-    // Get current stats or initialize if they don't exist
-    const currentTests = userData.numberOfTestsAttempted || 0;
-    const currentTotalMarks = userData.averageMarks || 0;
-    const previousWrongTags = userData.weakTopics || [];
-    
-    // Calculate new average marks
-    const newTestsCount = currentTests + 1;
-    const newTotalMarks = ((currentTotalMarks * currentTests) + scorePercentage) / newTestsCount;
-    
     // Identify consistently wrong tags (appear in multiple questions)
     const significantWrongTags = Object.entries(wrongTags)
       .filter(([_, count]) => count >= 2)
       .map(([tag, _]) => tag);
-    
-    // Combine with previous wrong tags to track persistence
-    const newWrongTags = Array.from(
-      new Set([...previousWrongTags, ...significantWrongTags])
-    );
 
-    // Calculate improvement areas
     const timeSpent = quizData.timeStarted ? 
       (new Date().getTime() - quizData.timeStarted) / (1000 * 60) : null;
 
-    // Update user document with new stats
-    await updateDoc(userRef, {
-      numberOfTestsAttempted: newTestsCount,
-      averageMarks: newTotalMarks,
-      weakTopics: newWrongTags,
-      lastQuizSubmissionDate: new Date(),
-      quiz_history: userData.quiz_history ? 
-        [...userData.quiz_history, { 
-          quizId, 
-          score: scorePercentage, 
-          date: new Date(),
-          wrongTags: Object.keys(wrongTags)
-        }].slice(-10) : 
-        [{ 
-          quizId, 
-          score: scorePercentage, 
-          date: new Date(),
-          wrongTags: Object.keys(wrongTags)
-        }]
-    });
-
-    // Save quiz results for future reference
+    // The user's totals, streak and weak topics are kept by the backend (see getQuizStats);
+    // the quiz document only records that it was completed
     await updateDoc(quizRef, {
       completed: true,
-      completedBy: userData.uid,
+      completedBy: userId,
       completedAt: new Date(),
       score: scorePercentage,
       timeSpent: timeSpent || null
@@ -258,9 +316,8 @@ export const submitQuiz = async (quizId, userId) => {
       },
       questionAnalysis,
       new_wrong_tags: significantWrongTags,
-      persistent_wrong_tags: newWrongTags,
       timeSpent,
-      ...streakResult
+      stats
     };
   } catch (error) {
     console.error("Error submitting quiz:", error);
@@ -268,6 +325,8 @@ export const submitQuiz = async (quizId, userId) => {
   }
 };
 
+// Bookmarks live in the users/{uid}/bookmarks subcollection behind the backend's bookmark endpoints.
+// A bookmark is keyed by the question's content, so bookmarking the same question twice keeps one entry.
 export const bookmarkQuestion = async (userId, question) => {
   try {
     if (!userId) {
@@ -278,110 +337,45 @@ export const bookmarkQuestion = async (userId, question) => {
       throw new Error("Question data is required");
     }
 
-    // Import necessary Firebase functions
-    const { doc, getDoc, setDoc, updateDoc, arrayUnion, arrayRemove } = await import("firebase/firestore");
-    const { db } = await import("@/firebaseConfig");
-
-    // Make sure the question has an ID
-    const questionId = question.id || `${question.quizId}_q${Date.now()}`;
-    const questionToSave = {
-      ...question,
-      id: questionId,
-      bookmarkedAt: new Date().toISOString()
+    const result = await backendFetch("/auth/update_bookmarked_questions/", {
+      method: "POST",
+      body: JSON.stringify({ question }),
+    });
+    return {
+      success: true,
+      message: result.message,
+      action: "added",
+      bookmarkId: result.bookmark_id
     };
-
-    // Reference to the user's document
-    const userRef = doc(db, "users", userId);
-    
-    // Check if user document exists
-    const userDoc = await getDoc(userRef);
-    
-    // Check if this question is already bookmarked
-    let isAlreadyBookmarked = false;
-    if (userDoc.exists() && userDoc.data().bookmarkedQuestions) {
-      isAlreadyBookmarked = userDoc.data().bookmarkedQuestions.some(
-        q => q.id === questionId
-      );
-    }
-    
-    if (isAlreadyBookmarked) {
-      // Remove bookmark if it exists
-      await updateDoc(userRef, {
-        bookmarkedQuestions: arrayRemove(questionToSave)
-      });
-      
-      return { 
-        success: true, 
-        message: "Bookmark removed successfully",
-        action: "removed"
-      };
-    } else {
-      // Add bookmark
-      if (!userDoc.exists()) {
-        // Create a new user document if it doesn't exist
-        await setDoc(userRef, {
-          bookmarkedQuestions: [questionToSave]
-        });
-      } else {
-        // Update existing user document
-        await updateDoc(userRef, {
-          bookmarkedQuestions: arrayUnion(questionToSave)
-        });
-      }
-      
-      return { 
-        success: true, 
-        message: "Question bookmarked successfully",
-        action: "added"
-      };
-    }
   } catch (error) {
     console.error("Error bookmarking question:", error);
     throw error;
   }
 };
+
 /**
  * Remove a bookmarked question for a user
  * @param {string} userId - The ID of the user
- * @param {string} questionId - The ID of the question to remove
+ * @param {string|object} question - The bookmark's id (as returned by getBookmarkedQuestions) or the question itself
  * @returns {Promise<object>} - Success message
  */
-export const removeBookmarkedQuestion = async (userId, questionId) => {
+export const removeBookmarkedQuestion = async (userId, question) => {
   try {
     if (!userId) {
       throw new Error("User ID is required");
     }
 
-    if (!questionId) {
+    if (!question) {
       throw new Error("Question ID is required");
     }
 
-    // Reference to the user's document
-    const userRef = doc(db, "users", userId);
-    
-    // Get the current bookmarked questions
-    const userDoc = await getDoc(userRef);
-    
-    if (!userDoc.exists()) {
-      throw new Error("User document not found");
-    }
-    
-    const userData = userDoc.data();
-    const bookmarkedQuestions = userData.bookmarkedQuestions || [];
-    
-    // Filter out the question to remove
-    const updatedBookmarks = bookmarkedQuestions.filter(
-      question => question.id !== questionId
-    );
-    
-    // Update the user document
-    await updateDoc(userRef, {
-      bookmarkedQuestions: updatedBookmarks
+    const result = await backendFetch("/auth/remove_bookmarked_question/", {
+      method: "POST",
+      body: JSON.stringify(typeof question === "string" ? { bookmark_id: question } : { question }),
     });
-
     return { 
       success: true, 
-      message: "Question removed from bookmarks" 
+      message: result.message 
     };
   } catch (error) {
     console.error("Error removing bookmarked question:", error);
@@ -390,9 +384,9 @@ export const removeBookmarkedQuestion = async (userId, questionId) => {
 };
 
 /**
- * Get all bookmarked questions for a user
+ * Get all bookmarked questions for a user, newest first
  * @param {string} userId - The ID of the user
- * @returns {Promise<Array>} - Array of bookmarked questions
+ * @returns {Promise<Array>} - Array of bookmarked questions; each one's id is its bookmark id
  */
 export const getBookmarkedQuestions = async (userId) => {
   try {
@@ -400,18 +394,18 @@ export const getBookmarkedQuestions = async (userId) => {
       throw new Error("User ID is required");
     }
 
-    // Reference to the user's document
-    const userRef = doc(db, "users", userId);
-    
-    // Get the user document
-    const userDoc = await getDoc(userRef);
-    
-    if (!userDoc.exists()) {
-      return [];
-    }
-    
-    const userData = userDoc.data();
-    return userData.bookmarkedQuestions || [];
+    const questions = [];
+    let cursor = null;
+    do {
+      const page = await backendFetch(
+        `/auth/bookmarked_questions/?limit=100${cursor ? `&cursor=${encodeURIComponent(cursor)}` : ""}`
+      );
+      for (const bookmark of page.bookmarks) {
+        questions.push({ ...bookmark.question, id: bookmark.bookmark_id, bookmarkedAt: bookmark.created_at });
+      }
+      cursor = page.next_cursor;
+    } while (cursor);
+    return questions;
   } catch (error) {
     console.error("Error getting bookmarked questions:", error);
     throw error;
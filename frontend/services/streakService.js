@@ -1,84 +1,6 @@
 // services/streakService.js
 import { db } from '../firebaseConfig';
-import { doc, getDoc, updateDoc, serverTimestamp, increment } from "firebase/firestore";
-
-export const updateUserStreak = async (userId, completedAt) => {
-  try {
-    const userRef = doc(db, "users", userId);
-    const userDoc = await getDoc(userRef);
-    
-    if (!userDoc.exists()) {
-      throw new Error("User not found");
-    }
-    const userData = userDoc.data();
-    const currentDate = new Date(completedAt);
-
-    const lastQuizDate = userData.lastQuizSubmissionDate ? 
-      new Date(userData.lastQuizSubmissionDate.seconds * 1000) : 
-      (null);
-    
-    const currentStreak = userData.currentStreak || 0;
-    const maxStreak = userData.maxStreak || 0;
-    
-    let newStreak = currentStreak;
-    let newMaxStreak = maxStreak;
-    let streakMaintained = false;
-    
-    // Check if this is the first quiz
-    if (!lastQuizDate) {
-      newStreak = 1;
-      newMaxStreak = 1;
-      streakMaintained = true;
-    } else {
-      // Calculate days between quizzes
-      const lastQuizDay = new Date(lastQuizDate.setHours(0, 0, 0, 0));
-      const currentDay = new Date(currentDate.setHours(0, 0, 0, 0));
-      
-      const timeDiff = currentDay - lastQuizDay;
-      const daysDiff = Math.floor(timeDiff / (1000 * 60 * 60 * 24));
-      
-      // If completed on the same day, don't update streak
-      if (daysDiff === 0) {
-        return { userData, streakUpdated: false };
-      }
-      // If completed the next day, increment streak
-      else if (daysDiff === 1) {
-        newStreak = currentStreak + 1;
-        streakMaintained = true;
-      }
-      // If completed after missing a day, reset streak to 1
-      else {
-        newStreak = 1;
-        streakMaintained = false;
-      }
-      
-      // Update max streak if current streak is higher
-      if (newStreak > maxStreak) {
-        newMaxStreak = newStreak;
-      }
-    }
-    
-    // Update both streak formats to ensure consistency
-    const timestamp = serverTimestamp();
-    await updateDoc(userRef, {
-      // Update top-level fields
-      currentStreak: newStreak,
-      maxStreak: newMaxStreak,
-      lastQuizSubmissionDate: timestamp,
-      numberOfTestsAttempted: increment(1),
-    });
-    
-    return {
-      streakMaintained,
-      currentStreak: newStreak,
-      maxStreak: newMaxStreak
-    };
-    
-  } catch (error) {
-    console.error("Error updating streak:", error);
-    throw error;
-  }
-};
+import { doc, getDoc, updateDoc } from "firebase/firestore";
 
 // Function to get user streak data
 export const getUserStreakData = async (userId) => {